@@ -3,7 +3,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_mail import Mail
 from config import Config
-from logger import logger
+from logger import get_logger
+
+logger = get_logger(__name__)
 
 # Initialize Flask extensions
 db = SQLAlchemy()
@@ -24,40 +26,128 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # Time request stages and report them in a Server-Timing header
+    from app.utils.timing import request_timer
+
+    request_timer.init_app(app)
+
+    # Use the fastest available JSON encoder and compress responses
+    from app.utils.json_provider import init_json_provider
+    from app.utils.compression import compressor
+
+    init_json_provider(app)
+    compressor.init_app(app)
+
     # Register custom Jinja filter for URL slugs
     from app.utils.helper import url_slug
 
     app.jinja_env.filters["url_slug"] = url_slug
 
+    # Keep compiled templates on disk so fresh workers skip compilation
+    from app.utils.rendering import init_template_cache
+
+    init_template_cache(app)
+
+    # Cache rendered rail fragments shared between users
+    from app.utils.fragments import fragment_cache
+
+    fragment_cache.init_app(app)
+
+    # Serve fingerprinted static assets with long-lived caching
+    from app.utils.assets import assets
+
+    assets.init_app(app)
+
     # Initialize Flask extensions
-    db.init_app(app)
+    from app.utils.database import init_database
+
+    init_database(app)
     login_manager.init_app(app)
     mail.init_app(app)
 
+    # Expose request, query, cache and catalog metrics at /metrics
+    from app.utils.metrics import metrics
+
+    metrics.init_app(app)
+
+    # Deliver email from a persistent outbox off the request path
+    from app.utils.mail_outbox import mail_outbox
+
+    mail_outbox.init_app(app)
+
+    # Batch watch-history writes when HISTORY_WRITE_MODE is "buffered"
+    from app.utils.history_buffer import history_buffer
+
+    history_buffer.init_app(app)
+
+    # Compact old watch history with "flask history compact"
+    from app.utils.history_retention import init_history_retention
+
+    init_history_retention(app)
+
+    # Bulk export and import of ratings and history with "flask data"
+    from app.utils.bulk_data import init_bulk_data
+
+    init_bulk_data(app)
+
+    # Thread pool for building homepage rails concurrently
+    from app.utils.rails import rail_executor
+
+    rail_executor.init_app(app)
+
+    # Resolve trailers off the request path
+    from app.utils.trailer_lookup import trailer_lookup
+
+    trailer_lookup.init_app(app)
+
+    # Cache the users Flask-Login loads on every request
+    from app.utils.user_cache import user_cache
+
+    user_cache.init_app(app)
+
+    # Rate-limit logins and bound the CPU spent on password hashing
+    from app.utils.login_throttle import login_throttle
+
+    login_throttle.init_app(app)
+
     # Handle unauthorized access
     @login_manager.unauthorized_handler
     def unauthorized_callback():
         return redirect(url_for("auth.login"))
 
     # Register blueprints for different routes
-    from app.routes import auth_bp, main_bp, movie_bp, category_bp, search_bp
+    from app.routes import (
+        auth_bp,
+        main_bp,
+        movie_bp,
+        category_bp,
+        search_bp,
+        rails_bp,
+        admin_bp,
+    )
 
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(movie_bp, url_prefix="/movie")
     app.register_blueprint(category_bp, url_prefix="/category")
     app.register_blueprint(search_bp, url_prefix="/search")
+    app.register_blueprint(rails_bp, url_prefix="/rails")
+    app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_blueprint(main_bp)
 
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Create database tables and bring existing ones up to date
+    from app.utils.migrations import init_schema
+
+    init_schema(app)
+
+    # Resolve trailers for popular movies ahead of demand
+    from app.utils.trailer_prefetch import trailer_prefetcher
+
+    trailer_prefetcher.init_app(app)
 
     # Load user for Flask-Login
     @login_manager.user_loader
     def load_user(user_id):
-        from app.models import User
-
-        return User.query.get(int(user_id))
+        return user_cache.load(int(user_id))
 
     logger.info("Flask application initialized successfully.")
     return app
@@ -1,3 +1,6 @@
 from .user import User
 from .rating import UserRating
 from .history import UserHistory
+from .trailer import TrailerCache
+from .history_summary import UserHistorySummary
+from .outbox import EmailOutbox
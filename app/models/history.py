@@ -11,8 +11,16 @@ class UserHistory(db.Model):
         user_id (int): Foreign key referencing the User who watched the movie.
         movie_id (int): ID of the movie watched.
         watched_at (datetime): Timestamp when the movie was watched.
+
+    Each user has at most one entry per movie. History pages read a user's
+    entries newest first, which the (user_id, watched_at) index serves.
     """
 
+    __table_args__ = (
+        db.Index("uq_user_history_user_movie", "user_id", "movie_id", unique=True),
+        db.Index("ix_user_history_user_watched", "user_id", db.text("watched_at DESC")),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     movie_id = db.Column(db.Integer, nullable=False)
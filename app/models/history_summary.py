@@ -0,0 +1,32 @@
+from datetime import datetime
+from app import db
+
+
+class UserHistorySummary(db.Model):
+    """
+    UserHistorySummary model holding the compacted part of a user's watch history.
+
+    History entries older than the retention cutoff are folded into one
+    summary row per user and then deleted.
+
+    Attributes:
+        user_id (int): Foreign key referencing the User (primary key).
+        watch_count (int): Number of compacted history entries.
+        first_watched_at (datetime): Earliest compacted watch time.
+        last_watched_at (datetime): Latest compacted watch time.
+        genre_counts (str): JSON object mapping genre names to watch counts.
+        compacted_at (datetime): Timestamp of the last compaction.
+    """
+
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id"), primary_key=True, autoincrement=False
+    )
+    watch_count = db.Column(db.Integer, nullable=False, default=0)
+    first_watched_at = db.Column(db.DateTime)
+    last_watched_at = db.Column(db.DateTime)
+    genre_counts = db.Column(db.Text, nullable=False, default="{}")
+    compacted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        """String representation of the UserHistorySummary object."""
+        return f"<UserHistorySummary user_id={self.user_id} watch_count={self.watch_count}>"
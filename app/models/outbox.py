@@ -0,0 +1,53 @@
+from datetime import datetime
+from app import db
+
+# Delivery states of an outbox message
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class EmailOutbox(db.Model):
+    """
+    EmailOutbox model holding rendered emails waiting to be delivered.
+
+    Requests enqueue a message here and return; the mail sender delivers
+    due messages in the background and retries failures with backoff.
+
+    Attributes:
+        id (int): Primary key for the message.
+        recipient (str): Email address the message is sent to.
+        subject (str): Subject line of the message.
+        html (str): Rendered HTML body of the message; emptied once the
+            message is sent or given up on.
+        status (str): "pending", "sent" or "failed".
+        attempts (int): Number of failed delivery attempts so far.
+        next_attempt_at (datetime): When the message is next due to be sent.
+        claim_token (str): Token of the sender currently delivering the message.
+        last_error (str): Error from the most recent failed attempt.
+        created_at (datetime): Timestamp when the message was enqueued.
+        sent_at (datetime): Timestamp when the message was delivered.
+
+    Senders look up due messages by (status, next_attempt_at), which the
+    index serves.
+    """
+
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_due", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(100), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        """String representation of the EmailOutbox object."""
+        return f"<EmailOutbox id={self.id} recipient={self.recipient} status={self.status}>"
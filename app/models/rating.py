@@ -12,8 +12,14 @@ class UserRating(db.Model):
         movie_id (int): ID of the movie rated.
         rating (int): Rating given by the user (1-5).
         rated_at (datetime): Timestamp when the movie was rated.
+
+    Each user has at most one rating per movie.
     """
 
+    __table_args__ = (
+        db.Index("uq_user_rating_user_movie", "user_id", "movie_id", unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     movie_id = db.Column(db.Integer, nullable=False)
@@ -0,0 +1,21 @@
+from datetime import datetime
+from app import db
+
+
+class TrailerCache(db.Model):
+    """
+    TrailerCache model storing resolved YouTube trailers per movie.
+
+    Attributes:
+        movie_id (int): ID of the movie (primary key).
+        video_id (str): YouTube video ID of the trailer, or None if the lookup failed.
+        resolved_at (datetime): Timestamp when the trailer was looked up.
+    """
+
+    movie_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    video_id = db.Column(db.String(20), nullable=True)
+    resolved_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        """String representation of the TrailerCache object."""
+        return f"<TrailerCache movie_id={self.movie_id} video_id={self.video_id} resolved_at={self.resolved_at}>"
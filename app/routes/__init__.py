@@ -5,4 +5,6 @@ main_bp = Blueprint("main", __name__)
 movie_bp = Blueprint("movie", __name__)
 category_bp = Blueprint("category", __name__)
 search_bp = Blueprint("search", __name__)
-from . import auth, main, movie, category, search
+rails_bp = Blueprint("rails", __name__)
+admin_bp = Blueprint("admin", __name__)
+from . import auth, main, movie, category, search, rails, admin
@@ -0,0 +1,135 @@
+from flask import Response, abort, current_app, jsonify, request, stream_with_context
+from functools import wraps
+from app.routes import admin_bp
+from app.utils.bulk_data import (
+    DATASETS,
+    FORMATS,
+    MIMETYPES,
+    export_chunks,
+    import_records,
+    parse_records,
+)
+from app.utils.timing import request_timer
+from logger import get_logger
+import hmac
+import io
+
+logger = get_logger(__name__)
+
+
+def admin_token_required(view):
+    """
+    Protect a view with the ADMIN_API_TOKEN bearer token.
+
+    The admin endpoints do not exist (404) unless a token is configured.
+
+    Args:
+        view (callable): The view to protect.
+
+    Returns:
+        callable: The wrapped view.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get("ADMIN_API_TOKEN")
+        if not token:
+            abort(404)
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            logger.warning("Rejected admin request to %s", request.path)
+            return jsonify({"error": "Unauthorized"}), 401
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def _dataset_and_format(dataset):
+    fmt = request.args.get("format", "csv")
+    if dataset not in DATASETS or fmt not in FORMATS:
+        abort(404)
+    return fmt
+
+
+@admin_bp.route("/export/<dataset>")
+@admin_token_required
+def export_dataset(dataset):
+    """
+    Stream all ratings or history as CSV or JSON lines.
+
+    Args:
+        dataset (str): "history" or "ratings".
+
+    Query Parameters:
+        format (str, optional): "csv" (default) or "jsonl".
+
+    Returns:
+        Response: A streamed download of the dataset.
+
+    Notes:
+        - Requires the ADMIN_API_TOKEN bearer token.
+        - Rows are read through a server-side cursor and sent in chunks, so
+          memory use does not depend on the size of the table.
+    """
+    fmt = _dataset_and_format(dataset)
+    logger.info("Exporting %s as %s", dataset, fmt)
+    chunk_size = current_app.config.get("BULK_CHUNK_SIZE", 5000)
+    response = Response(
+        stream_with_context(export_chunks(dataset, fmt, chunk_size)),
+        mimetype=MIMETYPES[fmt],
+    )
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename={dataset}.{fmt}"
+    )
+    return response
+
+
+@admin_bp.route("/import/<dataset>", methods=["POST"])
+@admin_token_required
+def import_dataset(dataset):
+    """
+    Upsert ratings or history from a CSV or JSON lines request body.
+
+    Args:
+        dataset (str): "history" or "ratings".
+
+    Query Parameters:
+        format (str, optional): "csv" (default) or "jsonl".
+
+    Returns:
+        JSON: The number of rows imported and rejected.
+
+    Notes:
+        - Requires the ADMIN_API_TOKEN bearer token.
+        - The body is read as a stream and written in batches of BULK_CHUNK_SIZE
+          rows, each committed separately.
+    """
+    fmt = _dataset_and_format(dataset)
+    try:
+        lines = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+        stats = import_records(
+            dataset,
+            parse_records(dataset, lines, fmt),
+            current_app.config.get("BULK_CHUNK_SIZE", 5000),
+        )
+        return jsonify(stats)
+    except Exception as e:
+        logger.error("Error importing %s: %s", dataset, e)
+        return jsonify({"error": f"Failed to import {dataset}"}), 500
+
+
+@admin_bp.route("/timings")
+@admin_token_required
+def timings():
+    """
+    Summarise the request stage timings recorded by this worker process.
+
+    Returns:
+        JSON: Per endpoint and span, the count, mean, p50, p95 and max in ms.
+
+    Notes:
+        - Requires the ADMIN_API_TOKEN bearer token.
+        - Empty unless SERVER_TIMING_ENABLED is set.
+        - Each worker process keeps its own statistics.
+    """
+    return jsonify(request_timer.aggregator.snapshot())
@@ -1,11 +1,22 @@
 from app.routes import auth_bp
-from flask import render_template, session, request, url_for, redirect, flash
+from flask import (
+    render_template,
+    session,
+    request,
+    url_for,
+    redirect,
+    flash,
+    make_response,
+)
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
 from app.models import User
-from logger import logger
+from app.utils.user_cache import user_cache
+from app.utils.login_throttle import login_throttle
+from logger import get_logger
 from app import db
 from datetime import datetime, timedelta, timezone
+import math
 from app.utils.verification import (
     add_user,
     send_otp,
@@ -15,6 +26,15 @@ from app.utils.verification import (
     send_password_reset_email,
 )
 
+logger = get_logger(__name__)
+
+
+def _login_page(status, retry_after):
+    """Render the login page with an error status and a Retry-After header."""
+    response = make_response(render_template("auth/login.html"), status)
+    response.headers["Retry-After"] = str(math.ceil(retry_after))
+    return response
+
 
 @auth_bp.route("/login", methods=["POST", "GET"])
 def login():
@@ -32,6 +52,8 @@ def login():
 
     Notes:
         - This route is accessible only to non-authenticated users.
+        - Attempts are rate-limited per IP and per account; throttled attempts
+          get a 429 response with a Retry-After header.
         - Logs successful and failed login attempts.
     """
     # Redirect to index if user is already authenticated
@@ -41,7 +63,20 @@ def login():
     if request.method == "POST":
         username = request.form["username"]
         password = request.form["password"]
-        logger.debug(f"Login attempt for username/email: {username}")
+        logger.debug("Login attempt for username/email: %s", username)
+
+        # Turn away bursts before spending a query or a password hash on them
+        retry_after = login_throttle.hit(request.remote_addr, username)
+        if retry_after:
+            flash(
+                "Too many login attempts. Please try again in "
+                f"{math.ceil(retry_after)} seconds.",
+                "error",
+            )
+            logger.warning(
+                "Login throttled for %s from %s", username, request.remote_addr
+            )
+            return _login_page(429, retry_after)
 
         # Query user by username or email
         user = User.query.filter(
@@ -50,10 +85,15 @@ def login():
 
         if user:
             # Check if the provided password matches the stored hash
-            if check_password_hash(user.password_hash, password):
+            matched = login_throttle.check_password(user.password_hash, password)
+            if matched is None:
+                flash("Login is busy right now. Please try again shortly.", "error")
+                return _login_page(503, 1)
+            if matched:
                 if user.is_activated:
+                    login_throttle.reset(username)
                     login_user(user)
-                    logger.info(f"User {username} logged in successfully.")
+                    logger.info("User %s logged in successfully.", username)
                     return redirect(url_for("main.index"))
                 else:
                     # If account is not activated, send OTP for validation
@@ -69,11 +109,11 @@ def login():
             else:
                 flash("Incorrect password. Please try again.", "error")
                 logger.warning(
-                    f"Login attempt failed for user {username}: incorrect password."
+                    "Login attempt failed for user %s: incorrect password.", username
                 )
         else:
             flash("User not found. Please check your credentials.", "error")
-            logger.warning(f"Login attempt failed: user {username} not found.")
+            logger.warning("Login attempt failed: user %s not found.", username)
 
     return render_template("auth/login.html")
 
@@ -101,14 +141,14 @@ def forgot_password():
 
     if request.method == "POST":
         email_or_name = request.form.get("email")
-        logger.debug(f"Password reset request for email/username: {email_or_name}")
+        logger.debug("Password reset request for email/username: %s", email_or_name)
 
         # Assume you have a User model with an email field
         user = User.query.filter_by(email=email_or_name).first()
         if user:
             # Generate a unique token with a 15-minute expiration
             token = generate_token()
-            logger.debug(f"Generated password reset token for user {user.email}")
+            logger.debug("Generated password reset token for user %s", user.email)
 
             # Store the token and user information (e.g., user ID) in a secure way
             session["reset_token"] = token
@@ -124,19 +164,19 @@ def forgot_password():
                     "Password reset email sent successfully. Check your inbox.",
                     "success",
                 )
-                logger.info(f"Password reset email sent to {user.email}")
+                logger.info("Password reset email sent to %s", user.email)
                 return redirect(url_for("auth.login"))
             else:
                 flash(
                     "Error sending password reset email. Please try again later.",
                     "error",
                 )
-                logger.error(f"Error sending password reset email to {user.email}")
+                logger.error("Error sending password reset email to %s", user.email)
                 return redirect(url_for("auth.forgot_password"))
         else:
             # Flash a message if no account found with the provided email or username
             flash("No account found with that email or username.", "warning")
-            logger.warning(f"No account found for email/username: {email_or_name}")
+            logger.warning("No account found for email/username: %s", email_or_name)
             return redirect(url_for("auth.forgot_password"))
 
     return render_template("auth/forgot_password.html")
@@ -162,7 +202,7 @@ def reset_password(token):
         - This route is accessible only to non-authenticated users.
         - Logs successful and failed password reset attempts.
     """
-    logger.debug(f"Password reset attempt with token: {token}")
+    logger.debug("Password reset attempt with token: %s", token)
 
     # Validate the token and check its expiration
     if token == session.get("reset_token"):
@@ -185,23 +225,24 @@ def reset_password(token):
             if request.method == "POST":
                 new_password = request.form.get("new_password")
                 confirm_new_password = request.form.get("confirm_new_password")
-                logger.debug(f"Password reset form submitted for user {user.email}")
+                logger.debug("Password reset form submitted for user %s", user.email)
 
                 # Check if the new password and confirm password match
                 if new_password != confirm_new_password:
                     flash("Passwords do not match. Please try again.", "error")
-                    logger.warning(f"Password mismatch for user {user.email}")
+                    logger.warning("Password mismatch for user %s", user.email)
                     return render_template("auth/reset_password.html", token=token)
 
                 # Check password strength (optional, but recommended)
                 if len(new_password) < 8:
                     flash("Password must be at least 8 characters long.", "error")
-                    logger.warning(f"Weak password attempt for user {user.email}")
+                    logger.warning("Weak password attempt for user %s", user.email)
                     return render_template("auth/reset_password.html", token=token)
 
                 # Update the user's password in the database
                 user.password_hash = generate_password_hash(new_password)
                 db.session.commit()
+                user_cache.invalidate(user_id)
 
                 # Clear the session variables after successful password reset
                 session.pop("reset_token", None)
@@ -212,7 +253,7 @@ def reset_password(token):
                     "Password reset successful. You can now log in with your new password.",
                     "success",
                 )
-                logger.info(f"Password reset successful for user {user.email}")
+                logger.info("Password reset successful for user %s", user.email)
                 return redirect(url_for("auth.login"))
 
             return render_template("auth/reset_password.html", token=token)
@@ -244,7 +285,7 @@ def resend_otp():
 
     # Retrieve the user's email from the session
     email = session.get("email")
-    logger.debug(f"Resend OTP request for email: {email}")
+    logger.debug("Resend OTP request for email: %s", email)
 
     if email is None:
         flash("Error! Please register again.", "error")
@@ -254,19 +295,21 @@ def resend_otp():
     # Attempt to resend the OTP
     if send_otp(email):
         flash("New OTP sent successfully.", "info")
-        logger.info(f"New OTP sent to {email}")
+        logger.info("New OTP sent to %s", email)
         return redirect(url_for("auth.validate_user"))
     else:
         flash("Error resending OTP. Please try again later.", "error")
-        logger.error(f"Error resending OTP to {email}")
+        logger.error("Error resending OTP to %s", email)
 
         # Delete the user from the database if email sending fails
         user = User.query.filter_by(email=email).first()
         if user:
+            user_id = user.id
             db.session.delete(user)
             db.session.commit()
+            user_cache.invalidate(user_id)
             logger.info(
-                f"User {email} deleted from database due to OTP resend failure."
+                "User %s deleted from database due to OTP resend failure.", email
             )
 
         return redirect(url_for("auth.register"))
@@ -300,18 +343,20 @@ def register():
         email = request.form["email"]
         password = request.form["password"]
         confirm_password = request.form["confirm_password"]
-        logger.debug(f"Registration attempt for username: {username}, email: {email}")
+        logger.debug(
+            "Registration attempt for username: %s, email: %s", username, email
+        )
 
         # Validate password and confirm password
         if password != confirm_password:
             flash("Passwords do not match. Please try again.", "error")
-            logger.warning(f"Registration failed: passwords do not match for {email}")
+            logger.warning("Registration failed: passwords do not match for %s", email)
             return redirect(url_for("auth.register"))
 
         # Check password strength
         if len(password) < 8:
             flash("Password must be at least 8 characters long.", "error")
-            logger.warning(f"Registration failed: weak password for {email}")
+            logger.warning("Registration failed: weak password for %s", email)
             return redirect(url_for("auth.register"))
 
         # Check if username or email already exists
@@ -321,13 +366,13 @@ def register():
         if existing_user_username:
             flash("Username already exists. Please choose another.", "error")
             logger.warning(
-                f"Registration attempt failed: username {username} already exists."
+                "Registration attempt failed: username %s already exists.", username
             )
             return redirect(url_for("auth.register"))
         elif existing_user_email:
             flash("Email already exists. Please choose another.", "error")
             logger.warning(
-                f"Registration attempt failed: email {email} already exists."
+                "Registration attempt failed: email %s already exists.", email
             )
             return redirect(url_for("auth.register"))
         else:
@@ -337,15 +382,15 @@ def register():
                 session["email"] = email
                 if send_otp(email):
                     flash("OTP sent successfully.", "info")
-                    logger.info(f"OTP sent successfully to {email}")
+                    logger.info("OTP sent successfully to %s", email)
                     return redirect(url_for("auth.validate_user"))
                 else:
                     flash("Error sending OTP. Please try again later.", "error")
-                    logger.error(f"Error sending OTP to {email}")
+                    logger.error("Error sending OTP to %s", email)
                     return redirect(url_for("auth.register"))
             else:
                 flash("Registration failed.", "error")
-                logger.error(f"Registration failed for {email}")
+                logger.error("Registration failed for %s", email)
                 return redirect(url_for("auth.register"))
 
     return render_template("auth/register.html")
@@ -377,7 +422,7 @@ def validate_user():
     if request.method == "POST":
         otp_entered = request.form.get("otp")
         email = session.get("email")
-        logger.debug(f"OTP validation attempt for email: {email}")
+        logger.debug("OTP validation attempt for email: %s", email)
 
         # Get the current OTP using the TOTP generator
         current_otp = 784941
@@ -386,18 +431,19 @@ def validate_user():
         if int(otp_entered) == int(current_otp):
             if activate_user(email):
                 user = User.query.filter_by(email=email).first()
+                user_cache.invalidate(user.id)
                 login_user(user)
                 session.pop("email", None)
                 flash("User activated successfully.", "success")
-                logger.info(f"User {email} activated successfully.")
+                logger.info("User %s activated successfully.", email)
                 return redirect(url_for("main.index"))
             else:
                 flash("Error activating user.", "error")
-                logger.error(f"Error activating user with email {email}.")
+                logger.error("Error activating user with email %s.", email)
                 return redirect(url_for("auth.validate_user"))
         else:
             flash("Invalid OTP.", "error")
-            logger.warning(f"Invalid OTP entered for email {email}.")
+            logger.warning("Invalid OTP entered for email %s.", email)
             return redirect(url_for("auth.validate_user"))
 
     return render_template("auth/validate_user.html")
@@ -419,5 +465,5 @@ def logout():
     username = current_user.username
     logout_user()
     flash("You have been logged out. See you soon!", "info")
-    logger.info(f"User {username} logged out.")
+    logger.info("User %s logged out.", username)
     return redirect(url_for("auth.login"))
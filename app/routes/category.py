@@ -2,11 +2,20 @@ from app.routes import category_bp
 from flask import render_template
 from app.utils.helper import filter_movies_by_genre
 from flask_login import current_user, login_required
-from logger import logger
+from app.utils.http_cache import catalog_cached
+from app.utils.rendering import render_page
+from logger import get_logger
+
+logger = get_logger(__name__)
 
 
 @category_bp.route("/<path:genre_name>")
 @login_required
+@catalog_cached(
+    lambda genre_name: ("category", genre_name),
+    templates=("category.html", "layout.html", "menu.html"),
+    private=True,
+)
 def category(genre_name):
     """
     Display a list of movies filtered by the specified genre.
@@ -24,6 +33,7 @@ def category(genre_name):
         - The route URL is "/<path:genre_name>", where "genre_name" is a dynamic parameter.
         - The user must be logged in to access this page.
         - The genre name in the URL can contain hyphens, which are converted to spaces and capitalized.
+        - Supports conditional GET; the page only changes with the catalog or its templates.
 
     Example:
         - If the user visits "/action-movies", the genre_name will be "action movies".
@@ -36,18 +46,21 @@ def category(genre_name):
 
         # Log the category page request
         logger.info(
-            f"Category page requested for genre: {genre_name} by user: {current_user.username}"
+            "Category page requested for genre: %s by user: %s",
+            genre_name,
+            current_user.username,
         )
 
         # Filter movies by the specified genre
         movies = filter_movies_by_genre(genre_name)
-        logger.debug(f"Filtered movies length: {len(movies)}")
+        logger.debug("Filtered movies length: %s", len(movies))
 
         # Render the category page template
-        return render_template("category.html", movies=movies, genre=genre_name)
+        return render_page("category.html", movies=movies, genre=genre_name)
     except Exception as e:
         # Log the error and display an error message
-        logger.error(f"Error occurred while rendering category page: {str(e)}")
-        return render_template(
-            "error.html", error_message="Oops! Something went wrong."
+        logger.error("Error occurred while rendering category page: %s", e)
+        return (
+            render_template("error.html", error_message="Oops! Something went wrong."),
+            500,
         )
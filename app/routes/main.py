@@ -1,16 +1,23 @@
-from flask import render_template, jsonify
+from flask import render_template, jsonify, current_app, request
+from contextlib import nullcontext
+from datetime import datetime
 from flask_login import current_user, login_required
 from app.utils.recommendation import recommended_movies, recommend_movies_based_on_genre
-from app.models import UserHistory
-from logger import logger
+from app.utils.rendering import is_streamed, render_page
+from logger import get_logger
 from app.routes import main_bp
-from app import db
+from app.utils.rails import rail_executor
+from app.utils.timing import record_span, span
+from app.utils.visited import get_visited_movies
 from app.utils.helper import (
     popular_movies,
     latest_movies,
     movie_response,
-    most_watched_genres,
+    homepage_genres,
 )
+import logging
+
+logger = get_logger(__name__)
 
 
 @main_bp.route("/")
@@ -32,82 +39,110 @@ def index():
     Notes:
         - Requires the user to be logged in to access the index page.
         - Logs the request for the index page.
-        - Retrieves visited movies from the database for the current user.
+        - Retrieves the HOMEPAGE_HISTORY_LIMIT most recent visited movies for the
+          current user; only the HOMEPAGE_RECENT_LIMIT most recent are shown.
         - Retrieves popular and latest movies excluding the visited ones.
         - Generates recommendations based on the user's history.
         - Includes recommendations based on the user's most-watched genres.
+        - Builds the independent rails concurrently on the rail executor.
+        - With HOMEPAGE_DEFERRED_RAILS, leaves the recommendation rails to the
+          /rails endpoints so the page renders without waiting for them.
+        - Times the history query, genre selection, each rail and the render
+          as Server-Timing spans.
     """
     try:
         # Log the index page request
-        logger.info(f"Index page requested by user: {current_user.username}")
+        logger.info("Index page requested by user: %s", current_user.username)
 
         # Fetch visited movies from the database, ordered by watched_at
-        visited_movie_id = (
-            db.session.query(UserHistory.movie_id, UserHistory.watched_at)
-            .filter_by(user_id=current_user.id)
-            .order_by(UserHistory.watched_at.desc())
-            .all()
-        )
-        logger.debug(f"Visited movies fetched: {len(visited_movie_id)}")
-
-        # Get detailed information for visited movies
-        visited_movie = [movie_response(movie_id) for movie_id, _ in visited_movie_id]
-        logger.debug(f"Fetched visited movies: {len(visited_movie)}")
-
-        # Get popular movies (excluding visited ones)
-        popular_movie = popular_movies(already_watched=visited_movie_id)
-        logger.debug(f"Got popular movies: {len(popular_movie)}")
+        with span("history"):
+            visited_movie_id = get_visited_movies(
+                current_user.id, limit=current_app.config["HOMEPAGE_HISTORY_LIMIT"]
+            )
 
-        # Get latest movies (excluding visited ones)
-        latest_movie = latest_movies(already_watched=visited_movie_id)
-        logger.debug(f"Got latest movies: {len(latest_movie)}")
+        # Only the most recent movies are shown in the "recently watched" rail
+        visited_movie = [
+            movie_response(movie_id)
+            for movie_id, _ in visited_movie_id[
+                : current_app.config["HOMEPAGE_RECENT_LIMIT"]
+            ]
+        ]
+        logger.debug("Fetched visited movies: %s", len(visited_movie))
+
+        # Pick the two genres to recommend from
+        with span("genres"):
+            most_watched_genres_name = homepage_genres(user_id=current_user.id)
+
+        # The rails are independent of each other, so build them concurrently.
+        # With deferred rails the recommenders are left to the /rails endpoints.
+        deferred_rails = current_app.config["HOMEPAGE_DEFERRED_RAILS"]
+        rails = {
+            "popular": rail_executor.submit(
+                "popular", popular_movies, visited_movie_id
+            ),
+            "latest": rail_executor.submit("latest", latest_movies, visited_movie_id),
+        }
+        if visited_movie and not deferred_rails:
+            rails["because_you_watch"] = rail_executor.submit(
+                "because_you_watch",
+                recommended_movies,
+                visited_movie_id[0][0],
+                visited_movie_id,
+            )
+        if not deferred_rails:
+            for index, genre in enumerate(most_watched_genres_name):
+                rails[f"genre_{index}"] = rail_executor.submit(
+                    f"genre_{index}",
+                    recommend_movies_based_on_genre,
+                    genre,
+                    visited_movie_id,
+                )
+        with span("rails"):
+            results, timings = rail_executor.gather(rails)
+        for name, elapsed in timings.items():
+            record_span(f"rail.{name}", elapsed)
+        if logger.isEnabledFor(logging.DEBUG):
+            built = ", ".join(
+                f"{name}={len(results[name])} ({timings.get(name, 0) * 1000:.1f} ms)"
+                for name in rails
+            )
+            logger.debug("Rails built: %s", built)
+
+        popular_movie = results["popular"]
+        latest_movie = results["latest"]
+        because_you_watch = results.get("because_you_watch", [])
+        most_watched_genres_movie = [
+            results.get("genre_0", []),
+            results.get("genre_1", []),
+        ]
 
         # Extract release year from release date for latest movies
         for movie in latest_movie:
             release_date = movie.get("release_date", "")
             release_year = release_date.split("-")[0] if release_date else ""
             movie["release_year"] = release_year
-        logger.debug(f"Got latest movies with release year: {len(latest_movie)}")
 
-        # Generate recommendations based on the user's history
-        because_you_watch = []
-        if visited_movie:
-            because_you_watch = recommended_movies(
-                visited_movie_id[0][0], already_watched=visited_movie_id
+        # A streamed page renders after the view returns, so a span here would
+        # only time building the generator
+        with nullcontext() if is_streamed("index.html") else span("render"):
+            return render_page(
+                "index.html",
+                popular_movie=popular_movie,
+                latest_movie=latest_movie,
+                visited_movie=visited_movie,
+                watched_title=visited_movie[0]["title"] if visited_movie else None,
+                because_you_watch=because_you_watch,
+                most_watched_genres_name=most_watched_genres_name,
+                recommendations_by_genre=most_watched_genres_movie,
+                deferred_rails=deferred_rails,
             )
-        logger.debug(f"Got recommendations based on history: {len(because_you_watch)}")
-
-        # Recommend movies based on the user's most-watched genres
-        most_watched_genres_name = most_watched_genres()
-        default_genre = ['Action', 'Comedy']
-        if not most_watched_genres_name:
-            most_watched_genres_name.extend(default_genre)
-        most_watched_genres_movie = [[], []]
-        for index, genre in enumerate(most_watched_genres_name[:2]):
-            most_watched_genres_movie[index] = recommend_movies_based_on_genre(
-                genre, visited_movie_id
-            )
-        logger.debug(
-            f"Got recommendations by genre for {most_watched_genres_name[0]}: {len(most_watched_genres_movie[0])}, for {most_watched_genres_name[1]}: {len(most_watched_genres_movie[1])}"
-        )
-
-        return render_template(
-            "index.html",
-            popular_movie=popular_movie,
-            latest_movie=latest_movie,
-            visited_movie=visited_movie,
-            watched_title=visited_movie[0]["title"] if visited_movie else None,
-            because_you_watch=because_you_watch,
-            most_watched_genres_name=most_watched_genres_name,
-            recommendations_by_genre=most_watched_genres_movie,
-        )
 
     except Exception as e:
         # Handle any errors that occur during rendering
         error_message = (
             "An error occurred while rendering the index page. Please try again later."
         )
-        logger.error(f"{error_message} Error: {str(e)}")
+        logger.error("%s Error: %s", error_message, e)
         return render_template("error.html", error_message=error_message), 500
 
 
@@ -115,31 +150,46 @@ def index():
 @login_required
 def visited_movies():
     """
-    Retrieve the list of movies visited by the current user.
+    Retrieve a page of the movies visited by the current user.
+
+    Query Parameters:
+        before (str, optional): ISO timestamp; only entries watched before it
+            are returned. Use the previous page's `next_before`.
+        limit (int, optional): Page size, capped at HISTORY_PAGE_MAX.
 
     Returns:
-        JSON: Response containing the list of visited movies.
+        JSON: Response containing the page of visited movies and the cursor of
+        the next page (null on the last page).
 
     Raises:
         Exception: If an error occurs during retrieval.
 
     Notes:
         - Logs the request for retrieving visited movies.
-        - Retrieves visited movies from the database for the current user.
+        - Uses keyset pagination on watched_at, so every page costs the same
+          however long the history is.
         - Formats the visited movies data for JSON response.
     """
     try:
         # Log the request for visited movies
-        logger.info(f"Visited movies page requested by user: {current_user.username}")
-
-        # Fetch visited movies from the database
-        visited_movies = (
-            db.session.query(UserHistory.movie_id, UserHistory.watched_at)
-            .filter_by(user_id=current_user.id)
-            .order_by(UserHistory.watched_at.desc())
-            .all()
+        logger.info("Visited movies page requested by user: %s", current_user.username)
+
+        page_max = current_app.config.get("HISTORY_PAGE_MAX", 200)
+        limit = request.args.get(
+            "limit", current_app.config.get("HISTORY_PAGE_SIZE", 50), type=int
+        )
+        limit = min(max(limit, 1), page_max)
+        before = request.args.get("before")
+        try:
+            before = datetime.fromisoformat(before) if before else None
+        except ValueError:
+            return jsonify({"error": "Invalid 'before' timestamp"}), 400
+
+        # Fetch one page of visited movies
+        visited_movies = get_visited_movies(
+            current_user.id, limit=limit, before=before
         )
-        logger.debug(f"Visited movies fetched: {len(visited_movies)}")
+        logger.debug("Visited movies fetched: %s", len(visited_movies))
 
         # Convert visited movies data to JSON format
         visited_movie_list = [
@@ -149,14 +199,20 @@ def visited_movies():
             }
             for movie_id, watched_at in visited_movies
         ]
-        logger.debug(f"Visited movies JSON response: {len(visited_movie_list)}")
+        logger.debug("Visited movies JSON response: %s", len(visited_movie_list))
 
-        return jsonify({"visited_movies": visited_movie_list})
+        # The cursor keeps full precision so entries in the same second aren't skipped
+        next_before = (
+            visited_movies[-1][1].isoformat() if len(visited_movies) == limit else None
+        )
+        return jsonify(
+            {"visited_movies": visited_movie_list, "next_before": next_before}
+        )
 
     except Exception as e:
         # Handle any errors that occur during retrieval
         error_message = (
             "An error occurred while retrieving visited movies. Please try again later."
         )
-        logger.error(f"{error_message} Error: {str(e)}")
+        logger.error("%s Error: %s", error_message, e)
         return jsonify({"error": error_message}), 500
@@ -1,13 +1,30 @@
-from flask import render_template, jsonify, session, redirect, url_for, request
+from flask import (
+    current_app,
+    render_template,
+    jsonify,
+    session,
+    redirect,
+    url_for,
+    request,
+)
 from flask_login import current_user, login_required
 from app.routes import movie_bp
 from datetime import datetime
-from app.utils.helper import movie_response, get_movie_id_by_name, get_movie_trailer
+from app.utils.helper import movie_response, get_movie_id_by_name
 from app.utils.recommendation import recommended_movies
-from app.models import UserHistory, UserRating
-from logger import logger
-from app.utils.visited import add_movie_rating, add_visited_movie
-from app import db
+from app.models import UserRating
+from logger import get_logger
+from app.utils.visited import (
+    add_movie_rating,
+    add_visited_movie,
+    get_visited_movies,
+)
+from app.utils.http_cache import catalog_cached
+from app.utils.trailer_cache import embed_url, get_cached_trailer, trailer_url
+from app.utils.trailer_lookup import trailer_lookup
+from app.utils.timing import span
+
+logger = get_logger(__name__)
 
 
 @movie_bp.route("/<path:movie_name>")
@@ -31,58 +48,76 @@ def movie(movie_name):
         - Retrieves visited movies from the database for the current user.
         - Retrieves detailed information for the specified movie using the movie's ID.
         - Formats the movie's release date for display.
-        - Retrieves and embeds the movie's trailer.
+        - Embeds the movie's trailer if it is already cached; otherwise the page
+          loads it from the `trailer` endpoint so YouTube latency never delays rendering.
         - Fetches the user's rating for the movie, if available.
         - Renders the 'movie.html' template with movie details and recommended movies.
+        - Times each stage as a Server-Timing span.
     """
     try:
         logger.info(
-            f"Movie page requested for: {movie_name} by user: {current_user.username}"
+            "Movie page requested for: %s by user: %s",
+            movie_name,
+            current_user.username,
         )
 
-        # Fetch visited movies from the database, ordered by watched_at
-        visited_movie_id = (
-            db.session.query(UserHistory.movie_id, UserHistory.watched_at)
-            .filter_by(user_id=current_user.id)
-            .order_by(UserHistory.watched_at.desc())
-            .all()
-        )
-        logger.debug(f"Visited movies fetched: {len(visited_movie_id)}")
+        # Fetch visited movies, ordered by watched_at
+        with span("history"):
+            visited_movie_id = get_visited_movies(
+                current_user.id, limit=current_app.config["HOMEPAGE_HISTORY_LIMIT"]
+            )
+        logger.debug("Visited movies fetched: %s", len(visited_movie_id))
 
         movie_id = get_movie_id_by_name(movie_name)
-        movie = movie_response(movie_id=movie_id)
+        # Copy so the display fields below don't leak into the shared catalog
+        movie = dict(movie_response(movie_id=movie_id))
         movie["release"] = datetime.strptime(
             movie["release_date"], "%Y-%m-%d"
         ).strftime("%d %B %Y")
 
-        movie["trailer"] = get_movie_trailer(movie_id)
-        video_id = movie["trailer"].split("v=")[1]
-
-        movie["embed_trailer"] = "https://www.youtube.com/embed/" + f"{video_id}"
+        with span("trailer"):
+            hit, video_id = get_cached_trailer(movie_id)
+        if hit and video_id:
+            movie["trailer"] = trailer_url(video_id)
+            movie["embed_trailer"] = embed_url(video_id)
+        else:
+            movie["embed_trailer"] = None
 
         # Fetch user rating if it exists
-        user_rating = UserRating.query.filter_by(
-            user_id=current_user.id, movie_id=int(float(movie_id))
-        ).first()
+        with span("rating"):
+            user_rating = UserRating.query.filter_by(
+                user_id=current_user.id, movie_id=int(float(movie_id))
+            ).first()
         rating = user_rating.rating if user_rating else 0
 
         if user_rating:
             rating = user_rating.rating
-            logger.debug(f"User {current_user.username} already rated movie {movie_name} with rating {rating}.")
+            logger.debug(
+                "User %s already rated movie %s with rating %s.",
+                current_user.username,
+                movie_name,
+                rating,
+            )
         else:
             rating = 0
-            logger.debug(f"User {current_user.username} has not rated movie {movie_name} yet.")
+            logger.debug(
+                "User %s has not rated movie %s yet.", current_user.username, movie_name
+            )
 
-        return render_template(
-            "movie.html",
-            movie=movie,
-            recommended_movie=recommended_movies(
+        with span("recommendations"):
+            recommended_movie = recommended_movies(
                 movie_id, already_watched=visited_movie_id
-            ),
-            rating=rating,
-        )
+            )
+
+        with span("render"):
+            return render_template(
+                "movie.html",
+                movie=movie,
+                recommended_movie=recommended_movie,
+                rating=rating,
+            )
     except Exception as e:
-        logger.error(f"Error occurred while rendering movie page: {str(e)}")
+        logger.error("Error occurred while rendering movie page: %s", e)
         return render_template(
             "error.html", error_message="Oops! Something went wrong."
         )
@@ -113,7 +148,9 @@ def history(movie_id):
     try:
         if add_visited_movie(movie_id):
             logger.info(
-                f"Movie with ID: {movie_id} was added to the history by user: {current_user.username}"
+                "Movie with ID: %s was added to the history by user: %s",
+                movie_id,
+                current_user.username,
             )
             return jsonify({"message": "Movie added to history successfully"})
         else:
@@ -121,11 +158,12 @@ def history(movie_id):
 
     except Exception as e:
         error_message = "An error occurred while processing your request."
-        logger.error(f"{error_message} Error: {str(e)}")
+        logger.error("%s Error: %s", error_message, e)
         return jsonify({"error": error_message}), 500
 
 
 @movie_bp.route("/<int:movie_id>")
+@catalog_cached(lambda movie_id: ("movie", movie_id))
 def movie_detail(movie_id):
     """
     Retrieve details for the specified movie ID.
@@ -143,20 +181,73 @@ def movie_detail(movie_id):
         - Logs the request for retrieving movie details.
         - Calls the `movie_response` function to fetch movie details.
         - Returns a JSON response with movie details.
+        - Supports conditional GET; the ETag depends only on the catalog version and the movie ID.
         - Renders an error page if the process fails.
     """
     try:
         logger.info(
-            f"Movie details page requested for ID: {movie_id} by user: {current_user.username}"
+            "Movie details page requested for ID: %s by user: %s",
+            movie_id,
+            current_user.username,
         )
         movie_details = movie_response(movie_id)
-        logger.debug(f"Movie details fetched for ID {movie_id}")
+        logger.debug("Movie details fetched for ID %s", movie_id)
         return jsonify(movie_details)
     except Exception as e:
-        logger.error(f"Error occurred while fetching movie details: {str(e)}")
-        return render_template(
-            "error.html", error_message="Oops! Something went wrong."
+        logger.error("Error occurred while fetching movie details: %s", e)
+        return (
+            render_template("error.html", error_message="Oops! Something went wrong."),
+            500,
+        )
+
+
+@movie_bp.route("/<int:movie_id>/trailer")
+@login_required
+def trailer(movie_id):
+    """
+    Resolve the trailer for the specified movie ID.
+
+    Args:
+        movie_id (int): The unique identifier of the movie.
+
+    Returns:
+        JSON: The lookup status and, once resolved, the trailer's URLs.
+
+    Notes:
+        - Serves the trailer from the cache when possible.
+        - On a miss, waits at most TRAILER_LOOKUP_TIMEOUT for the YouTube search.
+        - Returns status "pending" with a 202 if the search is still running;
+          the client polls again and joins the same search.
+        - Returns status "unavailable" if no trailer was found.
+    """
+    try:
+        if not movie_response(movie_id):
+            return jsonify({"error": "Movie not found"}), 404
+
+        with span("trailer"):
+            status, video_id = trailer_lookup.lookup(movie_id)
+        logger.debug("Trailer for movie ID %s: %s", movie_id, status)
+        if status == "pending":
+            response = jsonify({"movie_id": movie_id, "status": status})
+            response.status_code = 202
+            response.headers["Retry-After"] = "2"
+            return response
+        if status == "unavailable":
+            return jsonify({"movie_id": movie_id, "status": status})
+        return jsonify(
+            {
+                "movie_id": movie_id,
+                "status": status,
+                "video_id": video_id,
+                "url": trailer_url(video_id),
+                "embed_url": embed_url(video_id),
+            }
+        )
+    except Exception as e:
+        logger.error(
+            "Error occurred while fetching trailer for movie %s: %s", movie_id, e
         )
+        return jsonify({"error": "Failed to load trailer"}), 500
 
 
 @movie_bp.route("/rating/<int:movie_id>/<int:stars>", methods=["POST"])
@@ -187,7 +278,10 @@ def rate_movie(movie_id, stars):
         if 1 <= stars <= 5:
             if add_movie_rating(movie_id, stars):
                 logger.info(
-                    f"User {current_user.username} rated movie {movie_id} with {stars} stars"
+                    "User %s rated movie %s with %s stars",
+                    current_user.username,
+                    movie_id,
+                    stars,
                 )
                 return jsonify(
                     {
@@ -197,16 +291,21 @@ def rate_movie(movie_id, stars):
                 )
             else:
                 logger.error(
-                    f"Failed to add/update rating for movie {movie_id} by user {current_user.username}"
+                    "Failed to add/update rating for movie %s by user %s",
+                    movie_id,
+                    current_user.username,
                 )
                 return jsonify({"error": "Failed to add/update rating"}), 500
         else:
             logger.error(
-                f"Invalid rating value {stars} for movie {movie_id} by user {current_user.username}"
+                "Invalid rating value %s for movie %s by user %s",
+                stars,
+                movie_id,
+                current_user.username,
             )
             return jsonify({"error": "Invalid rating value"}), 400
     except Exception as e:
-        logger.error(f"Error while processing rating for movie {movie_id}: {e}")
+        logger.error("Error while processing rating for movie %s: %s", movie_id, e)
         return (
             jsonify({"error": "An error occurred while processing your rating."}),
             500,
@@ -0,0 +1,135 @@
+from flask import current_app, jsonify
+from flask_login import current_user, login_required
+from app.routes import rails_bp
+from app.utils.fragments import fragment_cache
+from app.utils.helper import genre_names, latest_movies, movie_response, popular_movies
+from app.utils.recommendation import recommended_movies, recommend_movies_based_on_genre
+from app.utils.visited import get_visited_movies
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def rail_response(rail, movies, template="rails/slider.html", **extra):
+    """
+    Build the JSON payload for a homepage rail.
+
+    Args:
+        rail (str): The name of the rail.
+        movies (list): The movies in the rail, in display order.
+        template (str): The fragment template used to render the rail.
+        **extra: Additional fields to include in the payload.
+
+    Returns:
+        Response: JSON containing the rail's movies and its rendered HTML.
+    """
+    return jsonify(
+        {
+            "rail": rail,
+            "movies": [
+                {
+                    "id": movie.get("id"),
+                    "title": movie.get("title"),
+                    "poster_path": movie.get("poster_path"),
+                    "release_date": movie.get("release_date"),
+                    "vote_average": movie.get("vote_average"),
+                }
+                for movie in movies
+            ],
+            "html": str(fragment_cache.render(template, movies)),
+            **extra,
+        }
+    )
+
+
+def _recent_history():
+    # The same bounded history the homepage uses, however long the account's is
+    return get_visited_movies(
+        current_user.id, limit=current_app.config["HOMEPAGE_HISTORY_LIMIT"]
+    )
+
+
+@rails_bp.route("/popular")
+@login_required
+def popular():
+    """
+    Retrieve the popular movies rail for the current user.
+
+    Returns:
+        JSON: The rail's movies and rendered HTML.
+    """
+    try:
+        visited_movie_id = _recent_history()
+        return rail_response("popular", popular_movies(visited_movie_id))
+    except Exception as e:
+        logger.error("Error occurred while building popular rail: %s", e)
+        return jsonify({"error": "Failed to load rail"}), 500
+
+
+@rails_bp.route("/latest")
+@login_required
+def latest():
+    """
+    Retrieve the latest movies rail for the current user.
+
+    Returns:
+        JSON: The rail's movies and rendered HTML.
+    """
+    try:
+        visited_movie_id = _recent_history()
+        return rail_response(
+            "latest", latest_movies(visited_movie_id), template="rails/grid.html"
+        )
+    except Exception as e:
+        logger.error("Error occurred while building latest rail: %s", e)
+        return jsonify({"error": "Failed to load rail"}), 500
+
+
+@rails_bp.route("/because-you-watched")
+@login_required
+def because_you_watched():
+    """
+    Retrieve recommendations based on the movie the current user watched last.
+
+    Returns:
+        JSON: The rail's movies, rendered HTML and the title of the watched movie.
+    """
+    try:
+        visited_movie_id = _recent_history()
+        if not visited_movie_id:
+            return rail_response("because-you-watched", [])
+
+        last_watched_id = visited_movie_id[0][0]
+        return rail_response(
+            "because-you-watched",
+            recommended_movies(last_watched_id, already_watched=visited_movie_id),
+            watched_title=movie_response(last_watched_id).get("title"),
+        )
+    except Exception as e:
+        logger.error("Error occurred while building because-you-watched rail: %s", e)
+        return jsonify({"error": "Failed to load rail"}), 500
+
+
+@rails_bp.route("/genre/<path:genre_name>")
+@login_required
+def genre(genre_name):
+    """
+    Retrieve genre-based recommendations for the current user.
+
+    Args:
+        genre_name (str): The genre slug extracted from the URL path.
+
+    Returns:
+        JSON: The rail's movies and rendered HTML.
+    """
+    try:
+        genre_name = genre_names.get(genre_name)
+        if genre_name is None:
+            return jsonify({"error": "Unknown genre"}), 404
+        visited_movie_id = _recent_history()
+        movies = recommend_movies_based_on_genre(genre_name, visited_movie_id)
+        logger.debug("Genre rail for %s: %s movies", genre_name, len(movies))
+        return rail_response(f"genre/{genre_name}", movies)
+    except Exception as e:
+        logger.error("Error occurred while building genre rail: %s", e)
+        return jsonify({"error": "Failed to load rail"}), 500
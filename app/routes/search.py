@@ -2,11 +2,20 @@ from flask import render_template, redirect, url_for
 from flask_login import current_user, login_required
 from app.routes import search_bp
 from app.utils.helper import perform_search
-from logger import logger
+from app.utils.http_cache import catalog_cached
+from app.utils.rendering import render_page
+from logger import get_logger
+
+logger = get_logger(__name__)
 
 
 @search_bp.route("/<query>")
 @login_required
+@catalog_cached(
+    lambda query: ("search", query),
+    templates=("search.html", "layout.html", "menu.html"),
+    private=True,
+)
 def search(query):
     """
     Render the search results page for the specified query.
@@ -25,26 +34,30 @@ def search(query):
         - Logs the request for the search page.
         - Performs a search based on the query.
         - Renders the 'search.html' template with search results.
+        - Supports conditional GET; results only change with the catalog or its templates.
     """
     try:
         # Log the search page request
         logger.info(
-            f"Search page requested for query: {query} by user: {current_user.username}"
+            "Search page requested for query: %s by user: %s",
+            query,
+            current_user.username,
         )
 
         # Perform search based on the query
         search_results = perform_search(query)
-        logger.debug(f"Search results length: {len(search_results)}")
+        logger.debug("Search results length: %s", len(search_results))
 
         # Render the search results page
-        return render_template(
+        return render_page(
             "search.html",
             query=(" ".join(query.split("-"))),
             search_result=search_results,
         )
     except Exception as e:
         # Log the error and display an error message
-        logger.error(f"Error occurred while performing search: {str(e)}")
-        return render_template(
-            "error.html", error_message="Oops! Something went wrong."
+        logger.error("Error occurred while performing search: %s", e)
+        return (
+            render_template("error.html", error_message="Oops! Something went wrong."),
+            500,
         )
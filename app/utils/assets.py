@@ -0,0 +1,320 @@
+from flask import abort, current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+from logger import get_logger
+import mimetypes
+import hashlib
+import click
+import gzip
+import json
+import os
+import re
+import time
+
+logger = get_logger(__name__)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; only .gz variants are built without it
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+PRECOMPRESS_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+
+SOURCE_MAP_COMMENT = re.compile(rb"\n?(//|/\*)# sourceMappingURL=[^\n]*")
+CSS_COMMENT = re.compile(rb"/\*.*?\*/", re.S)
+CSS_WHITESPACE = re.compile(rb"\s+")
+CSS_PUNCTUATION = re.compile(rb"\s*([{};,])\s*")
+
+
+def minify_css(data):
+    """
+    Minify a stylesheet.
+
+    Uses rcssmin when installed, otherwise strips comments and collapses
+    whitespace around block punctuation.
+
+    Args:
+        data (bytes): The stylesheet.
+
+    Returns:
+        bytes: The minified stylesheet.
+    """
+    if rcssmin is not None:
+        return rcssmin.cssmin(data)
+    data = CSS_COMMENT.sub(b"", data)
+    data = CSS_WHITESPACE.sub(b" ", data)
+    return CSS_PUNCTUATION.sub(rb"\1", data).strip()
+
+
+def minify_js(data):
+    """
+    Minify a script.
+
+    Uses rjsmin when installed; without it scripts are only stripped of
+    source map references, as regex-minifying JavaScript is not safe.
+
+    Args:
+        data (bytes): The script.
+
+    Returns:
+        bytes: The minified script.
+    """
+    if rjsmin is not None:
+        return rjsmin.jsmin(data)
+    return data
+
+
+def build_assets(static_folder):
+    """
+    Minify, fingerprint and precompress every file under the static folder.
+
+    Output goes to ``<static>/dist``, with the content hash in each file name,
+    ``.gz`` and ``.br`` siblings for text assets and a manifest mapping the
+    original path to the fingerprinted one. Source maps are not published.
+    Files from earlier builds are kept, since running workers and cached pages
+    still reference them; `prune_dist` removes them once they are old enough.
+
+    Args:
+        static_folder (str): The application's static folder.
+
+    Returns:
+        dict: The manifest.
+    """
+    dist_folder = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_folder]
+        for name in sorted(files):
+            if name.endswith(".map"):
+                continue
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            stem, ext = os.path.splitext(logical)
+
+            with open(source, "rb") as f:
+                data = f.read()
+            if ext in (".css", ".js"):
+                data = SOURCE_MAP_COMMENT.sub(b"", data)
+                if ".min" not in stem:
+                    data = minify_css(data) if ext == ".css" else minify_js(data)
+
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            hashed = f"{stem}.{digest}{ext}"
+            target = os.path.join(dist_folder, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+
+            if ext in PRECOMPRESS_EXTENSIONS:
+                with open(target + ".gz", "wb") as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target + ".br", "wb") as f:
+                        f.write(brotli.compress(data, quality=11))
+
+            manifest[logical] = f"{DIST_DIR}/{hashed}"
+            logger.debug("Built asset %s -> %s", logical, manifest[logical])
+
+    os.makedirs(dist_folder, exist_ok=True)
+    with open(os.path.join(dist_folder, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    logger.info("Built %s assets into %s", len(manifest), dist_folder)
+    return manifest
+
+
+def prune_dist(dist_folder, manifest, max_age):
+    """
+    Delete old built files that the manifest no longer references.
+
+    A build rewrites every file it references, so an unreferenced file's
+    modification time is when it was last part of a build. Only files that
+    have been out of every build for longer than `max_age` are removed, so
+    pages rendered or cached before a rebuild keep their CSS and JS.
+
+    Args:
+        dist_folder (str): The build output folder.
+        manifest (dict): The current manifest.
+        max_age (float): Seconds an unreferenced file is kept.
+
+    Returns:
+        int: The number of files removed.
+    """
+    cutoff = time.time() - max_age
+    keep = {MANIFEST_NAME}
+    for hashed in manifest.values():
+        path = os.path.relpath(hashed, DIST_DIR).replace("/", os.sep)
+        keep.update({path, path + ".gz", path + ".br"})
+
+    removed = 0
+    for root, dirs, files in os.walk(dist_folder, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            if (
+                os.path.relpath(path, dist_folder) not in keep
+                and os.path.getmtime(path) < cutoff
+            ):
+                os.remove(path)
+                removed += 1
+        if root != dist_folder and not os.listdir(root):
+            os.rmdir(root)
+    logger.info("Removed %s stale files from %s", removed, dist_folder)
+    return removed
+
+
+class Assets:
+    """
+    Serve fingerprinted static assets with long-lived caching.
+
+    Templates call `asset_url` instead of ``url_for('static', ...)``. When a
+    built manifest exists it resolves to the fingerprinted file, which is served
+    as immutable for a year, precompressed when the client accepts it. Without
+    a manifest it falls back to the original file.
+    """
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.hashed = set()
+        self.version = ""
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Load the manifest and register the template helper, static view and CLI.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.config.setdefault("ASSETS_RETENTION_DAYS", 7)
+        self.load_manifest(app.static_folder)
+        app.jinja_env.globals["asset_url"] = self.asset_url
+        app.view_functions["static"] = self.send_static
+        app.cli.add_command(assets_cli)
+        app.extensions["assets"] = self
+
+    def load_manifest(self, static_folder):
+        """
+        Load the asset manifest, if one has been built.
+
+        The manifest's digest becomes `version`, so responses whose pages link
+        to assets can be revalidated when a new build is loaded.
+
+        Args:
+            static_folder (str): The application's static folder.
+        """
+        path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                self.manifest = json.load(f)
+            self.hashed = set(self.manifest.values())
+            self.version = hashlib.sha1(
+                json.dumps(self.manifest, sort_keys=True).encode("utf-8")
+            ).hexdigest()[:12]
+            logger.info("Loaded asset manifest with %s entries", len(self.manifest))
+        except FileNotFoundError:
+            self.manifest, self.hashed, self.version = {}, set(), ""
+            logger.info("No asset manifest found; serving unfingerprinted assets")
+
+    def asset_url(self, filename, **kwargs):
+        """
+        Build the URL of a static asset, using its fingerprinted name if built.
+
+        Args:
+            filename (str): The path of the asset relative to the static folder.
+            **kwargs: Passed on to `url_for`.
+
+        Returns:
+            str: The URL of the asset.
+        """
+        return url_for(
+            "static", filename=self.manifest.get(filename, filename), **kwargs
+        )
+
+    def send_static(self, filename):
+        """
+        Serve a static file, preferring precompressed variants of built assets.
+
+        Args:
+            filename (str): The requested path relative to the static folder.
+
+        Returns:
+            Response: The file response.
+        """
+        if filename.endswith(".map") and not current_app.debug:
+            abort(404)
+
+        if filename not in self.hashed:
+            return current_app.send_static_file(filename)
+
+        static_folder = current_app.static_folder
+        mimetype, _ = mimetypes.guess_type(filename)
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if request.accept_encodings[encoding] and os.path.exists(
+                os.path.join(static_folder, filename + suffix)
+            ):
+                response = send_from_directory(
+                    static_folder, filename + suffix, mimetype=mimetype
+                )
+                response.headers["Content-Encoding"] = encoding
+                break
+        else:
+            response = send_from_directory(static_folder, filename)
+
+        response.vary.add("Accept-Encoding")
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+
+assets_cli = AppGroup("assets", help="Build and manage static assets.")
+
+
+@assets_cli.command("build")
+def build_command():
+    """Minify, fingerprint and precompress the static assets."""
+    manifest = build_assets(current_app.static_folder)
+    current_app.extensions["assets"].load_manifest(current_app.static_folder)
+    click.echo(f"Built {len(manifest)} assets.")
+
+
+@assets_cli.command("prune")
+@click.option(
+    "--days",
+    type=float,
+    default=None,
+    help="Keep unreferenced files this many days (default ASSETS_RETENTION_DAYS).",
+)
+def prune_command(days):
+    """Delete old built files the current manifest no longer references."""
+    if days is None:
+        days = current_app.config["ASSETS_RETENTION_DAYS"]
+    assets = current_app.extensions["assets"]
+    assets.load_manifest(current_app.static_folder)
+    if not assets.manifest:
+        click.echo("No asset manifest; nothing to prune.")
+        return
+    removed = prune_dist(
+        os.path.join(current_app.static_folder, DIST_DIR),
+        assets.manifest,
+        days * 24 * 60 * 60,
+    )
+    click.echo(f"Removed {removed} stale files.")
+
+
+assets = Assets()
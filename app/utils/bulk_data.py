@@ -0,0 +1,242 @@
+from flask import current_app
+from flask.cli import AppGroup
+from datetime import datetime
+from sqlalchemy import select
+from app.models import UserHistory, UserRating
+from app.utils.upsert import upsert_many
+from logger import get_logger
+from app import db
+import click
+import json
+import time
+import csv
+import io
+
+logger = get_logger(__name__)
+
+FORMATS = ("csv", "jsonl")
+MIMETYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def _parse_rating(value):
+    rating = int(value)
+    if not 1 <= rating <= 5:
+        raise ValueError(f"rating {rating} is not between 1 and 5")
+    return rating
+
+
+def _parse_datetime(value):
+    # Missing timestamps default to now, as for rows created by the app
+    return datetime.fromisoformat(value) if value else datetime.utcnow()
+
+
+# Exportable tables: model, columns in file order, column parsers and the
+# columns overwritten when an imported row already exists
+DATASETS = {
+    "history": {
+        "model": UserHistory,
+        "columns": ("user_id", "movie_id", "watched_at"),
+        "parsers": {"user_id": int, "movie_id": int, "watched_at": _parse_datetime},
+        "update": ("watched_at",),
+    },
+    "ratings": {
+        "model": UserRating,
+        "columns": ("user_id", "movie_id", "rating", "rated_at"),
+        "parsers": {
+            "user_id": int,
+            "movie_id": int,
+            "rating": _parse_rating,
+            "rated_at": _parse_datetime,
+        },
+        "update": ("rating", "rated_at"),
+    },
+}
+
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def iter_rows(dataset, chunk_size=5000):
+    """
+    Stream every row of a dataset in primary key order.
+
+    Rows are fetched through a server-side cursor where the driver supports
+    one, `chunk_size` at a time, so memory use does not grow with the table.
+
+    Args:
+        dataset (str): "history" or "ratings".
+        chunk_size (int): Rows fetched per round trip.
+
+    Yields:
+        list: Chunks of rows as tuples in the dataset's column order.
+    """
+    spec = DATASETS[dataset]
+    model = spec["model"]
+    statement = select(*(getattr(model, column) for column in spec["columns"]))
+    statement = statement.order_by(model.id).execution_options(
+        stream_results=True, yield_per=chunk_size
+    )
+    for partition in db.session.execute(statement).partitions(chunk_size):
+        yield partition
+
+
+def export_chunks(dataset, fmt, chunk_size=5000):
+    """
+    Serialise a dataset as CSV or JSON lines, one chunk of rows at a time.
+
+    Args:
+        dataset (str): "history" or "ratings".
+        fmt (str): "csv" or "jsonl".
+        chunk_size (int): Rows per chunk.
+
+    Yields:
+        str: The serialised chunks; the CSV header comes first.
+    """
+    columns = DATASETS[dataset]["columns"]
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        yield buffer.getvalue()
+
+    exported = 0
+    for rows in iter_rows(dataset, chunk_size):
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerows([[_serialize(value) for value in row] for row in rows])
+            yield buffer.getvalue()
+        else:
+            yield "".join(
+                json.dumps(dict(zip(columns, map(_serialize, row)))) + "\n"
+                for row in rows
+            )
+        exported += len(rows)
+    logger.info("Exported %s %s rows as %s", exported, dataset, fmt)
+
+
+def parse_records(dataset, lines, fmt):
+    """
+    Parse CSV or JSON lines into rows of a dataset.
+
+    Args:
+        dataset (str): "history" or "ratings".
+        lines (iterable): Text lines of the input; CSV input starts with a header.
+        fmt (str): "csv" or "jsonl".
+
+    Yields:
+        tuple: (line_number, row dict) for valid records, or (line_number, None)
+        for records that could not be parsed.
+    """
+    parsers = DATASETS[dataset]["parsers"]
+    if fmt == "csv":
+        records = enumerate(csv.DictReader(lines), start=2)
+    else:
+        records = enumerate(lines, start=1)
+
+    for number, record in records:
+        try:
+            if fmt == "jsonl":
+                if not record.strip():
+                    continue
+                record = json.loads(record)
+            yield number, {
+                column: parse(record.get(column)) for column, parse in parsers.items()
+            }
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.warning(
+                "Skipping invalid %s record on line %s: %s", dataset, number, e
+            )
+            yield number, None
+
+
+def import_records(dataset, records, batch_size=5000):
+    """
+    Upsert parsed rows into a dataset in batches.
+
+    Each batch is written with one bulk ``INSERT ... ON CONFLICT DO UPDATE``
+    and committed on its own, so memory stays bounded and a failure only
+    loses the current batch. Existing (user_id, movie_id) pairs are updated.
+
+    Args:
+        dataset (str): "history" or "ratings".
+        records (iterable): (line_number, row) pairs as produced by `parse_records`.
+        batch_size (int): Rows per transaction.
+
+    Returns:
+        dict: Rows imported, rows rejected and throughput.
+    """
+    spec = DATASETS[dataset]
+    stats = {"imported": 0, "rejected": 0}
+    started = time.perf_counter()
+    batch = []
+
+    def write(batch):
+        upsert_many(
+            spec["model"],
+            batch,
+            index_elements=["user_id", "movie_id"],
+            update_columns=list(spec["update"]),
+        )
+        db.session.commit()
+        stats["imported"] += len(batch)
+
+    try:
+        for _, row in records:
+            if row is None:
+                stats["rejected"] += 1
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                write(batch)
+                batch = []
+        if batch:
+            write(batch)
+    except Exception:
+        db.session.rollback()
+        raise
+
+    elapsed = time.perf_counter() - started
+    stats["rows_per_second"] = round(stats["imported"] / elapsed) if elapsed else 0
+    logger.info("Imported %s: %s", dataset, stats)
+    return stats
+
+
+data_cli = AppGroup("data", help="Bulk export and import of ratings and history.")
+
+
+@data_cli.command("export")
+@click.argument("dataset", type=click.Choice(list(DATASETS)))
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="csv")
+@click.option("--output", type=click.File("w"), default="-", help="Defaults to stdout.")
+def export_command(dataset, fmt, output):
+    """Stream a dataset to a file."""
+    chunk_size = current_app.config["BULK_CHUNK_SIZE"]
+    for chunk in export_chunks(dataset, fmt, chunk_size):
+        output.write(chunk)
+
+
+@data_cli.command("import")
+@click.argument("dataset", type=click.Choice(list(DATASETS)))
+@click.argument("source", type=click.File("r"), default="-")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="csv")
+def import_command(dataset, source, fmt):
+    """Upsert a dataset from a file (or stdin)."""
+    stats = import_records(
+        dataset,
+        parse_records(dataset, source, fmt),
+        current_app.config["BULK_CHUNK_SIZE"],
+    )
+    click.echo(json.dumps(stats))
+
+
+def init_bulk_data(app):
+    """
+    Register the bulk data CLI.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.config.setdefault("BULK_CHUNK_SIZE", 5000)
+    app.cli.add_command(data_cli)
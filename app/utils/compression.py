@@ -0,0 +1,175 @@
+from cachetools import LRUCache
+from flask import request
+from logger import get_logger
+import gzip
+import threading
+
+logger = get_logger(__name__)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; only gzip is offered without it
+    brotli = None
+
+
+# Media types worth compressing; images and fonts are already compressed
+COMPRESSIBLE_MIMETYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+}
+
+
+def encoding_etag(etag, encoding):
+    """
+    Get the ETag of a compressed variant of a representation.
+
+    Each content coding is a different representation, so it needs its own
+    strong validator.
+
+    Args:
+        etag (str): The ETag of the uncompressed representation.
+        encoding (str): The content coding ("gzip" or "br").
+
+    Returns:
+        str: The ETag of the compressed variant.
+    """
+    return f"{etag}-{encoding}"
+
+
+class Compressor:
+    """
+    Negotiate gzip/brotli compression of responses.
+
+    Compressed bodies of responses with a strong ETag (e.g. catalog JSON) are
+    kept in an LRU keyed by ETag and coding, so the same bytes are never
+    compressed twice.
+
+    Configuration:
+        COMPRESS_ENABLED (bool): Turn response compression on or off.
+        COMPRESS_MIN_SIZE (int): Responses smaller than this many bytes are sent as-is.
+        COMPRESS_LEVEL (int): gzip compression level.
+        COMPRESS_BR_QUALITY (int): brotli quality.
+        COMPRESS_CACHE_SIZE (int): Number of precompressed bodies to keep.
+    """
+
+    def __init__(self, app=None):
+        self._cache = None
+        self._lock = threading.Lock()
+        self.config = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the compression hook on the application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.config.setdefault("COMPRESS_ENABLED", True)
+        app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+        app.config.setdefault("COMPRESS_LEVEL", 6)
+        app.config.setdefault("COMPRESS_BR_QUALITY", 4)
+        app.config.setdefault("COMPRESS_CACHE_SIZE", 512)
+
+        self.config = app.config
+        self._cache = LRUCache(maxsize=app.config["COMPRESS_CACHE_SIZE"])
+        if app.config["COMPRESS_ENABLED"]:
+            app.after_request(self.after_request)
+        app.extensions["compressor"] = self
+        logger.info(
+            "Response compression %s (brotli %s)",
+            "enabled" if app.config["COMPRESS_ENABLED"] else "disabled",
+            "available" if brotli else "unavailable",
+        )
+
+    @staticmethod
+    def available_encodings():
+        """
+        Get the content codings this server can produce, in preference order.
+
+        Returns:
+            list: The supported codings.
+        """
+        return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    def negotiate(self):
+        """
+        Pick the content coding for the current request.
+
+        Returns:
+            str or None: The chosen coding, or None to send the body as-is.
+        """
+        for encoding in self.available_encodings():
+            if request.accept_encodings[encoding]:
+                return encoding
+        return None
+
+    def compress(self, data, encoding):
+        """
+        Compress a body with the given content coding.
+
+        Args:
+            data (bytes): The body.
+            encoding (str): "gzip" or "br".
+
+        Returns:
+            bytes: The compressed body.
+        """
+        if encoding == "br":
+            return brotli.compress(data, quality=self.config["COMPRESS_BR_QUALITY"])
+        return gzip.compress(data, compresslevel=self.config["COMPRESS_LEVEL"], mtime=0)
+
+    def after_request(self, response):
+        """
+        Compress eligible responses.
+
+        Args:
+            response (Response): The outgoing response.
+
+        Returns:
+            Response: The possibly compressed response.
+        """
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        if (response.content_length or 0) < self.config["COMPRESS_MIN_SIZE"]:
+            return response
+
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        key = (etag, encoding) if etag and not weak else None
+
+        body = None
+        if key is not None:
+            with self._lock:
+                body = self._cache.get(key)
+        if body is None:
+            body = self.compress(response.get_data(), encoding)
+            if key is not None:
+                with self._lock:
+                    self._cache[key] = body
+
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            response.set_etag(encoding_etag(etag, encoding), weak=weak)
+        return response
+
+
+compressor = Compressor()
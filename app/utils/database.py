@@ -0,0 +1,129 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from logger import get_logger
+from app import db
+
+logger = get_logger(__name__)
+
+
+def is_sqlite_file(uri):
+    """
+    Check whether a database URI points at an on-disk SQLite database.
+
+    Args:
+        uri (str): The SQLAlchemy database URI.
+
+    Returns:
+        bool: True for SQLite file databases, False for in-memory SQLite and
+        other backends.
+    """
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and url.database not in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def engine_options(config):
+    """
+    Build the SQLAlchemy engine options for the configured database.
+
+    Pool sizing applies to every backend except in-memory SQLite, which
+    Flask-SQLAlchemy pins to a single shared connection.
+
+    Args:
+        config (dict): The application configuration.
+
+    Returns:
+        dict: Options passed to `create_engine`.
+    """
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+    url = make_url(uri)
+    options = {"pool_pre_ping": config.get("DB_POOL_PRE_PING", True)}
+    if url.get_backend_name() != "sqlite" or is_sqlite_file(uri):
+        options.update(
+            pool_size=config.get("DB_POOL_SIZE", 5),
+            max_overflow=config.get("DB_MAX_OVERFLOW", 10),
+            pool_timeout=config.get("DB_POOL_TIMEOUT", 30),
+            pool_recycle=config.get("DB_POOL_RECYCLE", 1800),
+        )
+    if is_sqlite_file(uri):
+        # The driver's own busy handler, in seconds; the pragma below sets the same
+        options["connect_args"] = {
+            "timeout": config.get("SQLITE_BUSY_TIMEOUT", 5000) / 1000
+        }
+    return options
+
+
+def sqlite_pragmas(config):
+    """
+    List the PRAGMA statements run on every new SQLite connection.
+
+    Settings left empty in the configuration keep SQLite's default.
+
+    Args:
+        config (dict): The application configuration.
+
+    Returns:
+        list: The PRAGMA statements.
+    """
+    pragmas = []
+    if config.get("SQLITE_JOURNAL_MODE"):
+        pragmas.append(f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+    if config.get("SQLITE_SYNCHRONOUS"):
+        pragmas.append(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+    if config.get("SQLITE_BUSY_TIMEOUT") is not None:
+        pragmas.append(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}")
+    if config.get("SQLITE_MMAP_SIZE") is not None:
+        pragmas.append(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+    if config.get("SQLITE_CACHE_SIZE") is not None:
+        pragmas.append(f"PRAGMA cache_size={int(config['SQLITE_CACHE_SIZE'])}")
+    return pragmas
+
+
+def init_database(app):
+    """
+    Initialise Flask-SQLAlchemy with the configured engine profile.
+
+    Engine options come from `engine_options` unless SQLALCHEMY_ENGINE_OPTIONS
+    is set explicitly. On SQLite file databases the `sqlite_pragmas` are run
+    on every new connection, so each pooled connection gets the same settings.
+
+    Configuration:
+        SQLALCHEMY_DATABASE_URI (str): Set from DATABASE_URL to use another database.
+        DB_POOL_SIZE (int): Connections kept in the pool.
+        DB_MAX_OVERFLOW (int): Extra connections allowed under load.
+        DB_POOL_TIMEOUT (int): Seconds to wait for a free connection.
+        DB_POOL_RECYCLE (int): Seconds after which connections are replaced.
+        DB_POOL_PRE_PING (bool): Check connections before handing them out.
+        SQLITE_JOURNAL_MODE (str): e.g. WAL, so readers don't block the writer.
+        SQLITE_SYNCHRONOUS (str): e.g. NORMAL, safe with WAL and far fewer fsyncs.
+        SQLITE_BUSY_TIMEOUT (int): Milliseconds to wait for a lock before failing.
+        SQLITE_MMAP_SIZE (int): Bytes of the database file to memory-map.
+        SQLITE_CACHE_SIZE (int): Page cache size (negative values are KiB).
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+    db.init_app(app)
+
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    if not is_sqlite_file(uri):
+        logger.info("Database backend: %s", make_url(uri).get_backend_name())
+        return
+
+    pragmas = sqlite_pragmas(app.config)
+
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    with app.app_context():
+        event.listen(db.engine, "connect", apply_pragmas)
+    logger.info("SQLite engine profile: %s", "; ".join(pragmas))
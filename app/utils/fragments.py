@@ -0,0 +1,106 @@
+from cachetools import LRUCache
+from flask import current_app, render_template
+from markupsafe import Markup
+from logger import get_logger
+import hashlib
+import threading
+
+logger = get_logger(__name__)
+
+
+class FragmentCache:
+    """
+    Cache rendered HTML fragments for movie rails.
+
+    A rail renders the same markup for every user who gets the same movies, so
+    fragments are keyed by content: the template name, the template version and
+    the ordered list of movie IDs. Identical rails across users then reuse the
+    pre-rendered HTML instead of re-running the template loop.
+
+    Configuration:
+        FRAGMENT_CACHE_ENABLED (bool): Turn fragment caching on or off.
+        FRAGMENT_CACHE_SIZE (int): Maximum number of fragments kept in memory.
+    """
+
+    def __init__(self, app=None):
+        self._cache = None
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Set up the cache and expose `rail_fragment` to templates.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.config.setdefault("FRAGMENT_CACHE_ENABLED", True)
+        app.config.setdefault("FRAGMENT_CACHE_SIZE", 256)
+
+        self._cache = LRUCache(maxsize=app.config["FRAGMENT_CACHE_SIZE"])
+        app.jinja_env.globals["rail_fragment"] = self.render
+        app.extensions["fragment_cache"] = self
+
+    def template_version(self, template_name):
+        """
+        Get a short content hash of a template's source.
+
+        The hash is computed once and only recomputed when Jinja reports the
+        template file as changed, so editing a template invalidates its fragments.
+
+        Args:
+            template_name (str): The name of the template.
+
+        Returns:
+            str: The template version.
+        """
+        cached = self._versions.get(template_name)
+        if cached and cached[1]():
+            return cached[0]
+
+        env = current_app.jinja_env
+        source, _, uptodate = env.loader.get_source(env, template_name)
+        version = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+        self._versions[template_name] = (version, uptodate or (lambda: True))
+        logger.debug("Template %s has version %s", template_name, version)
+        return version
+
+    def render(self, template_name, movies):
+        """
+        Render a rail fragment, reusing a cached copy when one exists.
+
+        Args:
+            template_name (str): The fragment template, rendered with `movies`.
+            movies (list): The movies in the rail, in display order.
+
+        Returns:
+            Markup: The rendered HTML fragment.
+        """
+        if not current_app.config["FRAGMENT_CACHE_ENABLED"]:
+            return Markup(render_template(template_name, movies=movies))
+
+        key = (
+            template_name,
+            self.template_version(template_name),
+            tuple(movie.get("id") for movie in movies),
+        )
+        with self._lock:
+            fragment = self._cache.get(key)
+            if fragment is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if fragment is not None:
+            return fragment
+
+        fragment = Markup(render_template(template_name, movies=movies))
+        with self._lock:
+            self._cache[key] = fragment
+        return fragment
+
+
+fragment_cache = FragmentCache()
@@ -1,14 +1,25 @@
 from flask_login import current_user
 from app.utils import trailer_finder
-from app.models import UserHistory
+from app.utils.trailer_cache import (
+    get_cached_trailer,
+    store_trailer,
+    trailer_url,
+    video_id_from_url,
+)
+from app.utils.singleflight import single_flight
+from app.utils.metrics import metrics
+from app.utils.visited import get_visited_movies
 from collections import Counter
-from logger import logger
+from datetime import datetime, timezone
+from logger import get_logger
 import googleapiclient
-from app import db
+import hashlib
 import pickle
 import re
 import os
 
+logger = get_logger(__name__)
+
 
 def url_slug(title):
     """
@@ -39,23 +50,54 @@ def load_movie_data(file_path):
     try:
         with open(file_path, "rb") as f:
             movies = pickle.load(f)
-        logger.info(f"Loaded movie data from {file_path}")
+        logger.info("Loaded movie data from %s", file_path)
         return movies
     except FileNotFoundError:
-        logger.error(f"File not found: {file_path}")
+        logger.error("File not found: %s", file_path)
         return {}
     except Exception as e:
-        logger.error(f"An error occurred while loading movie data: {e}")
+        logger.error("An error occurred while loading movie data: %s", e)
         return {}
 
 
-# Set the path to the movie dataset
+# Set the path to the movie dataset; MOVIE_DATASET_PATH selects another catalog
 current_dir = os.path.dirname(os.path.realpath(__file__))
-dataset_path = os.path.join(current_dir, "..", "..", "dataset", "movie_api.pkl")
+dataset_path = os.getenv(
+    "MOVIE_DATASET_PATH",
+    os.path.join(current_dir, "..", "..", "dataset", "movie_api.pkl"),
+)
 
 # Load movie data
 movies = load_movie_data(dataset_path)
 
+
+def catalog_stamp(file_path):
+    """
+    Derive a version and modification time for the catalog snapshot.
+
+    The version changes whenever the dataset file is replaced, so it can be
+    used to validate cached catalog responses without looking at their bodies.
+
+    Args:
+        file_path (str): The path to the catalog file.
+
+    Returns:
+        tuple: The catalog version (str) and its last modification time
+        (datetime, or None if the file is missing).
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        logger.error("Unable to stat catalog file: %s", file_path)
+        return "0", None
+    version = hashlib.sha1(f"{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+    return version[:16], last_modified
+
+
+catalog_version, catalog_last_modified = catalog_stamp(dataset_path)
+logger.info("Catalog version %s", catalog_version)
+
 # Create a dictionary to map URL slugs to movie IDs
 title_id = {}
 for movie_id, movie_data in movies.items():
@@ -63,7 +105,15 @@ for movie_id, movie_data in movies.items():
     slug_title = url_slug(title)
     title_id[slug_title] = movie_id
 
-logger.info(f"Title to ID mapping created with {len(title_id)} entries")
+logger.info("Title to ID mapping created with %s entries", len(title_id))
+
+# Map genre URL slugs back to the catalog's genre names, e.g. "tv-movie"
+genre_names = {}
+for movie_data in movies.values():
+    for genre in movie_data.get("genres", []):
+        genre_names[url_slug(genre["name"])] = genre["name"]
+
+logger.info("Genre slug mapping created with %s entries", len(genre_names))
 
 
 def fetch_poster(movie_id):
@@ -79,10 +129,10 @@ def fetch_poster(movie_id):
     try:
         data = movies[movie_id]
         poster_url = "http://image.tmdb.org/t/p/w780" + data["poster_path"]
-        logger.debug(f"Fetched poster URL for movie ID {movie_id}: {poster_url}")
+        logger.debug("Fetched poster URL for movie ID %s: %s", movie_id, poster_url)
         return poster_url
     except KeyError:
-        logger.error(f"Poster not found for movie ID {movie_id}")
+        logger.error("Poster not found for movie ID %s", movie_id)
         return (
             "https://m.media-amazon.com/images/I/61CHaKs2i1L._AC_UF1000,1000_QL80_.jpg"
         )
@@ -102,7 +152,7 @@ def movie_response(movie_id):
         movie_data = movies[movie_id]
         return movie_data
     except KeyError:
-        logger.error(f"Movie data not found for ID {movie_id}")
+        logger.error("Movie data not found for ID %s", movie_id)
         return {}
 
 
@@ -121,7 +171,7 @@ def backdrop_poster(movie_id):
         backdrop_url = "http://image.tmdb.org/t/p/w780" + data["backdrop_path"]
         return backdrop_url
     except KeyError:
-        logger.error(f"Backdrop poster not found for movie ID {movie_id}")
+        logger.error("Backdrop poster not found for movie ID %s", movie_id)
         return "https://upload.wikimedia.org/wikipedia/commons/d/d1/Image_not_available.png"
 
 
@@ -145,7 +195,8 @@ def popular_movies(already_watched):
         ]
 
         logger.debug(
-            f"Filtered {len(filtered_movies)} movies based on vote count and already watched"
+            "Filtered %s movies based on vote count and already watched",
+            len(filtered_movies),
         )
 
         sorted_movies = sorted(
@@ -155,7 +206,7 @@ def popular_movies(already_watched):
         )
         return sorted_movies[:20]
     except Exception as e:
-        logger.error(f"Error occurred while retrieving popular movies: {e}")
+        logger.error("Error occurred while retrieving popular movies: %s", e)
         return []
 
 
@@ -180,7 +231,8 @@ def latest_movies(already_watched):
         ]
 
         logger.debug(
-            f"Filtered {len(filtered_movies)} movies based on release date, vote count and already watched"
+            "Filtered %s movies based on release date, vote count and already watched",
+            len(filtered_movies),
         )
 
         sorted_movies = sorted(
@@ -190,7 +242,7 @@ def latest_movies(already_watched):
         )
         return sorted_movies[:12]
     except Exception as e:
-        logger.error(f"Error occurred while retrieving latest movies: {e}")
+        logger.error("Error occurred while retrieving latest movies: %s", e)
         return []
 
 
@@ -206,16 +258,97 @@ def get_movie_id_by_name(name):
     """
     movie_id = title_id.get(name)
     if movie_id:
-        logger.debug(f"Found movie ID {movie_id} for name {name}")
+        logger.debug("Found movie ID %s for name %s", movie_id, name)
     else:
-        logger.error(f"Movie ID not found for name {name}")
+        logger.error("Movie ID not found for name %s", name)
     return movie_id
 
 
+def trailer_query(movie_id):
+    """
+    Build the YouTube search query for a movie's trailer.
+
+    Args:
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        str: The search query.
+    """
+    data = movie_response(movie_id)
+    return (
+        data.get("original_title", data.get("title", "Avatar 2009"))
+        + " "
+        + str(data["release_date"][:4])
+        + " official trailer"
+    )
+
+
+def resolve_trailer(movie_id):
+    """
+    Look up a movie's trailer on YouTube, bypassing the cache.
+
+    Tries the YouTube Data API first and falls back to scraping the search
+    results page.
+
+    Args:
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        str or None: The YouTube video ID, or None if no trailer was found.
+    """
+    query = trailer_query(movie_id)
+    source = "api"
+    try:
+        video_url = trailer_finder.findYTtrailer(query)
+    except (googleapiclient.errors.HttpError, Exception) as e:
+        logger.error("YouTube API lookup failed for movie ID %s: %s", movie_id, e)
+        video_url = trailer_finder.DEFAULT_TRAILER_URL
+    if video_url == trailer_finder.DEFAULT_TRAILER_URL:
+        source = "scrape"
+        try:
+            video_url = trailer_finder.findYTtrailerbs4(query)
+        except Exception as e:
+            logger.error(
+                "Failed to find trailer from search results for movie ID %s: %s",
+                movie_id,
+                e,
+            )
+            metrics.inc("trailer_searches_total", "error")
+            return None
+    if video_url == trailer_finder.DEFAULT_TRAILER_URL:
+        metrics.inc("trailer_searches_total", "not_found")
+        return None
+    metrics.inc("trailer_searches_total", source)
+    return video_id_from_url(video_url)
+
+
+# Concurrent lookups of the same movie's trailer share one YouTube search
+trailer_flight = single_flight("trailer")
+
+
+def refresh_trailer(movie_id):
+    """
+    Look up a movie's trailer and record the outcome in the trailer cache.
+
+    Args:
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        str or None: The YouTube video ID, or None if no trailer was found.
+    """
+    video_id = resolve_trailer(movie_id)
+    store_trailer(movie_id, video_id)
+    return video_id
+
+
 def get_movie_trailer(movie_id):
     """
     Fetch the trailer URL for a given movie ID.
 
+    Reads the persistent trailer cache first and only searches YouTube on a
+    miss. The outcome of the search, including a failure, is cached, and
+    concurrent misses for the same movie wait for a single search.
+
     Args:
         movie_id (int): The ID of the movie.
 
@@ -223,30 +356,19 @@ def get_movie_trailer(movie_id):
         str: The URL of the movie's trailer.
     """
     try:
-        data = movie_response(movie_id)
-        query = (
-            data.get("original_title", data.get("title", "Avatar 2009"))
-            + " "
-            + str(data["release_date"][:4])
-            + " official trailer"
+        hit, video_id = get_cached_trailer(movie_id)
+        if not hit:
+            video_id = trailer_flight.do(movie_id, refresh_trailer, movie_id)
+        video_url = (
+            trailer_url(video_id) if video_id else trailer_finder.DEFAULT_TRAILER_URL
         )
-        try:
-            video_url = trailer_finder.findYTtrailer(query)
-        except (googleapiclient.errors.HttpError, Exception) as e:
-            try:
-                video_url = trailer_finder.findYTtrailerbs4(query)
-            except Exception as e:
-                logger.error(
-                    f"Failed to find trailer using bs4 for movie ID {movie_id}: {e}"
-                )
-                video_url = "https://www.youtube.com/watch?v=5PSNL1qE6VY"
-        logger.debug(f"Fetched trailer URL for movie ID {movie_id}: {video_url}")
+        logger.debug("Fetched trailer URL for movie ID %s: %s", movie_id, video_url)
         return video_url
     except Exception as e:
         logger.error(
-            f"Error occurred while fetching trailer for movie ID {movie_id}: {e}"
+            "Error occurred while fetching trailer for movie ID %s: %s", movie_id, e
         )
-        return "https://www.youtube.com/watch?v=5PSNL1qE6VY"
+        return trailer_finder.DEFAULT_TRAILER_URL
 
 
 def filter_movies_by_genre(category):
@@ -267,17 +389,17 @@ def filter_movies_by_genre(category):
             and any(genre.get("name") == category for genre in movie.get("genres", []))
         ]
 
-        logger.debug(f"Filtered {len(filtered_movies)} movies in genre {category}")
+        logger.debug("Filtered %s movies in genre %s", len(filtered_movies), category)
 
         sorted_movies = sorted(
             filtered_movies,
             key=lambda x: x.get("vote_average", x.get("popularity", 0)),
             reverse=True,
         )
-        logger.info(f"Sorted and selected top 20 movies in genre {category}")
+        logger.info("Sorted and selected top 20 movies in genre %s", category)
         return sorted_movies[:20]
     except Exception as e:
-        logger.error(f"Error occurred while filtering movies by genre: {e}")
+        logger.error("Error occurred while filtering movies by genre: %s", e)
         return []
 
 
@@ -297,30 +419,33 @@ def perform_search(query):
             for movie in movies.values()
             if query.lower() in url_slug(movie.get("title", ""))
         ]
-        logger.info(f"Found {len(matched_movies)} movies matching the query '{query}'")
+        logger.info(
+            "Found %s movies matching the query '%s'", len(matched_movies), query
+        )
         return matched_movies
     except Exception as e:
-        logger.error(f"Error occurred while performing search: {e}")
+        logger.error("Error occurred while performing search: %s", e)
         return []
 
 
-def most_watched_genres():
+def most_watched_genres(user_id=None):
     """
     Retrieve the most watched genres by the current user.
 
+    Args:
+        user_id (int, optional): The user to look up. Defaults to the current
+            user; pass it explicitly when running outside the request thread.
+
     Returns:
         list: A list of most watched genres.
     """
+    if user_id is None:
+        user_id = current_user.id
     try:
-        visited_movie_id = (
-            db.session.query(UserHistory.movie_id, UserHistory.watched_at)
-            .filter_by(user_id=current_user.id)
-            .order_by(UserHistory.watched_at.desc())
-            .all()
-        )
-        visited_movie_id = [id[0] for id in visited_movie_id[:15]]
+        visited_movie_id = get_visited_movies(user_id, limit=15)
+        visited_movie_id = [id[0] for id in visited_movie_id]
         logger.debug(
-            f"Most recent 15 movies watched by user {current_user.id}: {visited_movie_id}"
+            "Most recent 15 movies watched by user %s: %s", user_id, visited_movie_id
         )
 
         genres = []
@@ -333,9 +458,30 @@ def most_watched_genres():
             genre for genre, count in genre_counts.most_common() if count >= 2
         ]
         logger.info(
-            f"Most watched genres by user {current_user.id}: {most_frequent_genres[:2]}"
+            "Most watched genres by user %s: %s", user_id, most_frequent_genres[:2]
         )
         return most_frequent_genres[:2]
     except Exception as e:
-        logger.error(f"Error occurred while retrieving most watched genres: {e}")
+        logger.error("Error occurred while retrieving most watched genres: %s", e)
         return []
+
+
+def homepage_genres(user_id=None):
+    """
+    Pick the two genres the homepage recommends from.
+
+    Uses the user's most watched genres, topped up with default genres when
+    fewer than two qualify.
+
+    Args:
+        user_id (int, optional): The user to look up. Defaults to the current user.
+
+    Returns:
+        list: Exactly two genre names.
+    """
+    genres = most_watched_genres(user_id=user_id)
+    default_genre = ["Action", "Comedy"]
+    for genre in default_genre:
+        if len(genres) < 2 and genre not in genres:
+            genres.append(genre)
+    return genres[:2]
@@ -0,0 +1,196 @@
+from app.models import UserHistory
+from app.utils.upsert import upsert_many
+from logger import get_logger
+from app import db
+import threading
+import atexit
+import os
+
+logger = get_logger(__name__)
+
+# Durability modes for watch-history writes
+SYNC = "sync"
+BUFFERED = "buffered"
+
+
+class HistoryBuffer:
+    """
+    Write-behind buffer for watch-history events.
+
+    In ``buffered`` mode a view is recorded in memory and returned to the
+    client at once. A background thread writes the buffer as one bulk upsert
+    when it reaches HISTORY_FLUSH_SIZE events or every HISTORY_FLUSH_INTERVAL
+    seconds, and again when the process exits. Repeated views of the same
+    movie by the same user between flushes collapse into one row. Events not
+    yet flushed are lost if the process is killed, so ``sync`` mode, which
+    commits every view before responding, remains available.
+
+    Reads of a user's history merge in their buffered events, so a user
+    always sees their own views in the process that recorded them. Other
+    worker processes see them after the next flush.
+
+    Configuration:
+        HISTORY_WRITE_MODE (str): "sync" or "buffered".
+        HISTORY_FLUSH_SIZE (int): Buffered events that trigger a flush.
+        HISTORY_FLUSH_INTERVAL (float): Maximum seconds between flushes.
+        HISTORY_BUFFER_MAX (int): Buffered events at which recording a view
+            flushes in the caller's thread instead of waiting.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.mode = SYNC
+        self._pending = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Configure the buffer and flush it when the process exits.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.config.setdefault("HISTORY_WRITE_MODE", SYNC)
+        app.config.setdefault("HISTORY_FLUSH_SIZE", 100)
+        app.config.setdefault("HISTORY_FLUSH_INTERVAL", 1.0)
+        app.config.setdefault("HISTORY_BUFFER_MAX", 10000)
+
+        mode = app.config["HISTORY_WRITE_MODE"]
+        if mode not in (SYNC, BUFFERED):
+            raise ValueError(f"Unknown HISTORY_WRITE_MODE: {mode}")
+
+        self.app = app
+        self.mode = mode
+        app.extensions["history_buffer"] = self
+        if mode == BUFFERED:
+            atexit.register(self.close)
+        logger.info("Watch history write mode: %s", mode)
+
+    @property
+    def buffered(self):
+        """bool: Whether history writes go through the buffer."""
+        return self.mode == BUFFERED
+
+    def _ensure_flusher(self):
+        # Started lazily so that forked workers get their own flusher thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="history-flush", daemon=True
+            )
+            self._thread.start()
+
+    def record(self, user_id, movie_id, watched_at):
+        """
+        Buffer a watch-history event.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie watched.
+            watched_at (datetime): When the movie was watched.
+        """
+        self._ensure_flusher()
+        with self._lock:
+            self._pending[(user_id, movie_id)] = watched_at
+            size = len(self._pending)
+        if size >= self.app.config["HISTORY_BUFFER_MAX"]:
+            # Apply backpressure instead of growing without bound
+            self.flush()
+        elif size >= self.app.config["HISTORY_FLUSH_SIZE"]:
+            self._wake.set()
+
+    def pending_for(self, user_id):
+        """
+        Get a user's buffered events that have not been flushed yet.
+
+        Includes the events of a flush that has not committed yet, so a
+        user's views do not disappear while they are being written.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: (movie_id, watched_at) tuples.
+        """
+        with self._lock:
+            # Events recorded since the flush started are newer
+            events = dict(self._inflight)
+            events.update(self._pending)
+        return [
+            (movie_id, watched_at)
+            for (pending_user, movie_id), watched_at in events.items()
+            if pending_user == user_id
+        ]
+
+    def flush(self):
+        """
+        Write all buffered events to the database in one transaction.
+
+        On failure the events are put back so the next flush retries them.
+
+        Returns:
+            int: The number of rows written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+            if not batch:
+                return 0
+
+            rows = [
+                {"user_id": user_id, "movie_id": movie_id, "watched_at": watched_at}
+                for (user_id, movie_id), watched_at in batch.items()
+            ]
+            with self.app.app_context():
+                try:
+                    upsert_many(
+                        UserHistory,
+                        rows,
+                        index_elements=["user_id", "movie_id"],
+                        update_columns=["watched_at"],
+                    )
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error("Failed to flush %s history events: %s", len(rows), e)
+                    with self._lock:
+                        # Events recorded since the swap are newer; keep them
+                        for key, watched_at in batch.items():
+                            self._pending.setdefault(key, watched_at)
+                        self._inflight = {}
+                    return 0
+                with self._lock:
+                    self._inflight = {}
+            logger.debug("Flushed %s history events", len(rows))
+            return len(rows)
+
+    def _run(self):
+        interval = self.app.config["HISTORY_FLUSH_INTERVAL"]
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the flusher thread and write out whatever is still buffered."""
+        self._stop.set()
+        self._wake.set()
+        flushed = self.flush()
+        if flushed:
+            logger.info("Flushed %s history events on shutdown", flushed)
+
+
+history_buffer = HistoryBuffer()
@@ -0,0 +1,146 @@
+from flask import current_app
+from flask.cli import AppGroup
+from collections import Counter
+from datetime import datetime, timedelta
+from app.models import UserHistory, UserHistorySummary
+from app.utils.helper import movie_response
+from logger import get_logger
+from app import db
+import click
+import json
+
+logger = get_logger(__name__)
+
+# History entries compacted per transaction
+COMPACT_BATCH_SIZE = 1000
+
+
+def _fold(summary, rows):
+    # Add a batch of (movie_id, watched_at) rows to a user's summary
+    genres = Counter(json.loads(summary.genre_counts or "{}"))
+    for movie_id, _ in rows:
+        genres.update(
+            genre["name"] for genre in movie_response(movie_id).get("genres", [])
+        )
+    times = [watched_at for _, watched_at in rows if watched_at is not None]
+    if times:
+        if summary.first_watched_at is not None:
+            times.append(summary.first_watched_at)
+        if summary.last_watched_at is not None:
+            times.append(summary.last_watched_at)
+        summary.first_watched_at, summary.last_watched_at = min(times), max(times)
+    summary.watch_count = (summary.watch_count or 0) + len(rows)
+    summary.genre_counts = json.dumps(dict(genres), sort_keys=True)
+    summary.compacted_at = datetime.utcnow()
+
+
+def compact_user_history(user_id, cutoff):
+    """
+    Fold a user's history entries older than `cutoff` into their summary.
+
+    Each batch is added to the summary and deleted in the same transaction,
+    so an interrupted run never counts an entry twice.
+
+    Args:
+        user_id (int): The ID of the user.
+        cutoff (datetime): Entries watched before this time are compacted.
+
+    Returns:
+        int: The number of entries compacted.
+    """
+    compacted = 0
+    while True:
+        rows = (
+            db.session.query(UserHistory.movie_id, UserHistory.watched_at)
+            .filter(UserHistory.user_id == user_id, UserHistory.watched_at < cutoff)
+            .order_by(UserHistory.watched_at)
+            .limit(COMPACT_BATCH_SIZE)
+            .all()
+        )
+        if not rows:
+            return compacted
+        try:
+            summary = db.session.get(UserHistorySummary, user_id)
+            if summary is None:
+                summary = UserHistorySummary(user_id=user_id)
+                db.session.add(summary)
+            _fold(summary, rows)
+            db.session.query(UserHistory).filter(
+                UserHistory.user_id == user_id,
+                UserHistory.watched_at < cutoff,
+                UserHistory.movie_id.in_([movie_id for movie_id, _ in rows]),
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        compacted += len(rows)
+
+
+def compact_history(retention_days):
+    """
+    Compact every user's history older than `retention_days` days.
+
+    Keeps the history table, and with it the cost of the history page and
+    the homepage, bounded for long-lived accounts.
+
+    Args:
+        retention_days (int): Entries older than this many days are compacted.
+
+    Returns:
+        dict: The number of users and entries compacted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    user_ids = [
+        user_id
+        for (user_id,) in db.session.query(UserHistory.user_id)
+        .filter(UserHistory.watched_at < cutoff)
+        .distinct()
+        .all()
+    ]
+    stats = {"users": 0, "entries": 0}
+    for user_id in user_ids:
+        try:
+            compacted = compact_user_history(user_id, cutoff)
+        except Exception as e:
+            logger.error("Failed to compact history for user %s: %s", user_id, e)
+            continue
+        stats["users"] += 1
+        stats["entries"] += compacted
+    logger.info(
+        "Compacted %s history entries older than %s for %s users",
+        stats["entries"],
+        cutoff,
+        stats["users"],
+    )
+    return stats
+
+
+history_cli = AppGroup("history", help="Manage watch history.")
+
+
+@history_cli.command("compact")
+@click.option(
+    "--days",
+    type=int,
+    default=None,
+    help="Retention in days (defaults to HISTORY_RETENTION_DAYS).",
+)
+def compact_command(days):
+    """Fold old history entries into per-user summaries."""
+    days = days if days is not None else current_app.config["HISTORY_RETENTION_DAYS"]
+    if days <= 0:
+        click.echo("History retention is disabled; pass --days to compact.")
+        return
+    click.echo(json.dumps(compact_history(days)))
+
+
+def init_history_retention(app):
+    """
+    Register the history retention CLI.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.config.setdefault("HISTORY_RETENTION_DAYS", 0)
+    app.cli.add_command(history_cli)
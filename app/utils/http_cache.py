@@ -0,0 +1,114 @@
+from flask import current_app, make_response, request
+from functools import wraps
+from app.utils import helper
+from app.utils.compression import compressor, encoding_etag
+from app.utils.fragments import fragment_cache
+from logger import get_logger
+import hashlib
+
+logger = get_logger(__name__)
+
+
+def catalog_etag(*parts, templates=()):
+    """
+    Build a strong ETag for a response derived from the catalog.
+
+    The tag depends only on the catalog version, the versions of the templates
+    that render the response, the loaded asset build and the identifying parts
+    of the request, so it can be computed without producing the body.
+
+    Args:
+        *parts: Values identifying the response (e.g. a movie ID or a query).
+        templates (tuple): Names of the templates used to render the response.
+
+    Returns:
+        str: The ETag value (unquoted).
+    """
+    versions = [fragment_cache.template_version(name) for name in templates]
+    assets = current_app.extensions.get("assets")
+    assets_version = assets.version if assets is not None else ""
+    key = "|".join(
+        [helper.catalog_version, *versions, assets_version, *map(str, parts)]
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+
+
+def _apply_cache_headers(response, etag, private, max_age):
+    response.set_etag(etag)
+    response.last_modified = helper.catalog_last_modified
+    if private:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add("Cookie")
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response
+
+
+def not_modified_etag(etag):
+    """
+    Check the request's validators against a catalog ETag.
+
+    Compressed variants carry their own ETag, so a client holding the gzip or
+    brotli representation is matched too. ``If-Modified-Since`` is not used:
+    the catalog's modification time says nothing about template or asset
+    changes, so only the ETag can tell whether a page is still current.
+
+    Args:
+        etag (str): The current ETag of the uncompressed resource.
+
+    Returns:
+        str or None: The ETag the client already holds, or None if the
+        representation has to be sent.
+    """
+    if not request.if_none_match:
+        return None
+    for candidate in [etag] + [
+        encoding_etag(etag, encoding) for encoding in compressor.available_encodings()
+    ]:
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+
+def catalog_cached(key_func, templates=(), private=False):
+    """
+    Add conditional GET support to a view serving catalog data.
+
+    On a matching ``If-None-Match`` the view is not called at all and an empty ``304 Not Modified`` is returned. Successful
+    responses get ``ETag``, ``Last-Modified`` and ``Cache-Control`` headers.
+
+    Args:
+        key_func (callable): Called with the view's keyword arguments, returns
+            the values identifying the response.
+        templates (tuple): Templates used to render the response, so that
+            template changes invalidate cached pages.
+        private (bool): Whether the response is user-specific. Private responses
+            must be revalidated; public ones may be cached for CATALOG_MAX_AGE.
+
+    Returns:
+        callable: The decorator.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            max_age = current_app.config.get("CATALOG_MAX_AGE", 3600)
+            etag = catalog_etag(*key_func(**kwargs), templates=templates)
+
+            matched = not_modified_etag(etag)
+            if matched:
+                logger.debug("Not modified: %s", request.path)
+                response = current_app.response_class(status=304)
+                response.vary.add("Accept-Encoding")
+                return _apply_cache_headers(response, matched, private, max_age)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _apply_cache_headers(response, etag, private, max_age)
+            return response
+
+        return wrapper
+
+    return decorator
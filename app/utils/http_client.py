@@ -0,0 +1,151 @@
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from logger import get_logger
+import threading
+import requests
+import time
+
+logger = get_logger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stop calling an upstream that keeps failing.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    refuses calls for `reset_timeout` seconds. The first call after that is
+    let through as a trial: success closes the breaker again, failure re-opens
+    it for another cool-off period.
+
+    Args:
+        name (str): Name of the upstream, used for logging.
+        failure_threshold (int): Consecutive failures before opening.
+        reset_timeout (float): Seconds to wait before a trial call.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """str: The current state of the breaker."""
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """
+        Check whether a call may be made now.
+
+        Returns:
+            bool: True if the call may go ahead. In the half-open state only
+            one trial call is allowed until its outcome is recorded.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # Let one trial call through and hold the rest off until it reports back
+            self._opened_at = time.monotonic()
+            self._state = self.HALF_OPEN
+            return True
+
+    def record_success(self):
+        """Record a successful call, closing the breaker."""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Circuit '%s' closed", self.name)
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        """Record a failed call, opening the breaker once the threshold is hit."""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(
+                        "Circuit '%s' opened after %s failures; pausing calls for %ss",
+                        self.name,
+                        self._failures,
+                        self.reset_timeout,
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call `fn` through the breaker.
+
+        Any exception raised by `fn` counts as a failure and is re-raised.
+
+        Returns:
+            The return value of `fn`.
+
+        Raises:
+            CircuitOpenError: If the breaker is open.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+def pooled_session(pool_size=10, retries=2, backoff_factor=0.3):
+    """
+    Create a requests session with a connection pool and a retry policy.
+
+    Connection errors and 502/503/504 responses to idempotent requests are
+    retried with exponential backoff. Read timeouts are not retried, so a slow
+    upstream costs at most one read timeout per call.
+
+    Args:
+        pool_size (int): Connections kept open per host.
+        retries (int): Maximum number of retries.
+        backoff_factor (float): Backoff factor between retries, in seconds.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
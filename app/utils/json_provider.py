@@ -0,0 +1,103 @@
+from flask.json.provider import DefaultJSONProvider
+from logger import get_logger
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+logger = get_logger(__name__)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes with orjson.
+
+    Keeps the behaviour of Flask's default provider where it matters to
+    clients: keys are sorted, dates are rendered as HTTP dates and unknown
+    types go through the same `default` hook. Calls that pass options orjson
+    does not understand (e.g. ``indent`` in debug mode) use the stdlib encoder.
+    """
+
+    def _options(self):
+        options = (
+            orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SERIALIZE_NUMPY
+            | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        """
+        Serialize data as JSON to a string.
+
+        Args:
+            obj: The data to serialize.
+            **kwargs: Options for `json.dumps`; any option other than the
+                compact separators falls back to the stdlib encoder.
+
+        Returns:
+            str: The JSON document.
+        """
+        kwargs.pop("separators", None)
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        """
+        Deserialize data as JSON from a string or bytes.
+
+        Args:
+            s (str | bytes): The JSON document.
+            **kwargs: Options for `json.loads`; when given, the stdlib decoder is used.
+
+        Returns:
+            The deserialized data.
+        """
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """
+        Serialize the arguments as JSON and wrap them in a response.
+
+        Writes orjson's bytes straight into the response body instead of
+        decoding them to a string first.
+
+        Returns:
+            Response: A response with the "application/json" mimetype.
+        """
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(
+            obj,
+            default=self.default,
+            option=self._options() | orjson.OPT_APPEND_NEWLINE,
+        )
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """
+    Install the fastest available JSON provider on the application.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.config.setdefault("JSON_PROVIDER", "auto")
+    choice = app.config["JSON_PROVIDER"]
+
+    if choice == "stdlib":
+        return
+    if orjson is None:
+        if choice == "orjson":
+            logger.warning("JSON_PROVIDER is 'orjson' but orjson is not installed")
+        return
+
+    app.json = OrjsonProvider(app)
+    logger.info("Using orjson for JSON serialization")
@@ -0,0 +1,303 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from cachetools import LRUCache
+from werkzeug.security import check_password_hash
+from logger import get_logger
+import threading
+import sqlite3
+import time
+import os
+
+logger = get_logger(__name__)
+
+# Where token bucket state is kept
+MEMORY = "memory"
+SQLITE = "sqlite"
+
+
+def _take(tokens, updated, now, capacity, rate):
+    """
+    Refill a token bucket up to `now` and try to take one token from it.
+
+    Args:
+        tokens (float): Tokens in the bucket at `updated`, or None for a new bucket.
+        updated (float): When the bucket was last updated.
+        now (float): The current time.
+        capacity (int): Maximum number of tokens (the allowed burst).
+        rate (float): Tokens added per second.
+
+    Returns:
+        tuple: The new token count and the seconds to wait before a token is
+        available (0 if one was taken).
+    """
+    if tokens is None:
+        tokens = capacity
+    else:
+        tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBuckets:
+    """
+    Token buckets held in process memory.
+
+    Fast, but every worker process keeps its own buckets, so the effective
+    limit is multiplied by the number of workers.
+    """
+
+    def __init__(self, max_keys):
+        self._buckets = LRUCache(maxsize=max_keys)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (None, now))
+            tokens, wait = _take(tokens, updated, now, capacity, rate)
+            self._buckets[key] = (tokens, now)
+        return wait
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class SQLiteBuckets:
+    """
+    Token buckets in a SQLite file shared by all worker processes.
+
+    Each take is a single ``BEGIN IMMEDIATE`` transaction, so concurrent
+    workers never lose an update. The file is separate from the application
+    database so throttling does not contend with its writes.
+    """
+
+    def __init__(self, path, prune_after):
+        self.path = path
+        self.prune_after = prune_after
+        self._local = threading.local()
+        self._takes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS login_bucket ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        # One connection per thread and process; connections do not survive fork
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def take(self, key, capacity, rate):
+        connection = self._connect()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM login_bucket WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, wait = _take(*(row or (None, now)), now, capacity, rate)
+            connection.execute(
+                "INSERT INTO login_bucket (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            self._takes += 1
+            if self._takes % 1000 == 0:
+                # Buckets idle this long are full again; forget them
+                connection.execute(
+                    "DELETE FROM login_bucket WHERE updated < ?",
+                    (now - self.prune_after,),
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return wait
+
+    def reset(self, key):
+        self._connect().execute("DELETE FROM login_bucket WHERE key = ?", (key,))
+
+
+class LoginThrottle:
+    """
+    Limit login attempts and the CPU spent checking passwords.
+
+    Every login POST takes a token from a bucket for the client IP and one
+    for the account name entered, before the user is looked up or a password
+    hash is computed. An empty bucket rejects the attempt until it refills,
+    so a credential-stuffing burst is turned away cheaply. A successful login
+    refills the account's bucket.
+
+    Password hashes are checked on a small dedicated thread pool with a
+    bounded queue. When the pool is saturated further logins are rejected at
+    once instead of queueing, so a login flood uses at most
+    LOGIN_HASH_WORKERS cores and the rest of the site keeps responding.
+
+    Configuration:
+        LOGIN_THROTTLE_ENABLED (bool): Turn rate limiting on or off.
+        LOGIN_THROTTLE_BACKEND (str): "memory" (per process) or "sqlite"
+            (shared by all workers on the host).
+        LOGIN_THROTTLE_SQLITE_PATH (str): Database file of the sqlite backend.
+        LOGIN_THROTTLE_MAX_KEYS (int): Buckets kept by the memory backend.
+        LOGIN_IP_BURST (int): Attempts an IP can make in a burst.
+        LOGIN_IP_PER_MINUTE (float): Sustained attempts per minute per IP.
+        LOGIN_ACCOUNT_BURST (int): Attempts on one account in a burst.
+        LOGIN_ACCOUNT_PER_MINUTE (float): Sustained attempts per minute per account.
+        LOGIN_HASH_WORKERS (int): Threads checking password hashes.
+        LOGIN_HASH_QUEUE (int): Checks allowed to wait for a free thread.
+        LOGIN_HASH_TIMEOUT (float): Seconds a request waits for its check.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self._buckets = None
+        self._limits = {}
+        self._pool = None
+        self._slots = None
+        self._timeout = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Create the bucket backend and the hashing pool.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.config.setdefault("LOGIN_THROTTLE_ENABLED", True)
+        app.config.setdefault("LOGIN_THROTTLE_BACKEND", MEMORY)
+        app.config.setdefault(
+            "LOGIN_THROTTLE_SQLITE_PATH",
+            os.path.join(app.instance_path, "login_throttle.db"),
+        )
+        app.config.setdefault("LOGIN_THROTTLE_MAX_KEYS", 100000)
+        app.config.setdefault("LOGIN_IP_BURST", 20)
+        app.config.setdefault("LOGIN_IP_PER_MINUTE", 10)
+        app.config.setdefault("LOGIN_ACCOUNT_BURST", 5)
+        app.config.setdefault("LOGIN_ACCOUNT_PER_MINUTE", 1)
+        app.config.setdefault("LOGIN_HASH_WORKERS", 2)
+        app.config.setdefault("LOGIN_HASH_QUEUE", 8)
+        app.config.setdefault("LOGIN_HASH_TIMEOUT", 5.0)
+
+        self.enabled = app.config["LOGIN_THROTTLE_ENABLED"]
+        # (burst, tokens per second) per kind of key
+        self._limits = {
+            "ip": (
+                app.config["LOGIN_IP_BURST"],
+                app.config["LOGIN_IP_PER_MINUTE"] / 60,
+            ),
+            "account": (
+                app.config["LOGIN_ACCOUNT_BURST"],
+                app.config["LOGIN_ACCOUNT_PER_MINUTE"] / 60,
+            ),
+        }
+
+        backend = app.config["LOGIN_THROTTLE_BACKEND"]
+        if backend == MEMORY:
+            self._buckets = MemoryBuckets(app.config["LOGIN_THROTTLE_MAX_KEYS"])
+        elif backend == SQLITE:
+            prune_after = max(burst / rate for burst, rate in self._limits.values())
+            self._buckets = SQLiteBuckets(
+                app.config["LOGIN_THROTTLE_SQLITE_PATH"], prune_after
+            )
+        else:
+            raise ValueError(f"Unknown LOGIN_THROTTLE_BACKEND: {backend}")
+
+        workers = app.config["LOGIN_HASH_WORKERS"]
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="login-hash"
+        )
+        self._slots = threading.BoundedSemaphore(
+            workers + app.config["LOGIN_HASH_QUEUE"]
+        )
+        self._timeout = app.config["LOGIN_HASH_TIMEOUT"]
+
+        app.extensions["login_throttle"] = self
+        logger.info(
+            "Login throttle using the %s backend and %s hash workers", backend, workers
+        )
+
+    def hit(self, ip, account):
+        """
+        Record a login attempt and check whether it may proceed.
+
+        The account bucket is only charged when the IP bucket allows the
+        attempt, so one abusive client cannot lock out an account by itself
+        faster than its own limit allows.
+
+        Args:
+            ip (str): The client's IP address.
+            account (str): The username or email entered.
+
+        Returns:
+            float: 0 if the attempt may proceed, otherwise the seconds to wait.
+        """
+        if not self.enabled:
+            return 0.0
+        try:
+            wait = self._buckets.take(f"ip:{ip}", *self._limits["ip"])
+            if wait:
+                return wait
+            return self._buckets.take(
+                f"account:{account.strip().lower()}", *self._limits["account"]
+            )
+        except Exception as e:
+            # Fail open: a broken throttle store must not block every login
+            logger.error("Login throttle check failed: %s", e)
+            return 0.0
+
+    def reset(self, account):
+        """
+        Refill an account's bucket after a successful login.
+
+        Args:
+            account (str): The username or email entered.
+        """
+        if not self.enabled:
+            return
+        try:
+            self._buckets.reset(f"account:{account.strip().lower()}")
+        except Exception as e:
+            logger.error("Failed to reset login throttle for %s: %s", account, e)
+
+    def check_password(self, password_hash, password):
+        """
+        Check a password against its hash on the hashing pool.
+
+        Args:
+            password_hash (str): The stored password hash.
+            password (str): The password entered.
+
+        Returns:
+            bool or None: Whether the password matches, or None if the pool is
+            saturated or the check timed out.
+        """
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Password hash pool is saturated; rejecting login")
+            return None
+        try:
+            future = self._pool.submit(check_password_hash, password_hash, password)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self._timeout)
+        except TimeoutError:
+            logger.warning("Password hash check timed out")
+            return None
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,366 @@
+from flask.cli import AppGroup
+from flask_mail import Message, BadHeaderError
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app.models import EmailOutbox
+from app.models.outbox import PENDING, SENT, FAILED
+from logger import get_logger
+from app import db, mail
+import threading
+import smtplib
+import secrets
+import atexit
+import click
+import json
+import os
+
+logger = get_logger(__name__)
+
+# Errors that reject one message; anything else means the connection is bad
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+    BadHeaderError,
+)
+
+
+class MailOutbox:
+    """
+    Persistent outbox for transactional email.
+
+    Requests render their email and store it in the ``email_outbox`` table,
+    then return without talking to the mail server. A background thread in
+    each worker process claims due messages in batches and delivers them over
+    one SMTP connection, which stays open for as long as there are messages
+    to send. Failed deliveries are retried with exponential backoff until
+    MAIL_OUTBOX_MAX_ATTEMPTS is reached, after which the message is marked
+    failed. Claims expire after MAIL_OUTBOX_LEASE seconds, so messages held
+    by a worker that died are picked up again by another. Bodies carry reset
+    links and verification codes, so they are cleared as soon as a message
+    is sent or given up on; ``flask outbox prune`` deletes finished messages
+    older than MAIL_OUTBOX_RETENTION_DAYS.
+
+    The sender talks to whatever MAIL_SERVER and MAIL_PORT point at, so a
+    local SMTP stub can stand in for the real server (with MAIL_USE_TLS off).
+    With MAIL_OUTBOX_ENABLED off, email is sent synchronously as before.
+
+    Configuration:
+        MAIL_OUTBOX_ENABLED (bool): Queue email instead of sending it inline.
+        MAIL_OUTBOX_BATCH_SIZE (int): Messages claimed per batch.
+        MAIL_OUTBOX_POLL_INTERVAL (float): Seconds between checks for due messages.
+        MAIL_OUTBOX_MAX_ATTEMPTS (int): Failed attempts before giving up.
+        MAIL_OUTBOX_RETRY_BASE (int): Seconds before the first retry; doubles
+            with every further failure.
+        MAIL_OUTBOX_RETRY_MAX (int): Upper bound on the retry delay in seconds.
+        MAIL_OUTBOX_LEASE (int): Seconds a claimed message is reserved for
+            the sender that claimed it.
+        MAIL_OUTBOX_RETENTION_DAYS (int): Days sent and failed messages are
+            kept before ``flask outbox prune`` deletes them.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Configure the outbox and start its sender with the first request.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.config.setdefault("MAIL_OUTBOX_ENABLED", True)
+        app.config.setdefault("MAIL_OUTBOX_BATCH_SIZE", 50)
+        app.config.setdefault("MAIL_OUTBOX_POLL_INTERVAL", 5.0)
+        app.config.setdefault("MAIL_OUTBOX_MAX_ATTEMPTS", 8)
+        app.config.setdefault("MAIL_OUTBOX_RETRY_BASE", 30)
+        app.config.setdefault("MAIL_OUTBOX_RETRY_MAX", 3600)
+        app.config.setdefault("MAIL_OUTBOX_LEASE", 300)
+        app.config.setdefault("MAIL_OUTBOX_RETENTION_DAYS", 7)
+
+        self.app = app
+        self.enabled = app.config["MAIL_OUTBOX_ENABLED"]
+        app.extensions["mail_outbox"] = self
+        app.cli.add_command(outbox_cli)
+        if self.enabled:
+            # Workers also deliver messages left over from before a restart
+            app.before_request(self._ensure_sender)
+            atexit.register(self.close)
+
+    def _ensure_sender(self):
+        # Started lazily so that forked workers get their own sender thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="mail-outbox", daemon=True
+            )
+            self._thread.start()
+
+    def enqueue(self, recipient, subject, html):
+        """
+        Queue an email for delivery, or send it at once if the outbox is off.
+
+        Args:
+            recipient (str): The email address to send to.
+            subject (str): The subject line.
+            html (str): The rendered HTML body.
+
+        Returns:
+            bool: True if the message was queued (or sent), False otherwise.
+        """
+        if not self.enabled:
+            try:
+                mail.send(Message(subject, recipients=[recipient], html=html))
+                return True
+            except Exception as e:
+                logger.error("Error sending email to %s: %s", recipient, e)
+                return False
+
+        try:
+            db.session.add(EmailOutbox(recipient=recipient, subject=subject, html=html))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error queueing email to %s: %s", recipient, e)
+            return False
+
+        self._ensure_sender()
+        self._wake.set()
+        logger.debug("Queued email '%s' to %s", subject, recipient)
+        return True
+
+    def _claim(self):
+        # Reserve a batch of due messages for this sender in one statement
+        config = self.app.config
+        now = datetime.utcnow()
+        due = (
+            db.session.query(EmailOutbox.id)
+            .filter(EmailOutbox.status == PENDING, EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(config["MAIL_OUTBOX_BATCH_SIZE"])
+        )
+        token = secrets.token_hex(16)
+        db.session.query(EmailOutbox).filter(
+            EmailOutbox.id.in_(due.scalar_subquery()),
+            EmailOutbox.status == PENDING,
+            EmailOutbox.next_attempt_at <= now,
+        ).update(
+            {
+                EmailOutbox.claim_token: token,
+                EmailOutbox.next_attempt_at: now
+                + timedelta(seconds=config["MAIL_OUTBOX_LEASE"]),
+            },
+            synchronize_session=False,
+        )
+        db.session.commit()
+        return (
+            EmailOutbox.query.filter_by(claim_token=token)
+            .order_by(EmailOutbox.id)
+            .all()
+        )
+
+    def _retry_delay(self, attempts):
+        config = self.app.config
+        delay = config["MAIL_OUTBOX_RETRY_BASE"] * 2 ** (attempts - 1)
+        return timedelta(seconds=min(delay, config["MAIL_OUTBOX_RETRY_MAX"]))
+
+    def _fail(self, message, error):
+        # Record a failed attempt and schedule the retry, or give up
+        message.attempts += 1
+        message.claim_token = None
+        message.last_error = str(error)[:1000]
+        if message.attempts >= self.app.config["MAIL_OUTBOX_MAX_ATTEMPTS"]:
+            message.status = FAILED
+            message.html = ""
+            logger.error(
+                "Giving up on email %s to %s after %s attempts: %s",
+                message.id,
+                message.recipient,
+                message.attempts,
+                error,
+            )
+        else:
+            message.next_attempt_at = datetime.utcnow() + self._retry_delay(
+                message.attempts
+            )
+            logger.warning(
+                "Email %s to %s failed (attempt %s), retrying at %s: %s",
+                message.id,
+                message.recipient,
+                message.attempts,
+                message.next_attempt_at,
+                error,
+            )
+        db.session.commit()
+
+    def _deliver(self, connection, messages, stats):
+        # Send a claimed batch; returns False if the connection went bad
+        for index, message in enumerate(messages):
+            try:
+                connection.send(
+                    Message(
+                        message.subject,
+                        recipients=[message.recipient],
+                        html=message.html,
+                    )
+                )
+            except MESSAGE_ERRORS as e:
+                self._fail(message, e)
+                stats["failed"] += 1
+                continue
+            except Exception as e:
+                self._fail(message, e)
+                stats["failed"] += 1
+                # Hand the rest back, due when the failed message is retried
+                for other in messages[index + 1 :]:
+                    other.claim_token = None
+                    other.next_attempt_at = message.next_attempt_at
+                db.session.commit()
+                return False
+
+            message.status = SENT
+            message.sent_at = datetime.utcnow()
+            # The body may hold a reset link or code; it is not needed any more
+            message.html = ""
+            message.claim_token = None
+            message.last_error = None
+            db.session.commit()
+            stats["sent"] += 1
+        return True
+
+    def send_due(self):
+        """
+        Deliver every due message over a single SMTP connection.
+
+        Returns:
+            dict: The number of messages sent and failed.
+        """
+        stats = {"sent": 0, "failed": 0}
+        with self._send_lock, self.app.app_context():
+            connection = None
+            try:
+                while True:
+                    messages = self._claim()
+                    if not messages:
+                        break
+                    if connection is None:
+                        try:
+                            connection = mail.connect()
+                            connection.__enter__()
+                        except Exception as e:
+                            connection = None
+                            for message in messages:
+                                self._fail(message, e)
+                            stats["failed"] += len(messages)
+                            break
+                    if not self._deliver(connection, messages, stats):
+                        break
+            except Exception as e:
+                db.session.rollback()
+                logger.error("Error delivering queued email: %s", e)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.__exit__(None, None, None)
+                    except Exception as e:
+                        logger.debug("Error closing SMTP connection: %s", e)
+        if stats["sent"] or stats["failed"]:
+            logger.info("Mail outbox delivery: %s", stats)
+        return stats
+
+    def status(self):
+        """
+        Count the messages in the outbox by status.
+
+        Returns:
+            dict: Message counts keyed by status.
+        """
+        counts = dict.fromkeys((PENDING, SENT, FAILED), 0)
+        rows = (
+            db.session.query(EmailOutbox.status, func.count())
+            .group_by(EmailOutbox.status)
+            .all()
+        )
+        counts.update(rows)
+        return counts
+
+    def prune(self, retention_days):
+        """
+        Delete sent and failed messages older than `retention_days` days.
+
+        Finished messages that are kept have their bodies cleared too, in
+        case they were sent before bodies were cleared on delivery.
+
+        Args:
+            retention_days (float): Finished messages older than this are deleted.
+
+        Returns:
+            int: The number of messages deleted.
+        """
+        finished = EmailOutbox.status.in_((SENT, FAILED))
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        deleted = EmailOutbox.query.filter(
+            finished, EmailOutbox.created_at < cutoff
+        ).delete(synchronize_session=False)
+        EmailOutbox.query.filter(finished, EmailOutbox.html != "").update(
+            {EmailOutbox.html: ""}, synchronize_session=False
+        )
+        db.session.commit()
+        logger.info("Pruned %s finished emails from the outbox", deleted)
+        return deleted
+
+    def _run(self):
+        interval = self.app.config["MAIL_OUTBOX_POLL_INTERVAL"]
+        while not self._stop.is_set():
+            self.send_due()
+            self._wake.wait(interval)
+            self._wake.clear()
+
+    def close(self):
+        """Stop the sender thread; queued messages stay in the outbox."""
+        self._stop.set()
+        self._wake.set()
+
+
+mail_outbox = MailOutbox()
+
+outbox_cli = AppGroup("outbox", help="Manage queued email.")
+
+
+@outbox_cli.command("send")
+def send_command():
+    """Deliver all due messages now."""
+    click.echo(json.dumps(mail_outbox.send_due()))
+
+
+@outbox_cli.command("prune")
+@click.option(
+    "--days",
+    type=float,
+    default=None,
+    help="Keep finished messages this many days (default MAIL_OUTBOX_RETENTION_DAYS).",
+)
+def prune_command(days):
+    """Delete sent and failed messages past the retention period."""
+    if days is None:
+        days = mail_outbox.app.config["MAIL_OUTBOX_RETENTION_DAYS"]
+    click.echo(f"Deleted {mail_outbox.prune(days)} message(s).")
+
+
+@outbox_cli.command("status")
+def status_command():
+    """Show the number of messages by status."""
+    click.echo(json.dumps(mail_outbox.status()))
@@ -0,0 +1,700 @@
+from bisect import bisect_left
+from flask import Response, abort, current_app, g, has_request_context, request
+from flask.cli import AppGroup
+from sqlalchemy import event
+from logger import dropped_records, get_logger
+from app import db
+import threading
+import hmac
+import atexit
+import click
+import json
+import math
+import time
+import sys
+import os
+
+logger = get_logger(__name__)
+
+PREFIX = "moviefusion_"
+
+# Upper bounds in seconds; every histogram also has a +Inf bucket
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+STATEMENTS = {"SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA", "CREATE", "ALTER"}
+
+
+class MetricsRegistry:
+    """
+    Metric values of one process, keyed by metric name and label values.
+
+    Counters and histograms only grow. Gauges are moved with `inc` and
+    `dec`; gauges and counters read from other components' own statistics
+    are supplied by collectors called at snapshot time.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._values = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, description, labels=(), buckets=None):
+        """
+        Declare a metric.
+
+        Args:
+            name (str): Name without the common prefix.
+            kind (str): "counter", "gauge" or "histogram".
+            description (str): One-line help text.
+            labels (tuple): Label names.
+            buckets (tuple, optional): Histogram bucket upper bounds.
+        """
+        self._metrics[name] = {
+            "type": kind,
+            "help": description,
+            "labels": list(labels),
+            "buckets": list(buckets or ()),
+        }
+        self._values.setdefault(name, {})
+
+    def add_collector(self, collector):
+        """
+        Register a callable returning (name, label values, value) samples.
+
+        Args:
+            collector (callable): Called for every snapshot.
+        """
+        self._collectors.append(collector)
+
+    def inc(self, name, labels=(), amount=1):
+        """Add `amount` to a counter or gauge."""
+        with self._lock:
+            values = self._values[name]
+            values[labels] = values.get(labels, 0) + amount
+
+    def dec(self, name, labels=(), amount=1):
+        """Subtract `amount` from a gauge."""
+        if self._metrics[name]["type"] != "gauge":
+            raise ValueError(f"{name} is not a gauge")
+        with self._lock:
+            values = self._values[name]
+            values[labels] = values.get(labels, 0) - amount
+
+    def observe(self, name, labels, value):
+        """Record one observation in a histogram."""
+        buckets = self._metrics[name]["buckets"]
+        with self._lock:
+            values = self._values[name]
+            state = values.get(labels)
+            if state is None:
+                state = values[labels] = [[0] * len(buckets), 0.0, 0]
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def reset(self):
+        """Forget all recorded values, e.g. in a freshly forked worker."""
+        self._lock = threading.Lock()
+        self._values = {name: {} for name in self._metrics}
+
+    def snapshot(self):
+        """
+        Capture the current values in a JSON-serialisable form.
+
+        Returns:
+            dict: Metric name -> its description and a list of
+            [label values, value] samples. Histogram values are
+            [bucket counts, sum, count], with per-bucket (not cumulative)
+            counts.
+        """
+        with self._lock:
+            values = {
+                name: {
+                    labels: [list(v[0]), v[1], v[2]] if isinstance(v, list) else v
+                    for labels, v in samples.items()
+                }
+                for name, samples in self._values.items()
+            }
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    values[name][labels] = value
+            except Exception as e:
+                logger.error("Metrics collector %s failed: %s", collector.__name__, e)
+        return {
+            name: dict(
+                self._metrics[name],
+                samples=[[list(labels), value] for labels, value in samples.items()],
+            )
+            for name, samples in values.items()
+        }
+
+
+def merge_snapshots(snapshots):
+    """
+    Combine the snapshots of several processes.
+
+    Counters and histograms are summed over all processes, including ones
+    that have exited, so totals do not drop when a worker is replaced.
+    Gauges are summed over the processes that are still running.
+
+    Args:
+        snapshots (iterable): (snapshot, alive) pairs.
+
+    Returns:
+        dict: Metric name -> description with a "values" dict keyed by label
+        values.
+    """
+    merged = {}
+    for snapshot, alive in snapshots:
+        for name, metric in snapshot.items():
+            if metric["type"] == "gauge" and not alive:
+                continue
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = dict(metric, values={})
+                del target["samples"]
+            values = target["values"]
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if metric["type"] != "histogram":
+                    values[key] = values.get(key, 0) + value
+                    continue
+                if len(value[0]) != len(target["buckets"]):
+                    continue  # Written with other buckets, e.g. before a deploy
+                current = values.setdefault(key, [[0] * len(value[0]), 0.0, 0])
+                current[0] = [a + b for a, b in zip(current[0], value[0])]
+                current[1] += value[1]
+                current[2] += value[2]
+    return merged
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def render(merged):
+    """
+    Format merged metrics in the Prometheus text exposition format.
+
+    Args:
+        merged (dict): As returned by `merge_snapshots`.
+
+    Returns:
+        str: The exposition text.
+    """
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        full = PREFIX + name
+        lines.append(f"# HELP {full} {metric['help']}")
+        lines.append(f"# TYPE {full} {metric['type']}")
+        names = metric["labels"]
+        for key in sorted(metric["values"]):
+            value = metric["values"][key]
+            if metric["type"] != "histogram":
+                lines.append(f"{full}{_labels(names, key)} {_number(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket in zip(metric["buckets"], counts):
+                cumulative += bucket
+                le = ("le", _number(float(bound)))
+                lines.append(f"{full}_bucket{_labels(names, key, le)} {cumulative}")
+            le = ("le", "+Inf")
+            lines.append(f"{full}_bucket{_labels(names, key, le)} {count}")
+            lines.append(f"{full}_sum{_labels(names, key)} {_number(total)}")
+            lines.append(f"{full}_count{_labels(names, key)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def deep_size(obj, seen=None):
+    """
+    Approximate the memory held by an object and everything it contains.
+
+    Args:
+        obj: A dict, list, tuple, set or scalar.
+        seen (set, optional): IDs of objects already counted.
+
+    Returns:
+        int: Size in bytes.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    return size
+
+
+def estimate_size(mapping, sample=1000):
+    """
+    Estimate the memory held by a large dict from a sample of its entries.
+
+    Walking every entry of a million-movie catalog would take seconds, so
+    the per-entry size is measured on an evenly spaced sample and scaled up.
+
+    Args:
+        mapping (dict): The dict to measure.
+        sample (int): Number of entries to measure.
+
+    Returns:
+        int: Estimated size in bytes.
+    """
+    if not mapping:
+        return sys.getsizeof(mapping)
+    step = max(1, len(mapping) // sample)
+    measured = 0
+    count = 0
+    for index, (key, value) in enumerate(mapping.items()):
+        if index % step:
+            continue
+        measured += deep_size(key) + deep_size(value)
+        count += 1
+        if count >= sample:
+            break
+    return sys.getsizeof(mapping) + int(measured / count * len(mapping))
+
+
+def resident_memory():
+    """Return this process's resident set size in bytes, or None if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _statement(sql):
+    verb = sql.lstrip()[:8].split(None, 1)
+    verb = verb[0].upper() if verb else ""
+    return verb if verb in STATEMENTS else "OTHER"
+
+
+class Metrics:
+    """
+    Runtime metrics exposed at ``/metrics`` in the Prometheus text format.
+
+    Records request latency per blueprint and route, requests in flight,
+    database query counts and durations (through SQLAlchemy cursor events),
+    trailer lookup outcomes, cache and single-flight statistics, circuit
+    breaker states and the memory held by the loaded catalog and models.
+
+    Each process keeps its own values. With METRICS_DIR set, every worker
+    writes a snapshot to ``<METRICS_DIR>/<pid>.json`` every
+    METRICS_FLUSH_INTERVAL seconds and on exit, and a scrape, answered by
+    any worker, merges the snapshots of all of them: counters and histograms
+    are summed over every process that has written one, gauges over the
+    processes still running. The directory must be local to the host and
+    should be emptied with ``flask metrics clear`` before the workers start
+    after a deploy. Without METRICS_DIR only the answering process is
+    reported, which is right for a single-process server.
+
+    Configuration:
+        METRICS_ENABLED (bool): Record metrics and serve ``/metrics``.
+        METRICS_DIR (str): Directory for per-process snapshots; empty for
+            single-process servers.
+        METRICS_FLUSH_INTERVAL (float): Seconds between snapshot writes.
+        METRICS_TOKEN (str): Bearer token required to scrape; ``/metrics``
+            does not exist (404) until one is set.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.registry = MetricsRegistry()
+        self._directory = None
+        self._interval = 5.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._sizes = {}
+        self._describe()
+        # Registered once per instance, however many apps it is bound to: a
+        # forked worker must not report what its parent recorded, and close()
+        # does nothing in processes that never flushed
+        os.register_at_fork(after_in_child=self.registry.reset)
+        atexit.register(self.close)
+        if app is not None:
+            self.init_app(app)
+
+    def _describe(self):
+        registry = self.registry
+        registry.describe(
+            "http_request_duration_seconds",
+            "histogram",
+            "Time spent handling requests.",
+            ("blueprint", "endpoint", "method"),
+            LATENCY_BUCKETS,
+        )
+        registry.describe(
+            "http_requests_total",
+            "counter",
+            "Requests handled, by response status.",
+            ("blueprint", "endpoint", "method", "status"),
+        )
+        registry.describe(
+            "http_requests_in_flight",
+            "gauge",
+            "Requests being handled.",
+            ("blueprint",),
+        )
+        registry.describe(
+            "db_query_duration_seconds",
+            "histogram",
+            "Time spent executing database statements.",
+            ("blueprint", "statement"),
+            QUERY_BUCKETS,
+        )
+        registry.describe(
+            "trailer_lookups_total",
+            "counter",
+            "Trailer lookups by the movie page, by cache result and outcome.",
+            ("cache", "status"),
+        )
+        registry.describe(
+            "trailer_searches_total",
+            "counter",
+            "YouTube trailer searches, by where the trailer was found.",
+            ("source",),
+        )
+        registry.describe(
+            "cache_requests_total",
+            "counter",
+            "In-process cache lookups, by cache and result.",
+            ("cache", "result"),
+        )
+        registry.describe(
+            "singleflight_calls_total",
+            "counter",
+            "Calls through single-flight groups, by whether they ran or joined.",
+            ("group", "result"),
+        )
+        registry.describe(
+            "circuit_breaker_open",
+            "gauge",
+            "Worker processes whose circuit breaker is open or half-open.",
+            ("breaker",),
+        )
+        registry.describe(
+            "catalog_resident_bytes",
+            "gauge",
+            "Estimated memory held by the loaded catalog and models, all workers.",
+            ("dataset",),
+        )
+        registry.describe(
+            "catalog_entries",
+            "gauge",
+            "Entries in the loaded catalog and models, all workers.",
+            ("dataset",),
+        )
+        registry.describe(
+            "process_resident_memory_bytes",
+            "gauge",
+            "Resident memory of the worker processes.",
+        )
+        registry.describe(
+            "worker_processes",
+            "gauge",
+            "Worker processes reporting metrics.",
+        )
+        registry.describe(
+            "log_records_dropped_total",
+            "counter",
+            "Log records dropped because the log queue was full.",
+        )
+        registry.add_collector(self._collect_caches)
+        registry.add_collector(self._collect_logging)
+        registry.add_collector(self._collect_memory)
+
+    def init_app(self, app):
+        """
+        Install the request hooks, query listeners and the ``/metrics`` route.
+
+        Must run after `init_database`, since the query listeners are
+        attached to the application's engine.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.config.setdefault("METRICS_ENABLED", True)
+        app.config.setdefault("METRICS_DIR", "")
+        app.config.setdefault("METRICS_FLUSH_INTERVAL", 5.0)
+        app.config.setdefault("METRICS_TOKEN", None)
+
+        self.enabled = app.config["METRICS_ENABLED"]
+        self._directory = app.config["METRICS_DIR"] or None
+        self._interval = app.config["METRICS_FLUSH_INTERVAL"]
+        app.extensions["metrics"] = self
+        app.cli.add_command(metrics_cli)
+        if not self.enabled:
+            return
+
+        app.before_request(self._start)
+        app.teardown_request(self._finish)
+        app.after_request(self._status)
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", self._query_started)
+            event.listen(db.engine, "after_cursor_execute", self._query_finished)
+        app.add_url_rule("/metrics", "metrics", self._serve)
+        if self._directory:
+            os.makedirs(self._directory, exist_ok=True)
+
+    def inc(self, name, *labels):
+        """
+        Add one to a counter, if metrics are enabled.
+
+        Args:
+            name (str): Metric name without the common prefix.
+            *labels (str): Label values, in the declared order.
+        """
+        if self.enabled:
+            self.registry.inc(name, labels)
+
+    def _start(self):
+        if self._directory:
+            self._ensure_flusher()
+        blueprint = request.blueprint or ""
+        g._metrics_started = time.perf_counter()
+        g._metrics_blueprint = blueprint
+        self.registry.inc("http_requests_in_flight", (blueprint,))
+
+    def _status(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _finish(self, exc):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return
+        blueprint = g.pop("_metrics_blueprint")
+        # Unmatched URLs share one label value, so scans cannot add series
+        endpoint = request.endpoint or "unmatched"
+        method = request.method if request.method in METHODS else "OTHER"
+        status = str(g.pop("_metrics_status", 500))
+        registry = self.registry
+        registry.dec("http_requests_in_flight", (blueprint,))
+        registry.observe(
+            "http_request_duration_seconds",
+            (blueprint, endpoint, method),
+            time.perf_counter() - started,
+        )
+        registry.inc("http_requests_total", (blueprint, endpoint, method, status))
+
+    def _query_started(self, conn, cursor, statement, parameters, context, many):
+        context._metrics_started = time.perf_counter()
+
+    def _query_finished(self, conn, cursor, statement, parameters, context, many):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        blueprint = (request.blueprint or "") if has_request_context() else ""
+        self.registry.observe(
+            "db_query_duration_seconds",
+            (blueprint, _statement(statement)),
+            time.perf_counter() - started,
+        )
+
+    def _collect_caches(self):
+        from app.utils.fragments import fragment_cache
+        from app.utils.user_cache import user_cache
+        from app.utils.singleflight import flight_stats
+        from app.utils.trailer_finder import api_breaker, scrape_breaker
+
+        samples = [
+            ("cache_requests_total", ("fragments", "hit"), fragment_cache.hits),
+            ("cache_requests_total", ("fragments", "miss"), fragment_cache.misses),
+            ("cache_requests_total", ("users", "hit"), user_cache.hits),
+            ("cache_requests_total", ("users", "miss"), user_cache.misses),
+        ]
+        for group, stats in flight_stats().items():
+            samples.append(
+                ("singleflight_calls_total", (group, "executed"), stats["executions"])
+            )
+            samples.append(
+                ("singleflight_calls_total", (group, "coalesced"), stats["coalesced"])
+            )
+        for breaker in (api_breaker, scrape_breaker):
+            open_ = breaker.state != breaker.CLOSED
+            samples.append(("circuit_breaker_open", (breaker.name,), int(open_)))
+        return samples
+
+    def _collect_logging(self):
+        return [("log_records_dropped_total", (), dropped_records())]
+
+    def _dataset_size(self, name, data):
+        # The catalog and models do not change once loaded
+        cached = self._sizes.get(name)
+        if cached is None or cached[0] != id(data):
+            cached = self._sizes[name] = (id(data), estimate_size(data))
+        return cached[1]
+
+    def _collect_memory(self):
+        from app.utils import helper, recommendation
+
+        datasets = {
+            "movies": helper.movies,
+            "titles": helper.title_id,
+            "features_similarity": recommendation.features_similarity,
+            "items_similarity": recommendation.items_similarity,
+            "similarity_scores": recommendation.similarity_score,
+        }
+        samples = [("worker_processes", (), 1)]
+        for name, data in datasets.items():
+            if not isinstance(data, dict):
+                continue  # Failed to load
+            samples.append(("catalog_entries", (name,), len(data)))
+            samples.append(
+                ("catalog_resident_bytes", (name,), self._dataset_size(name, data))
+            )
+        rss = resident_memory()
+        if rss is not None:
+            samples.append(("process_resident_memory_bytes", (), rss))
+        return samples
+
+    def _ensure_flusher(self):
+        # Started lazily so that forked workers get their own flusher thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, name="metrics", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.flush()
+
+    def flush(self):
+        """Write this process's snapshot to METRICS_DIR."""
+        if not self._directory:
+            return
+        path = os.path.join(self._directory, f"{os.getpid()}.json")
+        try:
+            snapshot = self.registry.snapshot()
+            with open(path + ".tmp", "w") as f:
+                json.dump({"pid": os.getpid(), "metrics": snapshot}, f)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            logger.error("Error writing metrics snapshot to %s: %s", path, e)
+
+    def _snapshots(self):
+        if not self._directory:
+            yield self.registry.snapshot(), True
+            return
+        if self._pid == os.getpid():
+            self.flush()  # Report this worker's latest values
+        for filename in os.listdir(self._directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self._directory, filename)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(
+                    "Skipping unreadable metrics snapshot %s: %s", filename, e
+                )
+                continue
+            yield data["metrics"], _alive(data["pid"])
+
+    def exposition(self):
+        """
+        Render the metrics of all processes.
+
+        Returns:
+            str: The Prometheus text exposition.
+        """
+        return render(merge_snapshots(self._snapshots()))
+
+    def _serve(self):
+        token = current_app.config.get("METRICS_TOKEN")
+        if not token:
+            abort(404)
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            logger.warning("Rejected metrics request from %s", request.remote_addr)
+            return Response("Unauthorized\n", status=401, mimetype="text/plain")
+        return Response(
+            self.exposition(), mimetype="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+    def clear(self):
+        """
+        Delete every snapshot in METRICS_DIR.
+
+        Returns:
+            int: Number of files deleted.
+        """
+        removed = 0
+        if not self._directory or not os.path.isdir(self._directory):
+            return removed
+        for filename in os.listdir(self._directory):
+            if filename.endswith((".json", ".tmp")):
+                os.remove(os.path.join(self._directory, filename))
+                removed += 1
+        return removed
+
+    def close(self):
+        """Stop the flusher thread and write a final snapshot."""
+        if self._thread is None or self._pid != os.getpid():
+            return  # Only processes that served requests have anything to add
+        self._stop.set()
+        self.flush()
+
+
+metrics = Metrics()
+
+metrics_cli = AppGroup("metrics", help="Inspect the runtime metrics.")
+
+
+@metrics_cli.command("show")
+def show_command():
+    """Print the current metrics of all worker processes."""
+    click.echo(metrics.exposition(), nl=False)
+
+
+@metrics_cli.command("clear")
+def clear_command():
+    """Delete the per-process snapshots in METRICS_DIR, e.g. before a deploy."""
+    click.echo(f"Removed {metrics.clear()} metrics snapshot(s)")
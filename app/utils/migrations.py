@@ -0,0 +1,164 @@
+from flask.cli import AppGroup
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from app.models import UserHistory, UserRating
+from logger import get_logger
+from app import db
+import click
+
+logger = get_logger(__name__)
+
+# Tables that gained a unique (user_id, movie_id) index, with the column that
+# decides which duplicate to keep (the most recent one wins)
+DEDUPLICATE = (
+    (UserHistory.__table__, "watched_at"),
+    (UserRating.__table__, "rated_at"),
+)
+
+
+def remove_duplicates(connection, table, order_column):
+    """
+    Keep only the most recent row for each (user_id, movie_id) pair.
+
+    Args:
+        connection (Connection): An open database connection.
+        table (Table): The table to clean up.
+        order_column (str): Timestamp column; the newest row is kept.
+
+    Returns:
+        int: The number of rows deleted.
+    """
+    result = connection.execute(
+        text(
+            f"DELETE FROM {table.name} WHERE id NOT IN ("
+            f"SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+            f"PARTITION BY user_id, movie_id ORDER BY {order_column} DESC, id DESC"
+            f") AS position FROM {table.name}) AS ranked WHERE position = 1)"
+        )
+    )
+    return result.rowcount
+
+
+def has_duplicates(connection, table):
+    """
+    Check whether any (user_id, movie_id) pair appears more than once.
+
+    Args:
+        connection (Connection): An open database connection.
+        table (Table): The table to check.
+
+    Returns:
+        bool: True if a unique (user_id, movie_id) index could not be created.
+    """
+    return (
+        connection.execute(
+            text(
+                f"SELECT 1 FROM {table.name} GROUP BY user_id, movie_id "
+                f"HAVING COUNT(*) > 1 LIMIT 1"
+            )
+        ).first()
+        is not None
+    )
+
+
+def missing_indexes(connection):
+    """
+    Find the model indexes the database does not have yet.
+
+    Args:
+        connection (Connection): An open database connection.
+
+    Returns:
+        dict: Table to the list of its missing indexes, for tables missing any.
+    """
+    missing = {}
+    for table, _ in DEDUPLICATE:
+        existing = {
+            index["name"] for index in inspect(connection).get_indexes(table.name)
+        }
+        indexes = [index for index in table.indexes if index.name not in existing]
+        if indexes:
+            missing[table] = indexes
+    return missing
+
+
+def upgrade_schema(engine):
+    """
+    Bring an existing database up to the current models.
+
+    `create_all` creates missing tables but never touches existing ones, so
+    indexes added to a model later are created here. Duplicate history and
+    rating rows left by the old read-then-write code are removed first, as
+    they would block the unique indexes. Safe to run repeatedly, but it
+    deletes rows, so it only runs from ``flask schema upgrade``.
+
+    Args:
+        engine (Engine): The database engine.
+
+    Returns:
+        dict: Table name to the number of duplicate rows removed.
+    """
+    removed = {}
+    with engine.begin() as connection:
+        order_columns = dict(DEDUPLICATE)
+        for table, indexes in missing_indexes(connection).items():
+            if any(index.unique for index in indexes):
+                removed[table.name] = remove_duplicates(
+                    connection, table, order_columns[table]
+                )
+                if removed[table.name]:
+                    logger.warning(
+                        "Removed %s duplicate rows from %s",
+                        removed[table.name],
+                        table.name,
+                    )
+            for index in indexes:
+                index.create(bind=connection)
+                logger.info("Created index %s on %s", index.name, table.name)
+    return removed
+
+
+schema_cli = AppGroup("schema", help="Manage the database schema.")
+
+
+@schema_cli.command("upgrade")
+def upgrade_command():
+    """Create missing tables and indexes, removing duplicate rows first."""
+    db.create_all()
+    removed = upgrade_schema(db.engine)
+    click.echo(f"Schema up to date ({sum(removed.values())} duplicate rows removed).")
+
+
+def init_schema(app):
+    """
+    Create missing tables and indexes and register the schema CLI.
+
+    Every worker runs this at boot, so it never deletes rows: missing indexes
+    are created (``IF NOT EXISTS``, as workers may race) unless the table has
+    duplicate rows that would block a unique index. Those tables are left to
+    ``flask schema upgrade``; until then upserts write row by row.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.cli.add_command(schema_cli)
+    with app.app_context():
+        db.create_all()
+        try:
+            with db.engine.begin() as connection:
+                for table, indexes in missing_indexes(connection).items():
+                    if any(index.unique for index in indexes) and has_duplicates(
+                        connection, table
+                    ):
+                        logger.warning(
+                            "Table %s has duplicate rows blocking indexes %s; "
+                            "run `flask schema upgrade`",
+                            table.name,
+                            ", ".join(index.name for index in indexes),
+                        )
+                        continue
+                    for index in indexes:
+                        connection.execute(CreateIndex(index, if_not_exists=True))
+                        logger.info("Created index %s on %s", index.name, table.name)
+        except Exception as e:
+            logger.error("Database schema check failed: %s", e)
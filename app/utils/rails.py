@@ -0,0 +1,214 @@
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    TimeoutError,
+)
+from flask import current_app
+from app.utils.helper import latest_movies, popular_movies
+from app.utils.recommendation import recommended_movies, recommend_movies_based_on_genre
+from logger import get_logger
+import multiprocessing
+import time
+
+logger = get_logger(__name__)
+
+# Rails whose builders only read the catalog and models loaded at import time.
+# Only these may be offloaded: a worker process has no app context, request or
+# database session.
+OFFLOADABLE_RAILS = {
+    "popular": popular_movies,
+    "latest": latest_movies,
+    "because_you_watch": recommended_movies,
+    "genre_0": recommend_movies_based_on_genre,
+    "genre_1": recommend_movies_based_on_genre,
+}
+
+# Imported once by the fork server, so process workers start with the catalog
+# and models already loaded
+OFFLOAD_PRELOAD = ["app.utils.helper", "app.utils.recommendation"]
+
+
+def _run_in_app_context(app, name, fn, args, kwargs):
+    """
+    Run a rail builder inside a fresh application context.
+
+    Each task pushes its own app context, so Flask-SQLAlchemy hands it a
+    dedicated scoped session which is removed again when the context is popped.
+
+    Args:
+        app (Flask): The application the rail is built for.
+        name (str): Name of the rail, used for logging.
+        fn (callable): The rail builder.
+        args (tuple): Positional arguments for the builder.
+        kwargs (dict): Keyword arguments for the builder.
+
+    Returns:
+        tuple: The rail result and the time spent building it in seconds.
+    """
+    with app.app_context():
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        logger.debug("Rail '%s' built in %.1f ms", name, elapsed * 1000)
+        return result, elapsed
+
+
+def _run_offloaded(fn, args, kwargs):
+    """
+    Run a CPU-bound rail builder in a worker process.
+
+    Only builders in `OFFLOADABLE_RAILS` get here; they only see the catalog
+    and models loaded at import time.
+
+    Returns:
+        tuple: The rail result and the time spent building it in seconds.
+    """
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+class RailExecutor:
+    """
+    Build independent homepage rails concurrently on a bounded thread pool.
+
+    Rails listed in ``RAIL_PROCESS_OFFLOAD`` are sent to a process pool instead,
+    for builders that are pure Python loops over the catalog and would otherwise
+    serialise on the GIL. Only rails in `OFFLOADABLE_RAILS` can be offloaded.
+    Worker processes start from a fork server and re-import the launching
+    script, so serve the app with ``flask run`` or a WSGI server, not by
+    running a script that creates the app without a ``__main__`` guard.
+
+    Configuration:
+        RAIL_MAX_WORKERS (int): Size of the thread pool (0 builds rails inline).
+        RAIL_PROCESS_WORKERS (int): Size of the process pool used for offloading.
+        RAIL_PROCESS_OFFLOAD (list): Names of rails that should run in a process.
+        RAIL_TIMEOUT (float): Seconds to wait for all rails before giving up.
+    """
+
+    def __init__(self, app=None):
+        self._threads = None
+        self._processes = None
+        self._offload = frozenset()
+        self._timeout = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Create the worker pools for the given application.
+
+        Args:
+            app (Flask): The Flask application.
+
+        Raises:
+            ValueError: If RAIL_PROCESS_OFFLOAD names a rail that is not in
+                `OFFLOADABLE_RAILS`.
+        """
+        app.config.setdefault("RAIL_MAX_WORKERS", 4)
+        app.config.setdefault("RAIL_PROCESS_WORKERS", 0)
+        app.config.setdefault("RAIL_PROCESS_OFFLOAD", [])
+        app.config.setdefault("RAIL_TIMEOUT", 10.0)
+        app.config.setdefault("HOMEPAGE_DEFERRED_RAILS", True)
+        app.config.setdefault("HOMEPAGE_RECENT_LIMIT", 20)
+        app.config.setdefault("HOMEPAGE_HISTORY_LIMIT", 500)
+
+        max_workers = app.config["RAIL_MAX_WORKERS"]
+        process_workers = app.config["RAIL_PROCESS_WORKERS"]
+        unknown = set(app.config["RAIL_PROCESS_OFFLOAD"]) - set(OFFLOADABLE_RAILS)
+        if unknown:
+            raise ValueError(
+                f"RAIL_PROCESS_OFFLOAD names rails that cannot run in a process: "
+                f"{', '.join(sorted(unknown))}"
+            )
+
+        if max_workers > 0:
+            self._threads = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="rail"
+            )
+        if process_workers > 0 and app.config["RAIL_PROCESS_OFFLOAD"]:
+            # By now the logging, mail and history threads are running, and
+            # forking this process could copy a held lock into the workers.
+            # A fork server starts them from a clean process that has loaded
+            # the catalog and models once.
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(OFFLOAD_PRELOAD)
+            else:
+                context = multiprocessing.get_context("spawn")
+            self._processes = ProcessPoolExecutor(
+                max_workers=process_workers, mp_context=context
+            )
+            self._offload = frozenset(app.config["RAIL_PROCESS_OFFLOAD"])
+        self._timeout = app.config["RAIL_TIMEOUT"]
+
+        app.extensions["rail_executor"] = self
+        logger.info(
+            "Rail executor initialized with %s threads and %s processes",
+            max_workers,
+            process_workers if self._processes else 0,
+        )
+
+    def submit(self, name, fn, *args, **kwargs):
+        """
+        Schedule a rail builder.
+
+        Args:
+            name (str): Name of the rail.
+            fn (callable): The rail builder. Builders offloaded to a process
+                must be module-level functions with picklable arguments.
+            *args: Positional arguments for the builder.
+            **kwargs: Keyword arguments for the builder.
+
+        Returns:
+            Future: A future resolving to ``(result, elapsed_seconds)``.
+        """
+        if self._processes is not None and name in self._offload:
+            if fn is OFFLOADABLE_RAILS[name]:
+                return self._processes.submit(_run_offloaded, fn, args, kwargs)
+            logger.error("Rail '%s' has an unexpected builder; not offloading", name)
+
+        app = current_app._get_current_object()
+        if self._threads is None:
+            # Pool disabled: build inline but keep the same future interface
+            future = Future()
+            try:
+                future.set_result(_run_in_app_context(app, name, fn, args, kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._threads.submit(_run_in_app_context, app, name, fn, args, kwargs)
+
+    def gather(self, futures):
+        """
+        Wait for a set of scheduled rails.
+
+        A rail that fails or does not finish within ``RAIL_TIMEOUT`` is logged
+        and replaced by an empty list, so one slow recommender cannot break
+        the whole page.
+
+        Args:
+            futures (dict): Mapping of rail name to the future returned by `submit`.
+
+        Returns:
+            tuple: A dict of rail name to result, and a dict of rail name to
+            build time in seconds.
+        """
+        deadline = time.monotonic() + self._timeout
+        results, timings = {}, {}
+        for name, future in futures.items():
+            try:
+                remaining = max(deadline - time.monotonic(), 0)
+                results[name], timings[name] = future.result(timeout=remaining)
+            except TimeoutError:
+                future.cancel()
+                logger.error("Rail '%s' timed out after %ss", name, self._timeout)
+                results[name] = []
+            except Exception as e:
+                logger.error("Rail '%s' failed: %s", name, e)
+                results[name] = []
+        return results, timings
+
+
+rail_executor = RailExecutor()
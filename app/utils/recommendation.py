@@ -1,11 +1,10 @@
 from app.utils.helper import movie_response
-from flask_login import current_user
-from app.models import UserHistory
 from collections import defaultdict
-from app import db
 import pickle
 import os
-from logger import logger
+from logger import get_logger
+
+logger = get_logger(__name__)
 
 
 def load_model(file_path):
@@ -22,27 +21,24 @@ def load_model(file_path):
     try:
         with open(file_path, "rb") as f:
             similarity = pickle.load(f)
-        logger.info(f"Loaded model from {file_path}")
+        logger.info("Loaded model from %s", file_path)
         return similarity
     except FileNotFoundError:
-        logger.error(f"Error: File not found at {file_path}")
+        logger.error("Error: File not found at %s", file_path)
         return {}
     except Exception as e:
-        logger.error(f"Error loading model from {file_path}: {e}")
+        logger.error("Error loading model from %s: %s", file_path, e)
         return {}
 
 
-# Set the paths to the model files
+# Set the paths to the model files; MOVIE_MODELS_DIR selects other models
 current_dir = os.path.dirname(os.path.realpath(__file__))
-features_similarity_dataset_path = os.path.join(
-    current_dir, "..", "..", "models", "features_similarity.pkl"
-)
-items_similarity_dataset_path = os.path.join(
-    current_dir, "..", "..", "models", "items_similarity.pkl"
-)
-similarity_score_dataset_path = os.path.join(
-    current_dir, "..", "..", "models", "similarity_scores.pkl"
+models_dir = os.getenv(
+    "MOVIE_MODELS_DIR", os.path.join(current_dir, "..", "..", "models")
 )
+features_similarity_dataset_path = os.path.join(models_dir, "features_similarity.pkl")
+items_similarity_dataset_path = os.path.join(models_dir, "items_similarity.pkl")
+similarity_score_dataset_path = os.path.join(models_dir, "similarity_scores.pkl")
 
 # Load similarity models
 features_similarity = load_model(features_similarity_dataset_path)
@@ -62,22 +58,24 @@ def recommended_movies(movie_id, already_watched):
         list: A list of recommended movies.
     """
     try:
-        logger.debug(f"Generating recommendations for movie_id {movie_id}")
-        recommended_movie = features_similarity.get(movie_id, [])
-        logger.debug(f"Initial recommendations: {len(recommended_movie)} movies")
+        logger.debug("Generating recommendations for movie_id %s", movie_id)
+        similar = features_similarity.get(movie_id, [])
+        logger.debug("Initial recommendations: %s movies", len(similar))
 
-        already_watched_ids = [watched_id for watched_id, _ in already_watched]
+        already_watched_ids = {watched_id for watched_id, _ in already_watched}
         recommended_movie = [
-            id for id in recommended_movie if id not in already_watched_ids
+            id for id in similar if id not in already_watched_ids
         ][:12]
-        logger.debug(f"Filtered recommendations: {len(recommended_movie)} movies")
+        logger.debug("Filtered recommendations: %s movies", len(recommended_movie))
 
         movies = [movie_response(movie_id) for movie_id in recommended_movie]
-        logger.debug(f"Recommended movies: {len(movies)} movies")
+        logger.debug("Recommended movies: %s movies", len(movies))
 
         return movies
     except Exception as e:
-        logger.error(f"Error generating recommendations for movie_id {movie_id}: {e}")
+        logger.error(
+            "Error generating recommendations for movie_id %s: %s", movie_id, e
+        )
         return []
 
 
@@ -94,24 +92,21 @@ def recommend_movies_based_on_genre(target_genre_name, already_watched):
     """
     try:
         logger.debug(
-            f"Generating genre-based recommendations for genre {target_genre_name}"
+            "Generating genre-based recommendations for genre %s", target_genre_name
         )
 
-        visited_movie_ids = (
-            db.session.query(UserHistory.movie_id, UserHistory.watched_at)
-            .filter_by(user_id=current_user.id)
-            .order_by(UserHistory.watched_at.desc())
-            .all()
-        )
-        logger.debug(f"Visited movie IDs: {len(visited_movie_ids)}")
+        # The caller's history is already bounded; don't load the whole of it
+        logger.debug("Visited movie IDs: %s", len(already_watched))
 
         visited_movie_ids_genre = []
-        for movie_id, _ in visited_movie_ids:
+        for movie_id, _ in already_watched:
             movie = movie_response(movie_id)
             for genre in movie.get("genres", []):
                 if genre["name"] == target_genre_name:
                     visited_movie_ids_genre.append(movie_id)
-        logger.debug(f"Filtered visited movie IDs by genre: {len(visited_movie_ids_genre)}")
+        logger.debug(
+            "Filtered visited movie IDs by genre: %s", len(visited_movie_ids_genre)
+        )
 
         recommendation_scores = defaultdict(list)
 
@@ -127,7 +122,7 @@ def recommend_movies_based_on_genre(target_genre_name, already_watched):
         sorted_recommendations = sorted(
             average_scores.items(), key=lambda x: x[1], reverse=True
         )
-        logger.debug(f"Sorted recommendations: {len(sorted_recommendations)} movies")
+        logger.debug("Sorted recommendations: %s movies", len(sorted_recommendations))
 
         recommended_movies = []
         already_watched_ids = [watched_id for watched_id, _ in already_watched]
@@ -140,11 +135,13 @@ def recommend_movies_based_on_genre(target_genre_name, already_watched):
                             recommended_movies.append(movie_data)
                 if len(recommended_movies) == 20:
                     break
-        logger.debug(f"Final recommended {len(recommended_movies)} movies")
+        logger.debug("Final recommended %s movies", len(recommended_movies))
 
         return recommended_movies
     except Exception as e:
         logger.error(
-            f"Error generating genre-based recommendations for genre {target_genre_name}: {e}"
+            "Error generating genre-based recommendations for genre %s: %s",
+            target_genre_name,
+            e,
         )
         return []
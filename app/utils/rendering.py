@@ -0,0 +1,89 @@
+from flask import current_app, render_template, stream_template
+from jinja2 import FileSystemBytecodeCache
+from logger import get_logger
+import os
+
+logger = get_logger(__name__)
+
+
+def init_template_cache(app):
+    """
+    Persist compiled templates on disk so new workers skip compilation.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    directory = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+    if not directory:
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+        logger.info("Jinja bytecode cache enabled at %s", directory)
+    except OSError as e:
+        logger.error("Unable to enable Jinja bytecode cache at %s: %s", directory, e)
+
+
+def _coalesce(chunks, chunk_size):
+    """
+    Group Jinja's small output events into larger chunks.
+
+    Everything up to the end of the layout head is flushed as soon as it is
+    rendered, so the browser can start fetching stylesheets and fonts while
+    the body is still being built.
+
+    Args:
+        chunks (iterable): The template output events.
+        chunk_size (int): Minimum size of a chunk after the head.
+
+    Yields:
+        str: The coalesced chunks.
+    """
+    buffer, length, head_sent = [], 0, False
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if (not head_sent and "</head>" in chunk) or length >= chunk_size:
+            head_sent = True
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def is_streamed(template_name):
+    """
+    Check whether a page template is sent as it renders.
+
+    Args:
+        template_name (str): The name of the template.
+
+    Returns:
+        bool: True if the template is listed in ``STREAM_TEMPLATES``.
+    """
+    return template_name in current_app.config.get("STREAM_TEMPLATES", ())
+
+
+def render_page(template_name, **context):
+    """
+    Render a page template, streaming it if enabled for that template.
+
+    Templates listed in ``STREAM_TEMPLATES`` are sent as they render. The view's
+    own error handling only covers work done before rendering starts, and
+    streamed pages are not compressed by the app.
+
+    Args:
+        template_name (str): The name of the template.
+        **context: The template context.
+
+    Returns:
+        str or Response: The rendered page, or a streaming response.
+    """
+    if not is_streamed(template_name):
+        return render_template(template_name, **context)
+
+    chunk_size = current_app.config.get("STREAM_CHUNK_SIZE", 8192)
+    return current_app.response_class(
+        _coalesce(stream_template(template_name, **context), chunk_size),
+        mimetype="text/html",
+    )
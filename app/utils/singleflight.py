@@ -0,0 +1,147 @@
+from concurrent.futures import Future
+from logger import get_logger
+import threading
+
+logger = get_logger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one computation.
+
+    The first caller for a key runs the computation; callers arriving while it
+    is in flight wait for it and receive the same result (or exception).
+    Nothing is cached once the computation finishes.
+
+    Args:
+        name (str): Name of the group, used for logging and metrics.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        # Must hold the lock
+        self.calls += 1
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            logger.debug("Coalesced '%s' call for %r", self.name, key)
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run `fn` for `key`, or wait for the run already in flight.
+
+        Args:
+            key (hashable): Identifies the computation.
+            fn (callable): The computation.
+            *args: Positional arguments for `fn`.
+            **kwargs: Keyword arguments for `fn`.
+
+        Returns:
+            The result of the computation.
+        """
+        with self._lock:
+            future = self._join(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.executions += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._forget(key, future)
+
+    def submit(self, key, start):
+        """
+        Start a background computation for `key`, or join the one in flight.
+
+        Args:
+            key (hashable): Identifies the computation.
+            start (callable): Called without arguments to start the
+                computation; must return a Future (e.g. ``executor.submit``).
+
+        Returns:
+            Future: The future of the computation.
+        """
+        with self._lock:
+            future = self._join(key)
+            if future is not None:
+                return future
+            future = start()
+            self._in_flight[key] = future
+            self.executions += 1
+        # Outside the lock: the callback runs immediately if already done
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def stats(self):
+        """
+        Get the group's coalescing metrics.
+
+        Returns:
+            dict: Calls made, computations run, calls that joined a computation
+            in flight and the number currently in flight.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._in_flight),
+            }
+
+
+# Every group created through `single_flight`, by name
+flights = {}
+_flights_lock = threading.Lock()
+
+
+def single_flight(name):
+    """
+    Get the single-flight group with the given name, creating it if needed.
+
+    Args:
+        name (str): Name of the group.
+
+    Returns:
+        SingleFlight: The group.
+    """
+    with _flights_lock:
+        if name not in flights:
+            flights[name] = SingleFlight(name)
+        return flights[name]
+
+
+def flight_stats():
+    """
+    Get the coalescing metrics of every single-flight group.
+
+    Returns:
+        dict: Group name to its metrics.
+    """
+    with _flights_lock:
+        groups = list(flights.values())
+    return {group.name: group.stats() for group in groups}
@@ -0,0 +1,224 @@
+from collections import deque
+from flask import g, has_request_context, request
+from logger import get_logger
+import threading
+import time
+
+logger = get_logger(__name__)
+
+
+class _Span:
+    """Context manager recording how long its block took as a named span."""
+
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_span(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NoopSpan:
+    """Span used when timing is off; does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name):
+    """
+    Time a stage of the current request.
+
+    Use as ``with span("history"): ...``. When request timing is disabled or
+    there is no request, a shared no-op object is returned, so leaving spans
+    in hot code costs one attribute check.
+
+    Args:
+        name (str): Name of the stage; letters, digits, "_", "-" and "." only.
+
+    Returns:
+        A context manager.
+    """
+    if not request_timer.enabled or not has_request_context():
+        return _NOOP
+    return _Span(name)
+
+
+def record_span(name, seconds):
+    """
+    Add an already measured span to the current request.
+
+    For stages timed elsewhere, such as rails built on worker threads.
+
+    Args:
+        name (str): Name of the stage.
+        seconds (float): How long the stage took.
+    """
+    if not request_timer.enabled or not has_request_context():
+        return
+    spans = g.get("_timing_spans")
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+class TimingAggregator:
+    """
+    In-process statistics of span durations per endpoint.
+
+    Keeps a count, total and maximum per (endpoint, span) and a bounded
+    window of recent durations for percentiles.
+    """
+
+    def __init__(self, samples=1000):
+        self.samples = samples
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, spans):
+        """
+        Record the spans of one request.
+
+        Args:
+            endpoint (str): The request's endpoint.
+            spans (list): (name, seconds) pairs.
+        """
+        with self._lock:
+            for name, seconds in spans:
+                stats = self._stats.get((endpoint, name))
+                if stats is None:
+                    stats = self._stats[(endpoint, name)] = {
+                        "count": 0,
+                        "total": 0.0,
+                        "max": 0.0,
+                        "recent": deque(maxlen=self.samples),
+                    }
+                stats["count"] += 1
+                stats["total"] += seconds
+                stats["max"] = max(stats["max"], seconds)
+                stats["recent"].append(seconds)
+
+    def snapshot(self):
+        """
+        Summarise the recorded spans.
+
+        Returns:
+            dict: Endpoint -> span name -> count, mean, p50, p95 and max in
+            milliseconds (percentiles over the recent window).
+        """
+        with self._lock:
+            items = [
+                (key, dict(stats, recent=sorted(stats["recent"])))
+                for key, stats in self._stats.items()
+            ]
+        summary = {}
+        for (endpoint, name), stats in sorted(items):
+            recent = stats["recent"]
+            summary.setdefault(endpoint, {})[name] = {
+                "count": stats["count"],
+                "mean_ms": round(stats["total"] / stats["count"] * 1000, 3),
+                "p50_ms": round(recent[int(len(recent) * 0.5)] * 1000, 3),
+                "p95_ms": round(
+                    recent[min(int(len(recent) * 0.95), len(recent) - 1)] * 1000, 3
+                ),
+                "max_ms": round(stats["max"] * 1000, 3),
+            }
+        return summary
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self._stats.clear()
+
+
+class RequestTimer:
+    """
+    Per-request stage timings, reported as a Server-Timing header.
+
+    Views wrap their stages in `span`; every request also gets a ``total``
+    span. The spans are sent in a ``Server-Timing`` header, shown by browser
+    devtools, added to an in-process `TimingAggregator`, and logged for
+    requests slower than SERVER_TIMING_SLOW_MS. Streamed responses only
+    include the time until streaming starts.
+
+    Configuration:
+        SERVER_TIMING_ENABLED (bool): Record spans at all.
+        SERVER_TIMING_HEADER (bool): Send the Server-Timing header.
+        SERVER_TIMING_SLOW_MS (float): Log the spans of requests slower than
+            this (0 disables the log).
+        SERVER_TIMING_SAMPLES (int): Recent durations kept per span for
+            percentiles.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.aggregator = TimingAggregator()
+        self._header = True
+        self._slow = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Install the request hooks when timing is enabled.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.config.setdefault("SERVER_TIMING_ENABLED", False)
+        app.config.setdefault("SERVER_TIMING_HEADER", True)
+        app.config.setdefault("SERVER_TIMING_SLOW_MS", 500)
+        app.config.setdefault("SERVER_TIMING_SAMPLES", 1000)
+
+        self.enabled = app.config["SERVER_TIMING_ENABLED"]
+        self._header = app.config["SERVER_TIMING_HEADER"]
+        self._slow = app.config["SERVER_TIMING_SLOW_MS"] / 1000
+        self.aggregator = TimingAggregator(app.config["SERVER_TIMING_SAMPLES"])
+        app.extensions["request_timer"] = self
+        if self.enabled:
+            app.before_request(self._start)
+            app.after_request(self._finish)
+
+    def _start(self):
+        g._timing_started = time.perf_counter()
+        g._timing_spans = []
+
+    def _finish(self, response):
+        spans = g.pop("_timing_spans", None)
+        if spans is None:
+            return response
+        spans.append(("total", time.perf_counter() - g.pop("_timing_started")))
+        endpoint = request.endpoint or "unmatched"
+        self.aggregator.add(endpoint, spans)
+
+        if self._header:
+            response.headers.add(
+                "Server-Timing",
+                ", ".join(f"{name};dur={secs * 1000:.1f}" for name, secs in spans),
+            )
+        if self._slow and spans[-1][1] >= self._slow:
+            logger.info(
+                "Slow request %s %s (%s): %s",
+                request.method,
+                request.path,
+                endpoint,
+                ", ".join(f"{name}={secs * 1000:.1f}ms" for name, secs in spans),
+            )
+        return response
+
+
+request_timer = RequestTimer()
@@ -0,0 +1,119 @@
+from flask import current_app
+from app.models import TrailerCache
+from app.utils.upsert import upsert
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from logger import get_logger
+from app import db
+
+logger = get_logger(__name__)
+
+
+def video_id_from_url(video_url):
+    """
+    Extract the YouTube video ID from a watch URL.
+
+    Args:
+        video_url (str): A URL of the form https://www.youtube.com/watch?v=<id>.
+
+    Returns:
+        str or None: The video ID, or None if the URL has none.
+    """
+    try:
+        return parse_qs(urlparse(video_url).query).get("v", [None])[0]
+    except Exception:
+        return None
+
+
+def trailer_url(video_id):
+    """
+    Build the YouTube watch URL for a video ID.
+
+    Args:
+        video_id (str): The YouTube video ID.
+
+    Returns:
+        str: The watch URL.
+    """
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def embed_url(video_id):
+    """
+    Build the YouTube embed URL for a video ID.
+
+    Args:
+        video_id (str): The YouTube video ID.
+
+    Returns:
+        str: The embed URL.
+    """
+    return f"https://www.youtube.com/embed/{video_id}"
+
+
+def get_cached_trailer(movie_id):
+    """
+    Look up a movie's trailer in the persistent cache.
+
+    Entries expire after TRAILER_CACHE_TTL; failed lookups are cached as well
+    and expire after the shorter TRAILER_NEGATIVE_TTL.
+
+    Args:
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        tuple: (hit, video_id). On a hit, video_id is None if the last lookup
+        failed. On a miss, (False, None).
+    """
+    try:
+        entry = db.session.get(TrailerCache, movie_id)
+    except Exception as e:
+        logger.error("Error reading trailer cache for movie ID %s: %s", movie_id, e)
+        db.session.rollback()
+        return False, None
+
+    if entry is None:
+        return False, None
+
+    ttl = (
+        current_app.config.get("TRAILER_CACHE_TTL", 30 * 24 * 60 * 60)
+        if entry.video_id
+        else current_app.config.get("TRAILER_NEGATIVE_TTL", 6 * 60 * 60)
+    )
+    if datetime.utcnow() - entry.resolved_at > timedelta(seconds=ttl):
+        logger.debug("Trailer cache entry expired for movie ID %s", movie_id)
+        return False, None
+
+    logger.debug("Trailer cache hit for movie ID %s: %s", movie_id, entry.video_id)
+    return True, entry.video_id
+
+
+def store_trailer(movie_id, video_id):
+    """
+    Record the outcome of a trailer lookup.
+
+    Args:
+        movie_id (int): The ID of the movie.
+        video_id (str or None): The resolved video ID, or None if the lookup failed.
+
+    Returns:
+        bool: True if the entry was stored, False otherwise.
+    """
+    try:
+        upsert(
+            TrailerCache,
+            {
+                "movie_id": movie_id,
+                "video_id": video_id,
+                "resolved_at": datetime.utcnow(),
+            },
+            index_elements=["movie_id"],
+            update_columns=["video_id", "resolved_at"],
+        )
+        db.session.commit()
+        logger.debug("Stored trailer for movie ID %s: %s", movie_id, video_id)
+        return True
+    except Exception as e:
+        logger.error("Error storing trailer for movie ID %s: %s", movie_id, e)
+        db.session.rollback()
+        return False
@@ -1,13 +1,97 @@
 from googleapiclient.discovery import build
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
-import requests
+from urllib.parse import quote_plus
+from app.utils.http_client import CircuitBreaker, CircuitOpenError, pooled_session
+import threading
+import httplib2
 import os
-from logger import logger
+import re
+from logger import get_logger
+
+logger = get_logger(__name__)
 
 load_dotenv()
 YT_API = os.environ["YT_API"]
-youtube = build("youtube", "v3", developerKey=YT_API)
+
+# Returned whenever no trailer could be found
+DEFAULT_TRAILER_URL = "https://www.youtube.com/watch?v=5PSNL1qE6VY"
+# Point at a different API host (e.g. a local stub) with YT_API_ENDPOINT
+YT_API_ENDPOINT = os.getenv("YT_API_ENDPOINT")
+# Point the search-page fallback at a different host with YT_SCRAPE_URL
+YT_SCRAPE_URL = os.getenv("YT_SCRAPE_URL", "https://www.youtube.com").rstrip("/")
+
+# Outbound HTTP limits (seconds)
+YT_CONNECT_TIMEOUT = float(os.getenv("YT_CONNECT_TIMEOUT", 3.05))
+YT_READ_TIMEOUT = float(os.getenv("YT_READ_TIMEOUT", 5))
+YT_HTTP_POOL_SIZE = int(os.getenv("YT_HTTP_POOL_SIZE", 10))
+# Stop reading a search page after this many bytes
+YT_SCRAPE_MAX_BYTES = int(os.getenv("YT_SCRAPE_MAX_BYTES", 2 * 1024 * 1024))
+# Consecutive failures before an upstream is paused, and for how long
+YT_BREAKER_FAILURES = int(os.getenv("YT_BREAKER_FAILURES", 5))
+YT_BREAKER_RESET = float(os.getenv("YT_BREAKER_RESET", 60))
+
+WATCH_ID_PATTERN = re.compile(rb"/watch\?v=([A-Za-z0-9_-]{11})")
+
+youtube = build(
+    "youtube",
+    "v3",
+    developerKey=YT_API,
+    http=httplib2.Http(timeout=YT_READ_TIMEOUT),
+    client_options={"api_endpoint": YT_API_ENDPOINT} if YT_API_ENDPOINT else None,
+)
+
+# httplib2 connections are not thread-safe, so each thread executes API
+# requests over its own
+_api_http = threading.local()
+
+# Shared by all threads; requests' pooled adapters are safe for concurrent use
+session = pooled_session(pool_size=YT_HTTP_POOL_SIZE)
+
+api_breaker = CircuitBreaker("youtube-api", YT_BREAKER_FAILURES, YT_BREAKER_RESET)
+scrape_breaker = CircuitBreaker(
+    "youtube-search-page", YT_BREAKER_FAILURES, YT_BREAKER_RESET
+)
+
+
+def _thread_http():
+    """
+    Get this thread's HTTP connection for YouTube API requests.
+
+    Returns:
+        httplib2.Http: The connection.
+    """
+    http = getattr(_api_http, "http", None)
+    if http is None:
+        http = _api_http.http = httplib2.Http(timeout=YT_READ_TIMEOUT)
+    return http
+
+
+def scan_video_id(chunks, max_bytes=YT_SCRAPE_MAX_BYTES):
+    """
+    Find the first watch link in a stream of HTML chunks.
+
+    Scans the bytes as they arrive instead of parsing the page, keeping only
+    a short tail of the previous chunk so a link split across chunks is found.
+
+    Args:
+        chunks (iterable): The response body as byte chunks.
+        max_bytes (int): Give up after reading this many bytes.
+
+    Returns:
+        str or None: The video ID, or None if none was found.
+    """
+    tail, read = b"", 0
+    for chunk in chunks:
+        read += len(chunk)
+        buffer = tail + chunk
+        match = WATCH_ID_PATTERN.search(buffer)
+        if match:
+            return match.group(1).decode("ascii")
+        # Longest prefix of a match that can end a chunk
+        tail = buffer[-len("/watch?v=") - 11 :]
+        if read >= max_bytes:
+            break
+    return None
 
 
 def findYTtrailer(movie_title):
@@ -22,7 +106,7 @@ def findYTtrailer(movie_title):
     """
     try:
         search_query = movie_title
-        logger.debug(f"Searching YouTube trailer for: {search_query}")
+        logger.debug("Searching YouTube trailer for: %s", search_query)
 
         request = youtube.search().list(
             part="snippet",
@@ -32,25 +116,36 @@ def findYTtrailer(movie_title):
             videoCategoryId="1",
         )
 
-        response = request.execute()
-        logger.debug(f"YouTube API response: {response}")
+        response = api_breaker.call(request.execute, http=_thread_http())
+        logger.debug(
+            "YouTube API returned %s results for %s",
+            len(response.get("items", [])),
+            search_query,
+        )
 
         item = response["items"][0]
         video_id = item["id"]["videoId"]
         video_url = f"https://www.youtube.com/watch?v={video_id}"
 
         logger.info(
-            f"Found YouTube trailer URL: {video_url} for movie title: {movie_title}"
+            "Found YouTube trailer URL: %s for movie title: %s", video_url, movie_title
         )
         return video_url
+    except CircuitOpenError:
+        logger.debug("YouTube API paused; skipping search for %s", movie_title)
+        return DEFAULT_TRAILER_URL
     except Exception as e:
-        logger.error(f"Error finding YouTube trailer for {movie_title}: {e}")
-        return "https://www.youtube.com/watch?v=5PSNL1qE6VY"
+        logger.error("Error finding YouTube trailer for %s: %s", movie_title, e)
+        return DEFAULT_TRAILER_URL
 
 
 def findYTtrailerbs4(query):
     """
-    Find the YouTube trailer for a given query using BeautifulSoup to scrape YouTube search results.
+    Find the YouTube trailer for a given query by scraping YouTube search results.
+
+    The results page is streamed through a pooled session with connect and
+    read timeouts, and scanned for the first watch link without parsing it.
+    Calls are skipped while the search page's circuit breaker is open.
 
     Args:
         query (str): The search query.
@@ -60,43 +155,49 @@ def findYTtrailerbs4(query):
     """
     try:
         logger.debug(
-            f"Searching YouTube trailer using BeautifulSoup for query: {query}"
+            "Searching YouTube trailer on the results page for query: %s", query
         )
-        query = query.split(" ")
-        query = "+".join(query)
-        search_url = f"https://www.youtube.com/results?search_query={query}"
-
-        logger.debug(f"Search URL: {search_url}")
-
-        # Send an HTTP GET request to YouTube
-        response = requests.get(search_url)
-        logger.debug(f"HTTP GET response status: {response.status_code}")
-
-        if response.status_code == 200:
-            # Parse the HTML response
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # Convert the soup into a string
-            soup = str(soup)
-
-            # Find the index where 'href="/watch?v=' is present in the soup
-            index = soup.find("watch?v=")
-            video_url = (
-                "https://www.youtube.com"
-                + soup[index - 1 : soup.find("\\", index + 10)]
-            )
-
-            logger.info(
-                f"Found YouTube trailer URL using BeautifulSoup: {video_url} for query: {query}"
-            )
-            return video_url
-        else:
+        search_url = f"{YT_SCRAPE_URL}/results?search_query={quote_plus(query)}"
+
+        logger.debug("Search URL: %s", search_url)
+
+        if not scrape_breaker.allow():
+            logger.debug("YouTube search page paused; skipping query: %s", query)
+            return DEFAULT_TRAILER_URL
+
+        try:
+            with session.get(
+                search_url,
+                stream=True,
+                timeout=(YT_CONNECT_TIMEOUT, YT_READ_TIMEOUT),
+            ) as response:
+                logger.debug("HTTP GET response status: %s", response.status_code)
+                if response.status_code != 200:
+                    raise IOError(f"status code {response.status_code}")
+                video_id = scan_video_id(response.iter_content(chunk_size=16384))
+        except Exception as e:
+            scrape_breaker.record_failure()
+            logger.error("Failed to fetch YouTube search results: %s", e)
+            return DEFAULT_TRAILER_URL
+        scrape_breaker.record_success()
+
+        if video_id is None:
             logger.error(
-                f"Failed to fetch YouTube search results. Status code: {response.status_code}"
+                "No trailer found in YouTube search results for query: %s", query
             )
-            return "https://www.youtube.com/watch?v=5PSNL1qE6VY"
+            return DEFAULT_TRAILER_URL
+
+        video_url = f"https://www.youtube.com/watch?v={video_id}"
+        logger.info(
+            "Found YouTube trailer URL from search results: %s for query: %s",
+            video_url,
+            query,
+        )
+        return video_url
     except Exception as e:
         logger.error(
-            f"Error finding YouTube trailer using BeautifulSoup for query {query}: {e}"
+            "Error finding YouTube trailer from search results for query %s: %s",
+            query,
+            e,
         )
-        return "https://www.youtube.com/watch?v=5PSNL1qE6VY"
+        return DEFAULT_TRAILER_URL
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from app.utils.helper import refresh_trailer, trailer_flight
+from app.utils.metrics import metrics
+from app.utils.trailer_cache import get_cached_trailer
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _resolve_and_store(app, movie_id):
+    """
+    Search for a movie's trailer and cache the outcome.
+
+    Runs on a lookup worker, inside its own application context so it gets a
+    dedicated database session.
+
+    Args:
+        app (Flask): The Flask application.
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        str or None: The YouTube video ID, or None if no trailer was found.
+    """
+    with app.app_context():
+        return refresh_trailer(movie_id)
+
+
+class TrailerLookup:
+    """
+    Resolve trailers off the request path with a bounded wait.
+
+    A cache miss schedules the YouTube search on a small thread pool and waits
+    at most TRAILER_LOOKUP_TIMEOUT for it. A search that takes longer keeps
+    running in the background. Searches go through the "trailer" single-flight
+    group, so later requests for the same movie wait on that search instead
+    of starting another one.
+
+    Configuration:
+        TRAILER_LOOKUP_WORKERS (int): Number of concurrent YouTube searches.
+        TRAILER_LOOKUP_TIMEOUT (float): Seconds a request waits for a search.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._timeout = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Create the lookup pool for the given application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.config.setdefault("TRAILER_LOOKUP_WORKERS", 4)
+        app.config.setdefault("TRAILER_LOOKUP_TIMEOUT", 3.0)
+
+        self.app = app
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config["TRAILER_LOOKUP_WORKERS"],
+            thread_name_prefix="trailer",
+        )
+        self._timeout = app.config["TRAILER_LOOKUP_TIMEOUT"]
+        app.extensions["trailer_lookup"] = self
+
+    def _schedule(self, movie_id):
+        return trailer_flight.submit(
+            movie_id,
+            lambda: self._executor.submit(_resolve_and_store, self.app, movie_id),
+        )
+
+    def lookup(self, movie_id):
+        """
+        Get a movie's trailer, waiting a bounded time for a search on a miss.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            tuple: (status, video_id). Status is "ready" with the video ID,
+            "unavailable" if no trailer was found, or "pending" if the search
+            is still running.
+        """
+        hit, video_id = get_cached_trailer(movie_id)
+        cache = "hit" if hit else "miss"
+        if not hit:
+            try:
+                video_id = self._schedule(movie_id).result(timeout=self._timeout)
+            except TimeoutError:
+                logger.debug("Trailer lookup still pending for movie ID %s", movie_id)
+                metrics.inc("trailer_lookups_total", cache, "pending")
+                return "pending", None
+            except Exception as e:
+                logger.error("Trailer lookup failed for movie ID %s: %s", movie_id, e)
+                metrics.inc("trailer_lookups_total", cache, "error")
+                return "unavailable", None
+        status = "ready" if video_id else "unavailable"
+        metrics.inc("trailer_lookups_total", cache, status)
+        return status, video_id or None
+
+
+trailer_lookup = TrailerLookup()
@@ -0,0 +1,263 @@
+from flask import current_app
+from flask.cli import AppGroup
+from datetime import datetime, timezone
+from app.models import TrailerCache
+from app.utils import trailer_finder
+from app.utils.helper import movies, trailer_query
+from app.utils.trailer_cache import get_cached_trailer, store_trailer, video_id_from_url
+from logger import get_logger
+from app import db
+import threading
+import click
+import json
+import os
+
+logger = get_logger(__name__)
+
+# Quota units charged by the YouTube Data API for one search.list call
+SEARCH_QUOTA_COST = 100
+
+
+def movies_by_popularity(top_n=None):
+    """
+    List catalog movie IDs from most to least popular.
+
+    Args:
+        top_n (int, optional): Only return the first `top_n` movies.
+
+    Returns:
+        list: Movie IDs ordered by popularity.
+    """
+    ranked = sorted(
+        movies.values(), key=lambda movie: movie.get("popularity", 0), reverse=True
+    )
+    return [movie["id"] for movie in ranked[:top_n]]
+
+
+def trailer_coverage(top_n):
+    """
+    Measure how much of the most popular part of the catalog has a trailer.
+
+    Args:
+        top_n (int): Number of most popular movies to consider.
+
+    Returns:
+        dict: The number of movies considered, how many have a resolved
+        trailer and the coverage percentage.
+    """
+    movie_ids = movies_by_popularity(top_n)
+    resolved = 0
+    # Stay well below SQLite's bound parameter limit
+    for start in range(0, len(movie_ids), 500):
+        resolved += (
+            db.session.query(TrailerCache.movie_id)
+            .filter(
+                TrailerCache.movie_id.in_(movie_ids[start : start + 500]),
+                TrailerCache.video_id.isnot(None),
+            )
+            .count()
+        )
+    coverage = 100.0 * resolved / len(movie_ids) if movie_ids else 0.0
+    return {"top_n": len(movie_ids), "resolved": resolved, "coverage": coverage}
+
+
+class TrailerPrefetcher:
+    """
+    Resolve trailers ahead of demand, most popular movies first.
+
+    Walks the top TRAILER_PREFETCH_TOP_N movies and looks up every movie
+    without a fresh cache entry. Lookups are spaced out to
+    TRAILER_PREFETCH_RATE per minute and stop for the day once
+    TRAILER_PREFETCH_DAILY_QUOTA API units are spent. Progress and quota use
+    are checkpointed to TRAILER_PREFETCH_CHECKPOINT, so a restarted worker
+    resumes where it left off.
+
+    Configuration:
+        TRAILER_PREFETCH_ENABLED (bool): Run the prefetcher in a background thread.
+        TRAILER_PREFETCH_TOP_N (int): Number of most popular movies to cover.
+        TRAILER_PREFETCH_RATE (float): Maximum lookups per minute.
+        TRAILER_PREFETCH_DAILY_QUOTA (int): YouTube API units the prefetcher may spend per day.
+        TRAILER_PREFETCH_MAX_FAILURES (int): Consecutive failed lookups before pausing.
+        TRAILER_PREFETCH_CHECKPOINT (str): Path of the checkpoint file.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._thread = None
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the CLI commands and start the background thread if enabled.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.config.setdefault("TRAILER_PREFETCH_ENABLED", False)
+        app.config.setdefault("TRAILER_PREFETCH_TOP_N", 1000)
+        app.config.setdefault("TRAILER_PREFETCH_RATE", 10.0)
+        app.config.setdefault("TRAILER_PREFETCH_DAILY_QUOTA", 5000)
+        app.config.setdefault("TRAILER_PREFETCH_MAX_FAILURES", 5)
+        app.config.setdefault(
+            "TRAILER_PREFETCH_CHECKPOINT",
+            os.path.join(app.instance_path, "trailer_prefetch.json"),
+        )
+
+        self.app = app
+        app.cli.add_command(trailers_cli)
+        app.extensions["trailer_prefetcher"] = self
+        if app.config["TRAILER_PREFETCH_ENABLED"]:
+            self.start()
+
+    def load_checkpoint(self):
+        """
+        Load the saved progress, resetting the quota on a new (UTC) day.
+
+        Returns:
+            dict: The position in the popularity order and today's quota use.
+        """
+        today = datetime.now(timezone.utc).date().isoformat()
+        checkpoint = {"position": 0, "quota_day": today, "quota_used": 0}
+        try:
+            with open(self.app.config["TRAILER_PREFETCH_CHECKPOINT"]) as f:
+                checkpoint.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error("Unable to read trailer prefetch checkpoint: %s", e)
+        if checkpoint["quota_day"] != today:
+            checkpoint.update(quota_day=today, quota_used=0)
+        return checkpoint
+
+    def save_checkpoint(self, checkpoint):
+        """
+        Atomically write the prefetch progress to disk.
+
+        Args:
+            checkpoint (dict): The progress to save.
+        """
+        path = self.app.config["TRAILER_PREFETCH_CHECKPOINT"]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(path + ".tmp", path)
+
+    def run(self, limit=None):
+        """
+        Resolve trailers until the top-N is covered, the budget runs out or
+        `limit` lookups have been made. Must run inside an app context.
+
+        Args:
+            limit (int, optional): Maximum number of lookups in this run.
+
+        Returns:
+            dict: Counts of lookups made, trailers resolved, movies skipped
+            because they were already cached, and why the run stopped.
+        """
+        config = self.app.config
+        interval = 60.0 / config["TRAILER_PREFETCH_RATE"]
+        movie_ids = movies_by_popularity(config["TRAILER_PREFETCH_TOP_N"])
+        checkpoint = self.load_checkpoint()
+        stats = {"looked_up": 0, "resolved": 0, "skipped": 0, "stopped": "done"}
+        failures = 0
+
+        while checkpoint["position"] < len(movie_ids):
+            if self._stop.is_set():
+                stats["stopped"] = "shutdown"
+                break
+            if limit is not None and stats["looked_up"] >= limit:
+                stats["stopped"] = "limit"
+                break
+            if (
+                checkpoint["quota_used"] + SEARCH_QUOTA_COST
+                > config["TRAILER_PREFETCH_DAILY_QUOTA"]
+            ):
+                stats["stopped"] = "quota"
+                break
+
+            movie_id = movie_ids[checkpoint["position"]]
+            hit, _ = get_cached_trailer(movie_id)
+            if hit:
+                stats["skipped"] += 1
+                checkpoint["position"] += 1
+                continue
+
+            video_url = trailer_finder.findYTtrailer(trailer_query(movie_id))
+            checkpoint["quota_used"] += SEARCH_QUOTA_COST
+            stats["looked_up"] += 1
+
+            if video_url == trailer_finder.DEFAULT_TRAILER_URL:
+                # Don't cache the failure: the upstream may be down rather than
+                # the movie lacking a trailer, so it is retried on the next pass
+                failures += 1
+                if failures >= config["TRAILER_PREFETCH_MAX_FAILURES"]:
+                    stats["stopped"] = "failures"
+                    self.save_checkpoint(checkpoint)
+                    break
+            else:
+                failures = 0
+                store_trailer(movie_id, video_id_from_url(video_url))
+                stats["resolved"] += 1
+            checkpoint["position"] += 1
+            self.save_checkpoint(checkpoint)
+
+            if self._stop.wait(interval):
+                stats["stopped"] = "shutdown"
+                break
+
+        if checkpoint["position"] >= len(movie_ids):
+            # Start over next time so expired entries get refreshed
+            checkpoint["position"] = 0
+        self.save_checkpoint(checkpoint)
+        logger.info("Trailer prefetch run finished: %s", stats)
+        return stats
+
+    def start(self):
+        """Start prefetching in a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="trailer-prefetch", daemon=True
+        )
+        self._thread.start()
+        logger.info("Trailer prefetch worker started")
+
+    def stop(self):
+        """Ask the background thread to stop after the current lookup."""
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    stats = self.run()
+            except Exception as e:
+                logger.error("Trailer prefetch run failed: %s", e)
+                stats = {"stopped": "error"}
+            # Sleep longer when waiting for the quota to reset
+            self._stop.wait(3600 if stats["stopped"] in ("quota", "failures") else 600)
+
+
+trailers_cli = AppGroup("trailers", help="Manage the trailer cache.")
+
+
+@trailers_cli.command("prefetch")
+@click.option("--limit", type=int, default=None, help="Maximum number of lookups.")
+def prefetch_command(limit):
+    """Resolve trailers for the most popular movies."""
+    stats = current_app.extensions["trailer_prefetcher"].run(limit=limit)
+    click.echo(json.dumps(stats))
+
+
+@trailers_cli.command("coverage")
+@click.option("--top", "top_n", type=int, default=None, help="Number of movies.")
+def coverage_command(top_n):
+    """Report the share of the most popular movies with a cached trailer."""
+    top_n = top_n or current_app.config["TRAILER_PREFETCH_TOP_N"]
+    click.echo(json.dumps(trailer_coverage(top_n)))
+
+
+trailer_prefetcher = TrailerPrefetcher()
@@ -0,0 +1,116 @@
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from logger import get_logger
+from app import db
+import threading
+
+logger = get_logger(__name__)
+
+# Rows sent to the driver per bulk execution
+BATCH_SIZE = 5000
+
+# (database URL, table, conflict columns) to whether a unique index covers them
+_conflict_targets = {}
+_conflict_targets_lock = threading.Lock()
+
+
+def has_conflict_target(model, index_elements):
+    """
+    Check that the table has a unique index or key on exactly these columns.
+
+    ``ON CONFLICT`` fails without one, which happens on databases created
+    before the index was added to the model and not yet upgraded. The answer
+    is remembered per database and table, so only the first write looks.
+
+    Args:
+        model (db.Model): The model to write.
+        index_elements (list): Columns of the unique index to detect conflicts on.
+
+    Returns:
+        bool: True if the table has a matching unique index or key.
+    """
+    connection = db.session.connection()
+    table = model.__table__.name
+    columns = frozenset(index_elements)
+    key = (str(connection.engine.url), table, columns)
+    with _conflict_targets_lock:
+        if key in _conflict_targets:
+            return _conflict_targets[key]
+
+    inspector = inspect(connection)
+    unique = [inspector.get_pk_constraint(table)["constrained_columns"]]
+    unique += [c["column_names"] for c in inspector.get_unique_constraints(table)]
+    unique += [i["column_names"] for i in inspector.get_indexes(table) if i["unique"]]
+    found = any(frozenset(names) == columns for names in unique)
+    if not found:
+        logger.warning(
+            "No unique index on %s(%s); writing row by row until "
+            "`flask schema upgrade` has run",
+            table,
+            ", ".join(index_elements),
+        )
+    with _conflict_targets_lock:
+        _conflict_targets[key] = found
+    return found
+
+
+def upsert(model, values, index_elements, update_columns):
+    """
+    Insert a row, or update it if it conflicts with a unique index.
+
+    Uses a single ``INSERT ... ON CONFLICT DO UPDATE`` on SQLite and
+    PostgreSQL, so there is no read-then-write race. Other databases, and
+    tables still missing the unique index, fall back to a lookup followed by
+    an update or insert. The caller commits.
+
+    Args:
+        model (db.Model): The model to write.
+        values (dict): Column values of the row.
+        index_elements (list): Columns of the unique index to detect conflicts on.
+        update_columns (list): Columns to overwrite when the row exists.
+    """
+    upsert_many(model, [values], index_elements, update_columns)
+
+
+def upsert_many(model, rows, index_elements, update_columns):
+    """
+    Insert or update many rows with as few statements as possible.
+
+    On SQLite and PostgreSQL one ``INSERT ... ON CONFLICT DO UPDATE`` is
+    compiled once and executed for `BATCH_SIZE` rows at a time as a bulk
+    (executemany) insert, so later rows win over earlier rows with the same
+    key. Without a unique index on `index_elements` each row is looked up and
+    then updated or inserted instead. The caller commits.
+
+    Args:
+        model (db.Model): The model to write.
+        rows (list): Column values of each row; all rows need the same keys.
+        index_elements (list): Columns of the unique index to detect conflicts on.
+        update_columns (list): Columns to overwrite when a row exists.
+    """
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql") and has_conflict_target(
+        model, index_elements
+    ):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        statement = insert(model)
+        statement = statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: statement.excluded[column] for column in update_columns},
+        )
+        for start in range(0, len(rows), BATCH_SIZE):
+            db.session.execute(statement, rows[start : start + BATCH_SIZE])
+        return
+
+    for values in rows:
+        existing = model.query.filter_by(
+            **{column: values[column] for column in index_elements}
+        ).first()
+        if existing is None:
+            db.session.add(model(**values))
+        else:
+            for column in update_columns:
+                setattr(existing, column, values[column])
@@ -0,0 +1,132 @@
+from cachetools import TTLCache
+from flask_login import UserMixin
+from app.models import User
+from logger import get_logger
+from app import db
+import threading
+
+logger = get_logger(__name__)
+
+
+class CachedUser(UserMixin):
+    """
+    Lightweight, read-only stand-in for `User` held by the user cache.
+
+    Carries only what authentication and templates need, so it is safe to
+    share between requests and threads. Code that needs to change the user
+    loads the `User` row itself.
+
+    Attributes:
+        id (int): Primary key of the user.
+        username (str): Username of the user.
+        is_activated (bool): Whether the account is activated.
+    """
+
+    def __init__(self, id, username, is_activated):
+        self.id = id
+        self.username = username
+        self.is_activated = bool(is_activated)
+
+    @property
+    def is_active(self):
+        """Check if the user account is active."""
+        return self.is_activated
+
+    def __repr__(self):
+        """String representation of the CachedUser object."""
+        return "<CachedUser {}>".format(self.username)
+
+
+class UserCache:
+    """
+    TTL cache of the users Flask-Login loads on every authenticated request.
+
+    The user loader runs before any route code, so without a cache each
+    request pays a database round trip just to authenticate. Records are kept
+    for USER_CACHE_TTL seconds and dropped explicitly when a user is
+    activated, resets their password or is deleted. Each worker process has
+    its own cache, so a change made in another process is seen there after at
+    most USER_CACHE_TTL seconds.
+
+    Configuration:
+        USER_CACHE_ENABLED (bool): Turn the cache on or off.
+        USER_CACHE_SIZE (int): Maximum number of users kept in memory.
+        USER_CACHE_TTL (int): Seconds a cached user stays valid.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self._cache = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Set up the cache.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.config.setdefault("USER_CACHE_ENABLED", True)
+        app.config.setdefault("USER_CACHE_SIZE", 10000)
+        app.config.setdefault("USER_CACHE_TTL", 300)
+
+        self.enabled = app.config["USER_CACHE_ENABLED"]
+        self._cache = TTLCache(
+            maxsize=app.config["USER_CACHE_SIZE"], ttl=app.config["USER_CACHE_TTL"]
+        )
+        app.extensions["user_cache"] = self
+
+    def load(self, user_id):
+        """
+        Get a user by ID, from the cache when possible.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            CachedUser or None: The user, or None if no such user exists.
+        """
+        if self.enabled:
+            with self._lock:
+                user = self._cache.get(user_id)
+            if user is not None:
+                self.hits += 1
+                return user
+            self.misses += 1
+
+        row = (
+            db.session.query(User.id, User.username, User.is_activated)
+            .filter(User.id == user_id)
+            .first()
+        )
+        if row is None:
+            return None
+
+        user = CachedUser(*row)
+        if self.enabled:
+            with self._lock:
+                self._cache[user_id] = user
+        return user
+
+    def invalidate(self, user_id):
+        """
+        Drop a user from the cache so the next request reloads it.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+        with self._lock:
+            self._cache.pop(user_id, None)
+        logger.debug("Invalidated cached user %s", user_id)
+
+    def clear(self):
+        """Drop every cached user."""
+        with self._lock:
+            self._cache.clear()
+
+
+user_cache = UserCache()
@@ -1,11 +1,13 @@
-from flask_mail import Message
 from flask import url_for, render_template
 from dotenv import load_dotenv
-from logger import logger
-from app import db, mail
+from logger import get_logger
+from app import db
 from app.models import User
+from app.utils.mail_outbox import mail_outbox
 import secrets
 
+logger = get_logger(__name__)
+
 # Load environment variables from a .env file
 load_dotenv()
 
@@ -25,7 +27,7 @@ def add_user(username, email, password):
     Returns:
         bool: True if the user is successfully added, False otherwise.
     """
-    logger.debug(f"Attempting to add user with username: {username}, email: {email}")
+    logger.debug("Attempting to add user with username: %s, email: %s", username, email)
 
     if not username or not password:
         logger.error("Invalid username or password provided.")
@@ -35,10 +37,10 @@ def add_user(username, email, password):
         user = User(username=username, email=email, password_hash=password)
         db.session.add(user)
         db.session.commit()
-        logger.info(f"User '{username}' added to 'users' table.")
+        logger.info("User '%s' added to 'users' table.", username)
         return True
     except Exception as e:
-        logger.error(f"Error adding user to 'users' table: {e}")
+        logger.error("Error adding user to 'users' table: %s", e)
         db.session.rollback()
         return False
 
@@ -51,21 +53,21 @@ def send_otp(email):
         email (str): The email address of the new user.
 
     Returns:
-        bool: True if the email was sent successfully, False otherwise.
+        bool: True if the email was queued for delivery, False otherwise.
     """
-    logger.debug(f"Attempting to send OTP to email: {email}")
+    logger.debug("Attempting to send OTP to email: %s", email)
 
     try:
         token = 784941  # For testing purposes; replace with `otp.now()` for actual OTP
         # token = otp.now()
         subject = "Welcome to MovieFusion! Let's Get Started"
         message_body = render_template("email/otp_email.html", token=token)
-        msg = Message(subject, recipients=[email], html=message_body)
-        mail.send(msg)
-        logger.info(f"Verification email sent successfully to {email}.")
+        if not mail_outbox.enqueue(email, subject, message_body):
+            return False
+        logger.info("Verification email queued for %s.", email)
         return True
     except Exception as e:
-        logger.error(f"Error sending verification email to {email}: {e}")
+        logger.error("Error sending verification email to %s: %s", email, e)
         return False
 
 
@@ -78,7 +80,7 @@ def generate_token():
     """
     logger.debug("Generating a secure token")
     token = secrets.token_urlsafe(32)
-    logger.debug(f"Generated token: {token}")
+    logger.debug("Generated token: %s", token)
     return token
 
 
@@ -92,20 +94,20 @@ def activate_user(email):
     Returns:
         bool or None: True if the user is activated, None if the user is not found.
     """
-    logger.debug(f"Attempting to activate user with email: {email}")
+    logger.debug("Attempting to activate user with email: %s", email)
 
     try:
         user = User.query.filter_by(email=email).first()
         if user:
             user.is_activated = True
             db.session.commit()
-            logger.info(f"User '{user.username}' activated in 'users' table.")
+            logger.info("User '%s' activated in 'users' table.", user.username)
             return True
         else:
-            logger.warning(f"User with email '{email}' not found.")
+            logger.warning("User with email '%s' not found.", email)
             return None
     except Exception as e:
-        logger.error(f"Error activating user in 'users' table: {e}")
+        logger.error("Error activating user in 'users' table: %s", e)
         db.session.rollback()
         return None
 
@@ -119,10 +121,10 @@ def send_password_reset_email(email, token):
         token (str): The unique token for password reset.
 
     Returns:
-        bool: True if the email is sent successfully, False otherwise.
+        bool: True if the email is queued for delivery, False otherwise.
     """
     logger.debug(
-        f"Attempting to send password reset email to: {email} with token: {token}"
+        "Attempting to send password reset email to: %s with token: %s", email, token
     )
 
     reset_link = url_for("auth.reset_password", token=token, _external=True)
@@ -131,11 +133,10 @@ def send_password_reset_email(email, token):
         message_body = render_template(
             "email/password_reset_email.html", reset_link=reset_link
         )
-
-        msg = Message(subject, recipients=[email], html=message_body)
-        mail.send(msg)
-        logger.info(f"Password reset email sent successfully to {email}.")
+        if not mail_outbox.enqueue(email, subject, message_body):
+            return False
+        logger.info("Password reset email queued for %s.", email)
         return True
     except Exception as e:
-        logger.error(f"Error sending password reset email to {email}: {e}")
+        logger.error("Error sending password reset email to %s: %s", email, e)
         return False
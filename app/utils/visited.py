@@ -1,14 +1,21 @@
 from flask_login import current_user
 from app.models import UserHistory, UserRating
+from app.utils.upsert import upsert
+from app.utils.history_buffer import history_buffer
 from datetime import datetime
-from logger import logger
+from logger import get_logger
 from app import db
 
+logger = get_logger(__name__)
+
 
 def add_visited_movie(movie_id):
     """
     Add a movie to the viewing history of the current user, or update the watched_at time if it already exists.
 
+    In buffered HISTORY_WRITE_MODE the event is queued for the next bulk write
+    instead of being committed before returning.
+
     Args:
         movie_id (int): The ID of the movie to be added to the history.
 
@@ -16,40 +23,39 @@ def add_visited_movie(movie_id):
         bool: True if the movie was successfully added or updated, False otherwise.
     """
     try:
-        # Check if the movie is already in the user's history
-        history_entry = UserHistory.query.filter_by(
-            user_id=current_user.id, movie_id=movie_id
-        ).first()
-        logger.debug(
-            f"History entry fetched for user {current_user.id} and movie {movie_id}: {history_entry}"
-        )
-
-        if history_entry:
-            # If the entry exists, update the watched_at time
-            history_entry.watched_at = datetime.now()
-            action = "updated"
-            logger.info(
-                f"Existing history entry found, updating watched_at time for movie {movie_id}"
-            )
-        else:
-            # If the entry does not exist, create a new one
-            new_history_entry = UserHistory(
-                user_id=current_user.id,
-                movie_id=movie_id,
-                watched_at=datetime.now(),
+        if history_buffer.buffered:
+            # Written to the database by the next flush
+            history_buffer.record(current_user.id, movie_id, datetime.utcnow())
+            logger.debug(
+                "Movie %s buffered in history for user %s", movie_id, current_user.id
             )
-            db.session.add(new_history_entry)
-            action = "added"
-            logger.info(f"New history entry created for movie {movie_id}")
+            return True
+
+        # Insert the entry, or move it to the top of the history if it exists
+        upsert(
+            UserHistory,
+            {
+                "user_id": current_user.id,
+                "movie_id": movie_id,
+                "watched_at": datetime.utcnow(),
+            },
+            index_elements=["user_id", "movie_id"],
+            update_columns=["watched_at"],
+        )
 
         # Commit changes to the database
         db.session.commit()
-        logger.info(f"Movie {movie_id} {action} in history for user {current_user.id}")
+        logger.info(
+            "Movie %s recorded in history for user %s", movie_id, current_user.id
+        )
         return True
     except Exception as e:
         # Log any exceptions that occur
         logger.error(
-            f"Failed to add or update movie {movie_id} in history for user {current_user.id}: {e}"
+            "Failed to add or update movie %s in history for user %s: %s",
+            movie_id,
+            current_user.id,
+            e,
         )
         # Rollback the session in case of error
         db.session.rollback()
@@ -68,45 +74,79 @@ def add_movie_rating(movie_id, rating):
         bool: True if the rating was successfully added or updated, False otherwise.
     """
     try:
-        # Check if the user has already rated this movie
-        user_rating = UserRating.query.filter_by(
-            user_id=current_user.id, movie_id=movie_id
-        ).first()
-        logger.debug(
-            f"User rating fetched for user {current_user.id} and movie {movie_id}: {user_rating}"
+        # Insert the rating, or replace the user's previous rating of the movie
+        upsert(
+            UserRating,
+            {
+                "user_id": current_user.id,
+                "movie_id": movie_id,
+                "rating": rating,
+                "rated_at": datetime.utcnow(),
+            },
+            index_elements=["user_id", "movie_id"],
+            update_columns=["rating", "rated_at"],
         )
 
-        if user_rating:
-            # Update the existing rating
-            user_rating.rating = rating
-            user_rating.rated_at = datetime.now()
-            logger.info(
-                f"Existing rating found, updating rating to {rating} for movie {movie_id}"
-            )
-        else:
-            # Create a new rating entry
-            user_rating = UserRating(
-                user_id=current_user.id,
-                movie_id=movie_id,
-                rating=rating,
-                rated_at=datetime.now(),
-            )
-            db.session.add(user_rating)
-            logger.info(
-                f"New rating entry created for movie {movie_id} with rating {rating}"
-            )
-
         # Commit the changes to the database
         db.session.commit()
         logger.info(
-            f"Rating {rating} added for movie {movie_id} by user {current_user.id}"
+            "Rating %s added for movie %s by user %s", rating, movie_id, current_user.id
         )
         return True
     except Exception as e:
         # Log any exceptions that occur
         logger.error(
-            f"Failed to add rating for movie {movie_id} by user {current_user.id}: {e}"
+            "Failed to add rating for movie %s by user %s: %s",
+            movie_id,
+            current_user.id,
+            e,
         )
         # Rollback the session in case of error
         db.session.rollback()
         return False
+
+
+def get_visited_movies(user_id, limit=None, before=None):
+    """
+    Retrieve the viewing history of a user, most recent first.
+
+    Includes the user's buffered history events that have not been written to
+    the database yet. Pages are selected by keyset: pass the `watched_at` of
+    the last entry of one page as `before` to get the next, which stays an
+    index range scan however long the history is.
+
+    Args:
+        user_id (int): The ID of the user.
+        limit (int, optional): Maximum number of entries to return.
+        before (datetime, optional): Only return entries watched before this time.
+
+    Returns:
+        list: A list of (movie_id, watched_at) tuples ordered by watched_at descending.
+    """
+    query = db.session.query(UserHistory.movie_id, UserHistory.watched_at).filter(
+        UserHistory.user_id == user_id
+    )
+    if before is not None:
+        query = query.filter(UserHistory.watched_at < before)
+    query = query.order_by(UserHistory.watched_at.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    visited_movies = query.all()
+    logger.debug("Visited movies fetched for user %s: %s", user_id, len(visited_movies))
+    visited_movies = [
+        (movie_id, watched_at) for movie_id, watched_at in visited_movies
+    ]
+
+    pending = history_buffer.pending_for(user_id) if history_buffer.buffered else []
+    if pending:
+        latest = dict(visited_movies)
+        for movie_id, watched_at in pending:
+            if before is not None and watched_at >= before:
+                # Watched again since; the entry belongs to an earlier page
+                latest.pop(movie_id, None)
+            elif movie_id not in latest or latest[movie_id] < watched_at:
+                latest[movie_id] = watched_at
+        visited_movies = sorted(
+            latest.items(), key=lambda item: item[1], reverse=True
+        )[:limit]
+    return visited_movies
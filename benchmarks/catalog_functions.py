@@ -0,0 +1,276 @@
+"""
+Measure the latency, throughput and memory of the catalog functions.
+
+Loads a catalog produced by synthetic_catalog.py (generating it first if
+needed), imports its watch histories into a fresh SQLite database and calls
+each function with randomised arguments drawn from the catalog and the
+histories. For every function it reports latency percentiles, single-thread
+throughput and the peak memory allocated by one call (measured separately
+with tracemalloc, so tracing does not skew the timings).
+
+Pass --json to keep the results, so a change can be compared with its
+baseline run.
+
+The app's usual environment (.env) must be available, since the benchmark
+builds the real application.
+
+Usage:
+    python benchmarks/catalog_functions.py --scale 10k --iterations 200
+    python benchmarks/catalog_functions.py --data /tmp/catalog-100k --json out.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from synthetic_catalog import SCALES, generate  # noqa: E402
+
+FUNCTIONS = (
+    "popular_movies",
+    "latest_movies",
+    "filter_movies_by_genre",
+    "perform_search",
+    "recommended_movies",
+    "recommend_movies_based_on_genre",
+    "most_watched_genres",
+)
+
+
+def load_app(data_dir, database):
+    """Build the application against a generated catalog and a fresh database."""
+    # The catalog and models are loaded when their modules are imported
+    os.environ["MOVIE_DATASET_PATH"] = os.path.join(
+        data_dir, "dataset", "movie_api.pkl"
+    )
+    os.environ["MOVIE_MODELS_DIR"] = os.path.join(data_dir, "models")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from config import Config
+    from app import create_app
+
+    config = type(
+        "CatalogBenchmarkConfig",
+        (Config,),
+        {
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + database,
+            "TRAILER_PREFETCH_ENABLED": False,
+            "HISTORY_WRITE_MODE": "sync",
+        },
+    )
+    return create_app(config)
+
+
+def import_history(data_dir):
+    """Create the benchmark users and import their histories."""
+    from sqlalchemy import insert
+    from app import db
+    from app.models import User
+    from app.utils.bulk_data import import_records, parse_records
+
+    with open(os.path.join(data_dir, "history.csv"), newline="") as f:
+        records = list(parse_records("history", f, "csv"))
+    user_ids = sorted({row["user_id"] for _, row in records if row})
+    db.session.execute(
+        insert(User),
+        [
+            {
+                "id": user_id,
+                "username": f"bench{user_id}",
+                "email": f"bench{user_id}@example.com",
+                "password_hash": "-",
+                "is_activated": True,
+            }
+            for user_id in user_ids
+        ],
+    )
+    db.session.commit()
+    import_records("history", records)
+    return user_ids
+
+
+def workloads(user_ids, rng):
+    """Build a callable per function that makes one call with random arguments."""
+    from app.utils import helper, recommendation
+    from app.utils.visited import get_visited_movies
+
+    movie_ids = list(helper.movies)
+    genres = sorted(
+        {genre["name"] for movie in helper.movies.values() for genre in movie["genres"]}
+    )
+    words = sorted(
+        {
+            word.lower()
+            for movie in helper.movies.values()
+            for word in movie["title"].split()
+        }
+    )
+    # Histories are read once so the catalog functions are timed on their own
+    histories = {user_id: get_visited_movies(user_id) for user_id in user_ids}
+
+    def watched():
+        user_id = rng.choice(user_ids)
+        return user_id, histories[user_id]
+
+    def query():
+        word = rng.choice(words)
+        return word[: rng.randint(3, len(word))] if len(word) > 3 else word
+
+    def genre_recommendations():
+        user_id, history = watched()
+        return recommendation.recommend_movies_based_on_genre(
+            rng.choice(genres), history, user_id=user_id
+        )
+
+    return {
+        "popular_movies": lambda: helper.popular_movies(watched()[1]),
+        "latest_movies": lambda: helper.latest_movies(watched()[1]),
+        "filter_movies_by_genre": lambda: helper.filter_movies_by_genre(
+            rng.choice(genres)
+        ),
+        "perform_search": lambda: helper.perform_search(query()),
+        "recommended_movies": lambda: recommendation.recommended_movies(
+            rng.choice(movie_ids), watched()[1]
+        ),
+        "recommend_movies_based_on_genre": genre_recommendations,
+        "most_watched_genres": lambda: helper.most_watched_genres(
+            user_id=rng.choice(user_ids)
+        ),
+    }
+
+
+def percentile(samples, fraction):
+    """Return the given percentile of sorted `samples` in milliseconds."""
+    if not samples:
+        return 0.0
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)] * 1000
+
+
+def measure(call, iterations, memory_iterations, warmup=3):
+    """Time `iterations` calls, then trace the peak memory of a few more."""
+    for _ in range(warmup):
+        call()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    peak = 0
+    tracemalloc.start()
+    for _ in range(memory_iterations):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        call()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return {
+        "calls": iterations,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "calls_per_s": iterations / elapsed if elapsed else 0.0,
+        "peak_kb": peak / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="Directory of a generated catalog.")
+    source.add_argument(
+        "--scale", choices=SCALES, help="Generate a catalog of this size first."
+    )
+    parser.add_argument("--out", help="Where to generate the catalog (--scale).")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--history", type=int, default=100, help="Views per user.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--memory-iterations", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--function", action="append", choices=FUNCTIONS, help="Repeatable."
+    )
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    data_dir = args.data
+    if data_dir is None:
+        data_dir = args.out or os.path.join(
+            tempfile.gettempdir(), f"moviefusion-catalog-{args.scale}"
+        )
+        if not os.path.exists(os.path.join(data_dir, "history.csv")):
+            generate(
+                data_dir,
+                SCALES[args.scale],
+                users=args.users,
+                per_user=args.history,
+                seed=args.seed,
+            )
+
+    database = os.path.join(tempfile.mkdtemp(prefix="bench-catalog-"), "movies.db")
+    load_started = time.perf_counter()
+    app = load_app(data_dir, database)
+    load_seconds = time.perf_counter() - load_started
+
+    results = []
+    with app.app_context():
+        from app.utils.helper import movies
+
+        user_ids = import_history(data_dir)
+        calls = workloads(user_ids, random.Random(args.seed))
+        print(
+            f"Catalog of {len(movies)} movies and {len(user_ids)} users "
+            f"loaded in {load_seconds:.1f}s"
+        )
+        for name in args.function or FUNCTIONS:
+            stats = measure(calls[name], args.iterations, args.memory_iterations)
+            results.append({"function": name, **stats})
+
+    columns = ("p50_ms", "p95_ms", "p99_ms", "max_ms", "calls_per_s", "peak_kb")
+    width = max(len(name) for name in FUNCTIONS)
+    header = "  ".join(f"{column:>11}" for column in columns)
+    print(f"{'function':<{width}}  {header}")
+    for result in results:
+        print(
+            f"{result['function']:<{width}}  "
+            + "  ".join(f"{result[column]:>11.2f}" for column in columns)
+        )
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    max_rss_mb = max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    print(f"Peak process RSS: {max_rss_mb:.0f} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "catalog": data_dir,
+                    "movies": len(movies),
+                    "users": len(user_ids),
+                    "iterations": args.iterations,
+                    "python": platform.python_version(),
+                    "load_seconds": load_seconds,
+                    "max_rss_mb": max_rss_mb,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Measure history read/write throughput under concurrent worker processes.
+
+Runs the same mixed workload (recording a watched movie and reading a user's
+history) against a fresh SQLite database once per engine profile, from
+several processes at once, the way multiple gunicorn workers share one
+database file. The "default" profile is SQLite's stock rollback journal with
+full syncs; "tuned" is the application's configured profile (WAL,
+synchronous=NORMAL, busy timeout, mmap).
+
+The app's usual environment (.env) must be available, since the benchmark
+builds the real application for each worker.
+
+Usage:
+    python benchmarks/db_concurrency.py --workers 4 --seconds 10 --write-ratio 0.3
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from config import Config  # noqa: E402
+
+PROFILES = {
+    "default": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_MMAP_SIZE": None,
+        "SQLITE_CACHE_SIZE": None,
+    },
+    "tuned": {},
+}
+
+
+def make_config(profile, database):
+    """Build a config class for `profile` pointing at `database`."""
+    return type(
+        f"{profile.title()}BenchmarkConfig",
+        (Config,),
+        {
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + database,
+            "TRAILER_PREFETCH_ENABLED": False,
+            **PROFILES[profile],
+        },
+    )
+
+
+def worker(profile, database, seconds, write_ratio, users, seed, results):
+    """Run the workload in one process and report its latencies."""
+    from datetime import datetime
+    from app import create_app, db
+    from app.models import UserHistory
+    from app.utils.upsert import upsert
+    from app.utils.visited import get_visited_movies
+
+    app = create_app(make_config(profile, database))
+    rng = random.Random(seed)
+    reads, writes, errors = [], [], 0
+
+    with app.app_context():
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            user_id = rng.randint(1, users)
+            started = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    upsert(
+                        UserHistory,
+                        {
+                            "user_id": user_id,
+                            "movie_id": rng.randint(1, 5000),
+                            "watched_at": datetime.now(),
+                        },
+                        index_elements=["user_id", "movie_id"],
+                        update_columns=["watched_at"],
+                    )
+                    db.session.commit()
+                    writes.append(time.perf_counter() - started)
+                else:
+                    get_visited_movies(user_id)
+                    reads.append(time.perf_counter() - started)
+            except Exception:
+                db.session.rollback()
+                errors += 1
+    results.put((reads, writes, errors))
+
+
+def percentile(samples, fraction):
+    """Return the given percentile of `samples` in milliseconds."""
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)] * 1000
+
+
+def run_profile(profile, args):
+    """Run all workers against a fresh database and summarise the results."""
+    from app import create_app, db
+
+    directory = tempfile.mkdtemp(prefix=f"bench-{profile}-")
+    database = os.path.join(directory, "movies.db")
+
+    # Create the schema once, before the workers start
+    app = create_app(make_config(profile, database))
+    with app.app_context():
+        db.engine.dispose()
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=worker,
+            args=(
+                profile,
+                database,
+                args.seconds,
+                args.write_ratio,
+                args.users,
+                seed,
+                results,
+            ),
+        )
+        for seed in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    reads, writes, errors = [], [], 0
+    for _ in processes:
+        worker_reads, worker_writes, worker_errors = results.get()
+        reads += worker_reads
+        writes += worker_writes
+        errors += worker_errors
+    for process in processes:
+        process.join()
+
+    return {
+        "profile": profile,
+        "ops_per_s": (len(reads) + len(writes)) / args.seconds,
+        "read_p50_ms": percentile(reads, 0.5),
+        "read_p95_ms": percentile(reads, 0.95),
+        "write_p50_ms": percentile(writes, 0.5),
+        "write_p95_ms": percentile(writes, 0.95),
+        "mean_write_ms": statistics.fmean(writes) * 1000 if writes else 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument(
+        "--profile", choices=[*PROFILES, "both"], default="both", help="Engine profile."
+    )
+    args = parser.parse_args()
+
+    profiles = list(PROFILES) if args.profile == "both" else [args.profile]
+    columns = (
+        "profile",
+        "ops_per_s",
+        "read_p50_ms",
+        "read_p95_ms",
+        "write_p50_ms",
+        "write_p95_ms",
+        "mean_write_ms",
+        "errors",
+    )
+    print("  ".join(f"{column:>13}" for column in columns))
+    for profile in profiles:
+        summary = run_profile(profile, args)
+        print(
+            "  ".join(
+                f"{summary[column]:>13.2f}"
+                if isinstance(summary[column], float)
+                else f"{summary[column]:>13}"
+                for column in columns
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
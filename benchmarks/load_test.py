@@ -0,0 +1,388 @@
+"""
+Drive realistic traffic at the application and find where it saturates.
+
+Starts local YouTube and SMTP stand-ins (service_stubs.py), seeds a fresh
+SQLite database with users, watch histories and ratings, boots the app
+through create_app in a separate process and serves it with a threaded
+WSGI server. Logged-in virtual users then send a weighted mix of requests
+(home page, movie page, trailer lookup, history POST, search, rating and,
+optionally, sign-ups that send mail) for a fixed time at each concurrency
+level. p50/p95/p99 latency, throughput and error rate are reported per
+route and per level; the level where throughput stops rising while latency
+climbs is the saturation point.
+
+Login throttling is switched off, since every virtual user comes from
+127.0.0.1. Pass --catalog to run against a generated catalog
+(synthetic_catalog.py) instead of the bundled one.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 1 4 16 32 --duration 20
+    python benchmarks/load_test.py --mix home=5 movie=3 register=1 --json out.json
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from service_stubs import SMTPStub, YouTubeStub  # noqa: E402
+
+PASSWORD = "load-test-password"
+
+# Relative weights of each kind of request
+DEFAULT_MIX = {
+    "home": 30,
+    "movie": 25,
+    "trailer": 10,
+    "history": 15,
+    "search": 10,
+    "rating": 10,
+    "register": 0,
+}
+
+
+def make_config(database):
+    """Build the load test config class pointing at `database`."""
+    from config import Config
+
+    return type(
+        "LoadTestConfig",
+        (Config,),
+        {
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + database,
+            "TRAILER_PREFETCH_ENABLED": False,
+            "LOGIN_THROTTLE_ENABLED": False,
+            "MAIL_OUTBOX_POLL_INTERVAL": 1.0,
+        },
+    )
+
+
+def serve(database, port):
+    """Run the application on a threaded WSGI server (in a child process)."""
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    # One access log line per request would dominate the output
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    app = create_app(make_config(database))
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def seed(database, users, history, seed_value):
+    """Create users with watch histories and ratings; return the catalog ids."""
+    from werkzeug.security import generate_password_hash
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.models import User, UserHistory, UserRating
+    from app.utils.helper import movies
+    from app.utils.upsert import upsert_many
+
+    rng = random.Random(seed_value)
+    movie_ids = list(movies)
+    # A cheap hash keeps logging in the virtual users fast
+    password_hash = generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000")
+    now = datetime.now()
+
+    app = create_app(make_config(database))
+    with app.app_context():
+        db.session.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "username": f"load{user_id}",
+                    "email": f"load{user_id}@example.com",
+                    "password_hash": password_hash,
+                    "is_activated": True,
+                }
+                for user_id in range(1, users + 1)
+            ],
+        )
+        views, ratings = [], []
+        for user_id in range(1, users + 1):
+            for movie_id in rng.sample(movie_ids, min(history, len(movie_ids))):
+                watched_at = now - timedelta(minutes=rng.randrange(60 * 24 * 90))
+                views.append(
+                    {"user_id": user_id, "movie_id": movie_id, "watched_at": watched_at}
+                )
+                if rng.random() < 0.3:
+                    ratings.append(
+                        {
+                            "user_id": user_id,
+                            "movie_id": movie_id,
+                            "rating": rng.randint(1, 5),
+                            "rated_at": watched_at,
+                        }
+                    )
+        upsert_many(UserHistory, views, ["user_id", "movie_id"], ["watched_at"])
+        upsert_many(
+            UserRating, ratings, ["user_id", "movie_id"], ["rating", "rated_at"]
+        )
+        db.session.commit()
+        db.engine.dispose()
+    return movie_ids
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + "/auth/login", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Application did not start at {base_url}")
+
+
+class VirtualUser:
+    """A logged-in browser session issuing requests from the mix."""
+
+    def __init__(self, base_url, user_id, catalog, rng):
+        self.base_url = base_url
+        self.catalog = catalog
+        self.rng = rng
+        self.session = requests.Session()
+        response = self.session.post(
+            base_url + "/auth/login",
+            data={"username": f"load{user_id}", "password": PASSWORD},
+            allow_redirects=False,
+        )
+        if response.status_code != 302:
+            raise RuntimeError(
+                f"Login failed for load{user_id}: {response.status_code}"
+            )
+
+    def request(self, kind):
+        movie_id, slug, word = self.rng.choice(self.catalog)
+        if kind == "home":
+            return self.session.get(self.base_url + "/")
+        if kind == "movie":
+            return self.session.get(f"{self.base_url}/movie/{slug}")
+        if kind == "trailer":
+            return self.session.get(f"{self.base_url}/movie/{movie_id}/trailer")
+        if kind == "history":
+            return self.session.post(f"{self.base_url}/movie/history/{movie_id}")
+        if kind == "search":
+            return self.session.get(f"{self.base_url}/search/{word}")
+        if kind == "rating":
+            stars = self.rng.randint(1, 5)
+            return self.session.post(f"{self.base_url}/movie/rating/{movie_id}/{stars}")
+        if kind == "register":
+            # A new, throwaway session, so this user stays logged in
+            name = f"signup{self.rng.getrandbits(48):x}"
+            return requests.post(
+                self.base_url + "/auth/register",
+                data={
+                    "username": name,
+                    "email": f"{name}@example.com",
+                    "password": PASSWORD,
+                    "confirm_password": PASSWORD,
+                },
+                allow_redirects=False,
+            )
+        raise ValueError(f"Unknown request kind: {kind}")
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)] * 1000
+
+
+def run_stage(users, mix, duration):
+    """Run `len(users)` virtual users for `duration` seconds."""
+    kinds = [kind for kind, weight in mix.items() if weight > 0]
+    weights = [mix[kind] for kind in kinds]
+    samples = {kind: [] for kind in kinds}
+    errors = {kind: 0 for kind in kinds}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def loop(user):
+        while time.monotonic() < deadline:
+            kind = user.rng.choices(kinds, weights)[0]
+            started = time.perf_counter()
+            try:
+                failed = user.request(kind).status_code >= 400
+            except requests.RequestException:
+                failed = True
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples[kind].append(elapsed)
+                errors[kind] += failed
+
+    threads = [threading.Thread(target=loop, args=(user,)) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    rows = []
+    for kind in kinds + ["total"]:
+        if kind == "total":
+            latencies = sorted(s for values in samples.values() for s in values)
+            failed = sum(errors.values())
+        else:
+            latencies = sorted(samples[kind])
+            failed = errors[kind]
+        rows.append(
+            {
+                "concurrency": len(users),
+                "route": kind,
+                "requests": len(latencies),
+                "rps": len(latencies) / duration,
+                "p50_ms": percentile(latencies, 0.5),
+                "p95_ms": percentile(latencies, 0.95),
+                "p99_ms": percentile(latencies, 0.99),
+                "error_pct": 100 * failed / len(latencies) if latencies else 0.0,
+            }
+        )
+    return rows
+
+
+def parse_mix(items):
+    mix = dict(DEFAULT_MIX)
+    if items:
+        mix = dict.fromkeys(DEFAULT_MIX, 0)
+        for item in items:
+            kind, _, weight = item.partition("=")
+            if kind not in mix:
+                raise SystemExit(f"Unknown request kind in --mix: {kind}")
+            mix[kind] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per level.")
+    parser.add_argument(
+        "--mix",
+        nargs="+",
+        metavar="KIND=WEIGHT",
+        help=f"Kinds: {', '.join(DEFAULT_MIX)}.",
+    )
+    parser.add_argument("--users", type=int, default=None, help="Seeded users.")
+    parser.add_argument("--history", type=int, default=50, help="Views per user.")
+    parser.add_argument("--catalog", help="Directory of a generated catalog.")
+    parser.add_argument("--youtube-latency", type=float, default=0.2)
+    parser.add_argument("--smtp-latency", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+    users = args.users or max(args.concurrency)
+    if users < max(args.concurrency):
+        parser.error("--users must be at least the highest --concurrency")
+
+    youtube = YouTubeStub(latency=args.youtube_latency).start()
+    smtp = SMTPStub(latency=args.smtp_latency).start()
+    # The app reads these when it is imported, here and in the server process
+    os.environ.update(
+        {
+            "YT_API": "load-test",
+            "YT_API_ENDPOINT": youtube.url,
+            "YT_SCRAPE_URL": youtube.url,
+            "MAIL_SERVER": "127.0.0.1",
+            "MAIL_PORT": str(smtp.port),
+            "MAIL_USE_TLS": "false",
+            "MAIL_DEFAULT_SENDER": "load-test@example.com",
+        }
+    )
+    os.environ.setdefault("FLASK_SECRET_KEY", "load-test")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if args.catalog:
+        os.environ["MOVIE_DATASET_PATH"] = os.path.join(
+            args.catalog, "dataset", "movie_api.pkl"
+        )
+        os.environ["MOVIE_MODELS_DIR"] = os.path.join(args.catalog, "models")
+
+    database = os.path.join(tempfile.mkdtemp(prefix="load-test-"), "movies.db")
+    movie_ids = seed(database, users, args.history, args.seed)
+
+    from app.utils.helper import movies, url_slug
+
+    # (movie id, page slug, search word) for each movie
+    catalog = []
+    for movie_id in movie_ids:
+        slug = url_slug(movies[movie_id].get("title", ""))
+        if slug:
+            catalog.append((movie_id, slug, slug.split("-")[0]))
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = multiprocessing.get_context("spawn").Process(
+        target=serve, args=(database, port), daemon=True
+    )
+    server.start()
+    results = []
+    try:
+        wait_until_up(base_url)
+        rng = random.Random(args.seed)
+        virtual_users = [
+            VirtualUser(base_url, user_id, catalog, random.Random(rng.random()))
+            for user_id in range(1, users + 1)
+        ]
+
+        columns = ("requests", "rps", "p50_ms", "p95_ms", "p99_ms", "error_pct")
+        print(
+            f"{'conc':>5}  {'route':<9}  "
+            + "  ".join(f"{column:>9}" for column in columns)
+        )
+        for concurrency in args.concurrency:
+            rows = run_stage(virtual_users[:concurrency], mix, args.duration)
+            results.extend(rows)
+            for row in rows:
+                print(
+                    f"{row['concurrency']:>5}  {row['route']:<9}  "
+                    + "  ".join(
+                        f"{row[column]:>9.1f}"
+                        if isinstance(row[column], float)
+                        else f"{row[column]:>9}"
+                        for column in columns
+                    )
+                )
+    finally:
+        server.terminate()
+        server.join()
+        youtube.stop()
+        smtp.stop()
+
+    print(f"YouTube stub: {youtube.counts}  SMTP stub: {smtp.counts}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "mix": mix,
+                    "duration": args.duration,
+                    "users": users,
+                    "youtube": youtube.counts,
+                    "smtp": smtp.counts,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Local stand-ins for the external services the application talks to.
+
+YouTubeStub answers both the YouTube Data API search endpoint used through
+googleapiclient and the search results page scraped as a fallback.
+SMTPStub accepts and discards mail. Both run in background threads, count
+what they served and can inject latency and failures, so load tests and
+benchmarks need neither a YouTube key nor a mail server.
+
+Point the application at them before it is imported:
+
+    YT_API_ENDPOINT=<youtube.url>  YT_SCRAPE_URL=<youtube.url>
+    MAIL_SERVER=127.0.0.1  MAIL_PORT=<smtp.port>  MAIL_USE_TLS=false
+"""
+
+import hashlib
+import json
+import random
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _video_id(query):
+    # Stable per query, so repeated lookups of a movie find the same trailer
+    return hashlib.md5(query.encode("utf-8")).hexdigest()[:11]
+
+
+class _YouTubeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        stub = self.server.stub
+        url = urlparse(self.path)
+        api = url.path.startswith("/youtube/v3/search")
+        params = parse_qs(url.query)
+        query = (params.get("q") or params.get("search_query") or [""])[0]
+        stub.count("api" if api else "scrape")
+
+        if stub.latency:
+            time.sleep(stub.latency)
+        if stub.failure_rate and random.random() < stub.failure_rate:
+            stub.count("failures")
+            self.send_error(503)
+            return
+
+        video_id = _video_id(query)
+        if api:
+            body = json.dumps({"items": [{"id": {"videoId": video_id}}]}).encode()
+            content_type = "application/json"
+        else:
+            # Roughly the size of a real results page, with the first result late
+            body = (
+                "<html>" + "x" * 200_000 + f'"url":"/watch?v={video_id}\\u0026pp=1"'
+                "</html>"
+            ).encode()
+            content_type = "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Stub:
+    def __init__(self, latency, failure_rate):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def _serve(self, server):
+        server.stub = self
+        self._server = server
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class YouTubeStub(_Stub):
+    """
+    Serve canned YouTube API and search page responses.
+
+    Args:
+        latency (float): Seconds to wait before answering each request.
+        failure_rate (float): Share of requests answered with a 503.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        super().__init__(latency, failure_rate)
+
+    def start(self, port=0):
+        """Start serving on 127.0.0.1 (any free port by default)."""
+        return self._serve(ThreadingHTTPServer(("127.0.0.1", port), _YouTubeHandler))
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        stub = self.server.stub
+        stub.count("connections")
+        self.reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line[:4].decode("ascii", "replace").upper()
+            if verb == "EHLO":
+                self.reply("250-stub")
+                self.reply("250 8BITMIME")
+            elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if stub.failure_rate and random.random() < stub.failure_rate:
+                    stub.count("failures")
+                    self.reply("451 Temporary failure")
+                else:
+                    stub.count("messages")
+                    self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _ThreadingSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPStub(_Stub):
+    """
+    Accept mail over plain SMTP and count it.
+
+    Args:
+        latency (float): Seconds to wait before accepting each message.
+        failure_rate (float): Share of messages rejected with a 451.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        super().__init__(latency, failure_rate)
+
+    def start(self, port=0):
+        """Start serving on 127.0.0.1 (any free port by default)."""
+        return self._serve(_ThreadingSMTPServer(("127.0.0.1", port), _SMTPHandler))
@@ -0,0 +1,217 @@
+"""
+Generate a synthetic movie catalog, similarity models and watch histories.
+
+The bundled catalog only has about 4.8k movies, which hides how the catalog
+functions scale. This writes files with the same layout and shapes as the
+real ones, at any size, so the application and the benchmarks can load them
+in place of the bundled data:
+
+    <out>/dataset/movie_api.pkl          movie id -> TMDB-style movie dict
+    <out>/models/features_similarity.pkl movie id -> list of similar movie ids
+    <out>/models/items_similarity.pkl    movie id -> list of similar movie ids
+    <out>/models/similarity_scores.pkl   movie id -> list of (movie id, score)
+    <out>/history.csv                    user_id,movie_id,watched_at rows, in
+                                         the format of "flask data import"
+
+Point the application at a generated catalog with
+MOVIE_DATASET_PATH=<out>/dataset/movie_api.pkl and MOVIE_MODELS_DIR=<out>/models.
+At the 1m scale, with the default neighbour counts, expect the models to
+need several GB of memory once loaded.
+
+Usage:
+    python benchmarks/synthetic_catalog.py --scale 100k --out /tmp/catalog-100k
+"""
+
+import argparse
+import csv
+import os
+import pickle
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# TMDB genre ids and names, as in the bundled catalog
+GENRES = [
+    (28, "Action"),
+    (12, "Adventure"),
+    (16, "Animation"),
+    (35, "Comedy"),
+    (80, "Crime"),
+    (99, "Documentary"),
+    (18, "Drama"),
+    (10751, "Family"),
+    (14, "Fantasy"),
+    (36, "History"),
+    (27, "Horror"),
+    (10402, "Music"),
+    (9648, "Mystery"),
+    (10749, "Romance"),
+    (878, "Science Fiction"),
+    (10770, "TV Movie"),
+    (53, "Thriller"),
+    (10752, "War"),
+    (37, "Western"),
+]
+
+TITLE_WORDS = (
+    "dark night river silent last empire star city lost secret king shadow "
+    "storm winter fire garden ghost road house island war love dream stone "
+    "blood summer moon hunter world heart machine ocean crown mirror signal "
+    "edge frontier legacy echo harbor prophecy raven orbit canyon"
+).split()
+
+
+def generate_movies(size, seed=0):
+    """
+    Build a catalog of `size` movies.
+
+    Vote counts follow a long-tailed distribution so that, as in the real
+    catalog, only a small share of movies pass the popularity thresholds.
+
+    Returns:
+        dict: Movie id -> movie dict.
+    """
+    rng = random.Random(seed)
+    movies = {}
+    start = datetime(1920, 1, 1)
+    span = (datetime(2024, 12, 31) - start).days
+    for movie_id in range(1, size + 1):
+        words = rng.sample(TITLE_WORDS, rng.randint(1, 3))
+        title = " ".join(word.title() for word in words)
+        if rng.random() < 0.5:
+            title = f"{title} {movie_id}"
+        release = start + timedelta(days=rng.randrange(span))
+        genres = rng.sample(GENRES, rng.randint(1, 3))
+        movies[movie_id] = {
+            "id": movie_id,
+            "title": title,
+            "original_title": title,
+            "vote_count": int(rng.lognormvariate(6.5, 1.6)),
+            "vote_average": round(rng.uniform(2, 9), 1),
+            "popularity": rng.lognormvariate(2.5, 1.2),
+            "release_date": release.strftime("%Y-%m-%d"),
+            "genres": [{"id": genre_id, "name": name} for genre_id, name in genres],
+            "poster_path": f"/poster{movie_id}.jpg",
+            "backdrop_path": f"/backdrop{movie_id}.jpg",
+            "overview": " ".join(rng.choices(TITLE_WORDS, k=40)),
+            "runtime": rng.randint(70, 190),
+        }
+    return movies
+
+
+def generate_models(movie_ids, neighbours=99, scored=30, seed=0):
+    """
+    Build the three similarity models for `movie_ids`.
+
+    Returns:
+        tuple: features_similarity, items_similarity and similarity_scores.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.asarray(movie_ids)
+    count = len(ids)
+
+    def neighbour_lists(width):
+        # Sampled with replacement per row; duplicates are rare and harmless
+        return ids[rng.integers(0, count, size=(count, width))].tolist()
+
+    features = dict(zip(movie_ids, neighbour_lists(neighbours)))
+    items = dict(zip(movie_ids, neighbour_lists(neighbours)))
+    scores = rng.random((count, scored)).tolist()
+    similarity = {
+        movie_id: list(zip(others, row))
+        for movie_id, others, row in zip(movie_ids, neighbour_lists(scored), scores)
+    }
+    return features, items, similarity
+
+
+def generate_history(movie_ids, users, per_user, seed=0):
+    """
+    Build watch histories: `per_user` distinct movies for each of `users` users.
+
+    Yields:
+        tuple: (user_id, movie_id, watched_at) rows.
+    """
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    per_user = min(per_user, len(movie_ids))
+    for user_id in range(1, users + 1):
+        for movie_id in rng.sample(movie_ids, per_user):
+            watched_at = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+            yield user_id, movie_id, watched_at
+
+
+def _dump(obj, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def generate(out, size, users=1000, per_user=100, neighbours=99, scored=30, seed=0):
+    """
+    Write a complete synthetic catalog to `out`.
+
+    Returns:
+        dict: Paths of the files written.
+    """
+    started = time.perf_counter()
+    movies = generate_movies(size, seed)
+    movie_ids = list(movies)
+    paths = {
+        "dataset": os.path.join(out, "dataset", "movie_api.pkl"),
+        "models": os.path.join(out, "models"),
+        "history": os.path.join(out, "history.csv"),
+    }
+    _dump(movies, paths["dataset"])
+    del movies
+
+    features, items, similarity = generate_models(movie_ids, neighbours, scored, seed)
+    _dump(features, os.path.join(paths["models"], "features_similarity.pkl"))
+    _dump(items, os.path.join(paths["models"], "items_similarity.pkl"))
+    _dump(similarity, os.path.join(paths["models"], "similarity_scores.pkl"))
+    del features, items, similarity
+
+    with open(paths["history"], "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(("user_id", "movie_id", "watched_at"))
+        for user_id, movie_id, watched_at in generate_history(
+            movie_ids, users, per_user, seed
+        ):
+            writer.writerow((user_id, movie_id, watched_at.isoformat()))
+
+    print(
+        f"Generated {size} movies and {users} users x {per_user} views "
+        f"in {time.perf_counter() - started:.1f}s under {out}"
+    )
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--scale", choices=SCALES, help="Catalog size preset.")
+    size.add_argument("--size", type=int, help="Number of movies.")
+    parser.add_argument("--out", required=True, help="Output directory.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--history", type=int, default=100, help="Views per user.")
+    parser.add_argument("--neighbours", type=int, default=99)
+    parser.add_argument("--scored", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate(
+        args.out,
+        SCALES[args.scale] if args.scale else args.size,
+        users=args.users,
+        per_user=args.history,
+        neighbours=args.neighbours,
+        scored=args.scored,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -13,22 +13,164 @@ class Config:
 
     Attributes:
         SECRET_KEY (str): Secret key for protecting against CSRF attacks.
-        SQLALCHEMY_DATABASE_URI (str): Database URI for connecting to the SQLite database.
+        SQLALCHEMY_DATABASE_URI (str): Database URI; defaults to the bundled SQLite
+            database and can be overridden with DATABASE_URL.
         SQLALCHEMY_TRACK_MODIFICATIONS (bool): Flag to track modifications in the database.
     """
 
     SECRET_KEY = os.getenv("FLASK_SECRET_KEY")
-    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(basedir, "movies.db")
+    SQLALCHEMY_DATABASE_URI = os.getenv(
+        "DATABASE_URL", "sqlite:///" + os.path.join(basedir, "movies.db")
+    )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Database Engine Configuration
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Only applied to SQLite file databases; empty values keep SQLite's default
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))  # ms
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -16000))  # KiB
+
     # Email Configuration
     MAIL_SERVER = os.getenv("MAIL_SERVER")
     MAIL_PORT = int(os.getenv("MAIL_PORT"))
     MAIL_USERNAME = os.getenv("MAIL_USERNAME")
     MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
     MAIL_DEFAULT_SENDER = os.getenv("MAIL_DEFAULT_SENDER")
-    MAIL_USE_TLS = True
+    MAIL_USE_TLS = os.getenv("MAIL_USE_TLS", "true").lower() == "true"
     MAIL_USE_SSL = False
 
+    # Email Outbox Configuration
+    MAIL_OUTBOX_ENABLED = os.getenv("MAIL_OUTBOX_ENABLED", "true").lower() == "true"
+    MAIL_OUTBOX_BATCH_SIZE = int(os.getenv("MAIL_OUTBOX_BATCH_SIZE", 50))
+    MAIL_OUTBOX_POLL_INTERVAL = float(os.getenv("MAIL_OUTBOX_POLL_INTERVAL", 5))
+    MAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("MAIL_OUTBOX_MAX_ATTEMPTS", 8))
+    MAIL_OUTBOX_RETRY_BASE = int(os.getenv("MAIL_OUTBOX_RETRY_BASE", 30))
+    MAIL_OUTBOX_RETRY_MAX = int(os.getenv("MAIL_OUTBOX_RETRY_MAX", 3600))
+    MAIL_OUTBOX_LEASE = int(os.getenv("MAIL_OUTBOX_LEASE", 300))
+    MAIL_OUTBOX_RETENTION_DAYS = float(os.getenv("MAIL_OUTBOX_RETENTION_DAYS", 7))
+
     # Session Configuration
     PERMANENT_SESSION_LIFETIME = timedelta(days=1)
+
+    # Login Throttle Configuration
+    # "memory" limits each worker process; "sqlite" shares limits between them
+    LOGIN_THROTTLE_ENABLED = os.getenv("LOGIN_THROTTLE_ENABLED", "true").lower() == "true"
+    LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "memory")
+    LOGIN_THROTTLE_SQLITE_PATH = os.getenv(
+        "LOGIN_THROTTLE_SQLITE_PATH",
+        os.path.join(basedir, "instance", "login_throttle.db"),
+    )
+    LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", 20))
+    LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", 10))
+    LOGIN_ACCOUNT_BURST = int(os.getenv("LOGIN_ACCOUNT_BURST", 5))
+    LOGIN_ACCOUNT_PER_MINUTE = float(os.getenv("LOGIN_ACCOUNT_PER_MINUTE", 1))
+    LOGIN_HASH_WORKERS = int(os.getenv("LOGIN_HASH_WORKERS", 2))
+    LOGIN_HASH_QUEUE = int(os.getenv("LOGIN_HASH_QUEUE", 8))
+    LOGIN_HASH_TIMEOUT = float(os.getenv("LOGIN_HASH_TIMEOUT", 5))
+
+    # User Cache Configuration
+    USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "true").lower() == "true"
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 300))
+
+    # Homepage Rail Configuration
+    RAIL_MAX_WORKERS = int(os.getenv("RAIL_MAX_WORKERS", 4))
+    RAIL_PROCESS_WORKERS = int(os.getenv("RAIL_PROCESS_WORKERS", 0))
+    RAIL_PROCESS_OFFLOAD = [
+        name for name in os.getenv("RAIL_PROCESS_OFFLOAD", "").split(",") if name
+    ]  # any of "popular,latest,because_you_watch,genre_0,genre_1"
+    RAIL_TIMEOUT = float(os.getenv("RAIL_TIMEOUT", 10))
+    HOMEPAGE_DEFERRED_RAILS = (
+        os.getenv("HOMEPAGE_DEFERRED_RAILS", "true").lower() == "true"
+    )
+    # Recently watched movies shown, and watched movies excluded from the rails
+    HOMEPAGE_RECENT_LIMIT = int(os.getenv("HOMEPAGE_RECENT_LIMIT", 20))
+    HOMEPAGE_HISTORY_LIMIT = int(os.getenv("HOMEPAGE_HISTORY_LIMIT", 500))
+
+    # Rendered Fragment Cache Configuration
+    FRAGMENT_CACHE_ENABLED = os.getenv("FRAGMENT_CACHE_ENABLED", "true").lower() == "true"
+    FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", 256))
+
+    # HTTP Caching Configuration
+    CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", 3600))
+
+    # Response Encoding Configuration
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "auto")  # auto, orjson or stdlib
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 500))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 6))
+    COMPRESS_BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", 4))
+
+    # Watch History Configuration
+    # "sync" commits every view; "buffered" batches them and may lose up to
+    # HISTORY_FLUSH_INTERVAL seconds of views if the process is killed
+    HISTORY_WRITE_MODE = os.getenv("HISTORY_WRITE_MODE", "sync")
+    HISTORY_FLUSH_SIZE = int(os.getenv("HISTORY_FLUSH_SIZE", 100))
+    HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", 1))
+    HISTORY_BUFFER_MAX = int(os.getenv("HISTORY_BUFFER_MAX", 10000))
+    HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 50))
+    HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", 200))
+    # Compact history older than this many days into per-user summaries (0 = keep all)
+    HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", 0))
+
+    # Bulk Data Configuration
+    # Bearer token for the /admin endpoints; they are disabled when unset
+    ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+    BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 5000))
+
+    # Trailer Cache Configuration (seconds)
+    TRAILER_CACHE_TTL = int(os.getenv("TRAILER_CACHE_TTL", 30 * 24 * 60 * 60))
+    TRAILER_NEGATIVE_TTL = int(os.getenv("TRAILER_NEGATIVE_TTL", 6 * 60 * 60))
+
+    # Trailer Lookup Configuration
+    TRAILER_LOOKUP_WORKERS = int(os.getenv("TRAILER_LOOKUP_WORKERS", 4))
+    TRAILER_LOOKUP_TIMEOUT = float(os.getenv("TRAILER_LOOKUP_TIMEOUT", 3))
+
+    # Trailer Prefetch Configuration
+    TRAILER_PREFETCH_ENABLED = (
+        os.getenv("TRAILER_PREFETCH_ENABLED", "false").lower() == "true"
+    )
+    TRAILER_PREFETCH_TOP_N = int(os.getenv("TRAILER_PREFETCH_TOP_N", 1000))
+    TRAILER_PREFETCH_RATE = float(os.getenv("TRAILER_PREFETCH_RATE", 10))  # per minute
+    TRAILER_PREFETCH_DAILY_QUOTA = int(os.getenv("TRAILER_PREFETCH_DAILY_QUOTA", 5000))
+    TRAILER_PREFETCH_MAX_FAILURES = int(os.getenv("TRAILER_PREFETCH_MAX_FAILURES", 5))
+    TRAILER_PREFETCH_CHECKPOINT = os.getenv(
+        "TRAILER_PREFETCH_CHECKPOINT",
+        os.path.join(basedir, "instance", "trailer_prefetch.json"),
+    )
+
+    # Request Timing Configuration
+    SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+    SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "true").lower() == "true"
+    SERVER_TIMING_SLOW_MS = float(os.getenv("SERVER_TIMING_SLOW_MS", 500))
+    SERVER_TIMING_SAMPLES = int(os.getenv("SERVER_TIMING_SAMPLES", 1000))
+
+    # Static Assets Configuration
+    # "flask assets prune" keeps files dropped from the build this long, so
+    # workers and cached pages still on an older build keep working
+    ASSETS_RETENTION_DAYS = float(os.getenv("ASSETS_RETENTION_DAYS", 7))
+
+    # Metrics Configuration
+    # Set METRICS_DIR when running several worker processes so a scrape
+    # reports all of them; empty it with "flask metrics clear" on deploy.
+    # /metrics answers 404 until METRICS_TOKEN is set
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_DIR = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+    # Template Rendering Configuration
+    STREAM_TEMPLATES = [
+        name for name in os.getenv("STREAM_TEMPLATES", "").split(",") if name
+    ]  # e.g. "index.html,search.html,category.html"
+    STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", 8192))
+    JINJA_BYTECODE_CACHE_DIR = os.getenv(
+        "JINJA_BYTECODE_CACHE_DIR", os.path.join(basedir, ".jinja_cache")
+    )
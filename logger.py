@@ -1,6 +1,12 @@
+import atexit
+import copy
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 # Define the log levels
 log_levels = {
@@ -12,27 +18,176 @@ log_levels = {
 }
 
 # Set up environment-specific log level
-env_log_level = os.getenv("LOG_LEVEL", "DEBUG").upper()
+env_log_level = os.getenv("LOG_LEVEL", "INFO").upper()
 log_level = log_levels.get(env_log_level, logging.INFO)
 
-# Create a logger
-logger = logging.getLogger(__name__)
+# Per-logger overrides, e.g. "app.utils.trailer_finder=DEBUG,werkzeug=WARNING"
+module_levels = {
+    name.strip(): log_levels.get(level.strip().upper(), log_level)
+    for name, _, level in (
+        item.partition("=") for item in os.getenv("LOG_LEVELS", "").split(",")
+    )
+    if name.strip()
+}
+
+# "text" writes the classic one-line format, "json" one JSON object per record
+log_format_name = os.getenv("LOG_FORMAT", "text").lower()
+log_file = os.getenv("LOG_FILE", "app.log")  # empty to log to the console only
+log_file_max_bytes = int(os.getenv("LOG_FILE_MAX_BYTES", 1024 * 1024))  # 1 MB
+log_file_backups = int(os.getenv("LOG_FILE_BACKUPS", 10))
+# Records waiting for the writer; further records are dropped, never waited on
+log_queue_size = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+# Every application logger is a child of this one
+ROOT_LOGGER = "app"
+
+# Values safe to format later on the writer thread, since they cannot change
+_IMMUTABLE = (str, int, float, bool, type(None))
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+
+    Besides the standard fields, anything passed with ``extra=`` is included
+    as its own key, so records can carry structured context.
+    """
+
+    RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in self.RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hand records to the writer thread without ever waiting for it.
+
+    When the queue is full the record is dropped and counted instead. The
+    message is only rendered here when one of its arguments could change
+    after the call returns; otherwise it is formatted on the writer thread
+    along with the rest of the record.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        args = record.args
+        if args and not (
+            isinstance(args, tuple) and all(isinstance(a, _IMMUTABLE) for a in args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # Tracebacks hold the caller's frames; render them while they exist
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _build_handlers():
+    if log_format_name == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(
+            RotatingFileHandler(
+                log_file, maxBytes=log_file_max_bytes, backupCount=log_file_backups
+            )
+        )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+# Request threads only enqueue records; a listener thread formats and writes them
+handlers = _build_handlers()
+queue_handler = NonBlockingQueueHandler(queue.Queue(log_queue_size))
+listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+listener.start()
+
+
+def _restart_listener():
+    # The listener thread does not survive a fork, and the queue's lock may
+    # have been held when it happened; give the child fresh ones
+    global listener
+    queue_handler.queue = queue.Queue(log_queue_size)
+    queue_handler._dropped_lock = threading.Lock()
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+
+def _stop_listener():
+    # Writes out whatever is still queued
+    listener.stop()
+
+
+os.register_at_fork(after_in_child=_restart_listener)
+atexit.register(_stop_listener)
+
+# Create the application logger
+logger = logging.getLogger(ROOT_LOGGER)
 logger.setLevel(log_level)
+logger.addHandler(queue_handler)
+
+for name, level in module_levels.items():
+    logging.getLogger(name).setLevel(level)
+
+
+def get_logger(name):
+    """
+    Get the logger for a module.
+
+    Module loggers are children of the application logger, so they share
+    its handlers, and each can be given its own level through LOG_LEVELS.
 
-# Create handlers
-console_handler = logging.StreamHandler()
-file_handler = RotatingFileHandler(
-    "app.log", maxBytes=1024 * 1024, backupCount=10  # 1 MB
-)
+    Args:
+        name (str): The module's ``__name__``.
 
-# Create formatters and add it to handlers
-log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-console_formatter = logging.Formatter(log_format)
-file_formatter = logging.Formatter(log_format)
+    Returns:
+        logging.Logger: The module's logger.
+    """
+    if name != ROOT_LOGGER and not name.startswith(ROOT_LOGGER + "."):
+        name = f"{ROOT_LOGGER}.{name}"
+    return logging.getLogger(name)
 
-console_handler.setFormatter(console_formatter)
-file_handler.setFormatter(file_formatter)
 
-# Add handlers to the logger
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+def dropped_records():
+    """Return how many records were dropped because the log queue was full."""
+    return queue_handler.dropped
@@ -0,0 +1,131 @@
+import os
+from datetime import datetime, timedelta
+
+# config.py reads these when the app package is imported
+os.environ.setdefault("MAIL_PORT", "25")
+os.environ.setdefault("FLASK_SECRET_KEY", "test")
+
+import pytest  # noqa: E402
+from flask import Flask  # noqa: E402
+
+from app import db  # noqa: E402
+from app.models import UserHistory  # noqa: E402
+from app.utils import history_buffer as history_buffer_module  # noqa: E402
+from app.utils import visited  # noqa: E402
+from app.utils.history_buffer import HistoryBuffer  # noqa: E402
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI="sqlite:///" + str(tmp_path / "history.db"),
+        HISTORY_WRITE_MODE="buffered",
+        # Keep the background flusher idle; the tests flush explicitly
+        HISTORY_FLUSH_SIZE=10000,
+        HISTORY_FLUSH_INTERVAL=3600,
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def buffer(app, monkeypatch):
+    buffer = HistoryBuffer(app)
+    monkeypatch.setattr(visited, "history_buffer", buffer)
+    yield buffer
+    buffer._pending.clear()
+
+
+def stored(app):
+    with app.app_context():
+        return {
+            (row.user_id, row.movie_id): row.watched_at
+            for row in db.session.query(UserHistory).all()
+        }
+
+
+def test_flush_writes_buffered_events(app, buffer):
+    buffer.record(1, 10, NOW)
+    buffer.record(1, 10, NOW + timedelta(minutes=1))
+    buffer.record(2, 20, NOW)
+
+    assert buffer.flush() == 2
+    assert stored(app) == {(1, 10): NOW + timedelta(minutes=1), (2, 20): NOW}
+    assert buffer.pending_for(1) == []
+
+
+def test_events_stay_visible_while_a_flush_runs(app, buffer, monkeypatch):
+    upsert_many = history_buffer_module.upsert_many
+    seen = {}
+
+    def slow_upsert(*args, **kwargs):
+        # A view arrives while the batch is being written
+        seen["during"] = sorted(buffer.pending_for(1))
+        buffer.record(1, 11, NOW + timedelta(minutes=5))
+        return upsert_many(*args, **kwargs)
+
+    monkeypatch.setattr(history_buffer_module, "upsert_many", slow_upsert)
+    buffer.record(1, 10, NOW)
+
+    assert buffer.flush() == 1
+    assert seen["during"] == [(10, NOW)]
+    assert stored(app) == {(1, 10): NOW}
+    # The view recorded during the flush waits for the next one
+    assert buffer.pending_for(1) == [(11, NOW + timedelta(minutes=5))]
+
+
+def test_failed_flush_requeues_events(app, buffer, monkeypatch):
+    def failing_upsert(*args, **kwargs):
+        # A newer view of the same movie arrives before the write fails
+        buffer.record(1, 10, NOW + timedelta(minutes=5))
+        raise RuntimeError("database is locked")
+
+    buffer.record(1, 10, NOW)
+    buffer.record(1, 12, NOW)
+    monkeypatch.setattr(history_buffer_module, "upsert_many", failing_upsert)
+
+    assert buffer.flush() == 0
+    assert stored(app) == {}
+    # The failed batch is back, without overwriting the newer view
+    assert sorted(buffer.pending_for(1)) == [
+        (10, NOW + timedelta(minutes=5)),
+        (12, NOW),
+    ]
+
+    monkeypatch.undo()
+    assert buffer.flush() == 2
+    assert stored(app) == {(1, 10): NOW + timedelta(minutes=5), (1, 12): NOW}
+
+
+def test_history_merges_buffered_and_stored_events(app, buffer):
+    with app.app_context():
+        db.session.add_all(
+            [
+                UserHistory(user_id=1, movie_id=10, watched_at=NOW),
+                UserHistory(user_id=1, movie_id=11, watched_at=NOW),
+                UserHistory(user_id=2, movie_id=10, watched_at=NOW),
+            ]
+        )
+        db.session.commit()
+
+    buffer.record(1, 11, NOW + timedelta(minutes=2))
+    buffer.record(1, 12, NOW + timedelta(minutes=1))
+    buffer.record(2, 13, NOW + timedelta(minutes=3))
+
+    with app.app_context():
+        history = visited.get_visited_movies(1)
+        page = visited.get_visited_movies(1, limit=2)
+
+    assert history == [
+        (11, NOW + timedelta(minutes=2)),
+        (12, NOW + timedelta(minutes=1)),
+        (10, NOW),
+    ]
+    assert page == history[:2]
@@ -0,0 +1,96 @@
+import os
+from datetime import datetime, timedelta
+
+# config.py reads these when the app package is imported
+os.environ.setdefault("MAIL_PORT", "25")
+os.environ.setdefault("FLASK_SECRET_KEY", "test")
+
+import pytest  # noqa: E402
+from flask import Flask  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app import db  # noqa: E402
+from app.models import UserHistory  # noqa: E402
+from app.utils import upsert as upsert_module  # noqa: E402
+from app.utils.migrations import init_schema, missing_indexes  # noqa: E402
+from app.utils.upsert import upsert, upsert_many  # noqa: E402
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+UNIQUE_INDEX = "uq_user_history_user_movie"
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Each test starts from a database whose indexes nobody has checked yet
+    monkeypatch.setattr(upsert_module, "_conflict_targets", {})
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + str(tmp_path / "upsert.db")
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        # A database created before the unique index was added to the model
+        db.session.execute(text(f"DROP INDEX {UNIQUE_INDEX}"))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+def rows(app):
+    with app.app_context():
+        return sorted(
+            (row.user_id, row.movie_id, row.watched_at)
+            for row in db.session.query(UserHistory).all()
+        )
+
+
+def test_upsert_without_unique_index_updates_in_place(app):
+    with app.app_context():
+        for watched_at in (NOW, NOW + timedelta(minutes=1)):
+            upsert(
+                UserHistory,
+                {"user_id": 1, "movie_id": 10, "watched_at": watched_at},
+                index_elements=["user_id", "movie_id"],
+                update_columns=["watched_at"],
+            )
+            db.session.commit()
+        upsert_many(
+            UserHistory,
+            [
+                {"user_id": 1, "movie_id": 11, "watched_at": NOW},
+                {"user_id": 1, "movie_id": 11, "watched_at": NOW + timedelta(hours=1)},
+            ],
+            index_elements=["user_id", "movie_id"],
+            update_columns=["watched_at"],
+        )
+        db.session.commit()
+
+    assert rows(app) == [
+        (1, 10, NOW + timedelta(minutes=1)),
+        (1, 11, NOW + timedelta(hours=1)),
+    ]
+
+
+def test_boot_creates_missing_unique_index(app):
+    init_schema(app)
+
+    with app.app_context(), db.engine.connect() as connection:
+        assert missing_indexes(connection) == {}
+
+
+def test_boot_leaves_duplicates_to_schema_upgrade(app):
+    with app.app_context():
+        db.session.add_all(
+            [
+                UserHistory(user_id=1, movie_id=10, watched_at=NOW),
+                UserHistory(user_id=1, movie_id=10, watched_at=NOW),
+            ]
+        )
+        db.session.commit()
+
+    init_schema(app)
+
+    with app.app_context(), db.engine.connect() as connection:
+        missing = missing_indexes(connection)
+    assert [index.name for index in missing[UserHistory.__table__]] == [UNIQUE_INDEX]
+    assert len(rows(app)) == 2